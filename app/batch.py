@@ -0,0 +1,279 @@
+import argparse
+import csv
+import json
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from time import perf_counter
+
+import numpy as np
+
+from app.compiler import compile_expression
+from app.core import METHOD_PARAMS, get_method_name, get_x0, run_method
+from app.evaluation import Evaluator
+from app.utils import available_cpus
+
+JOB_FIELDS = ("id", "expression", "x0", "method", "tol", "max_iter")
+RESULT_FIELDS = ("id", "expression", "x0", "method", "status", "value", "x", "iterations", "reason", "nfev", "time",
+                 "error")
+# Числовые параметры заданий и их типы: значения из CSV приходят строками
+NUMERIC_PARAMS = {
+    **{name: type(value) for params in METHOD_PARAMS.values() for name, value in params.items()},
+    "max_evals": int, "max_time": float, "f_target": float, "stall_window": int, "stall_tol": float,
+    "restarts": int, "restart_window": int, "workers": int, "line_tol": float, "max_radius": float, "eta": float,
+}
+BOOLEAN_PARAMS = ("batch", "adaptive")  # Логические параметры заданий
+BOOLEAN_VALUES = {"true": True, "1": True, "false": False, "0": False}  # Допустимые записи логических значений
+
+
+class JobTimeout(Exception):
+    """
+    Превышено время, отведенное на одно задание.
+    """
+
+
+def read_jobs(path):
+    """
+    Ленивое чтение заданий из CSV или JSONL файла.
+
+    Обязательные поля: expression, x0, method. Необязательные: id, tol, max_iter.
+    Остальные поля (в JSONL также словарь params) считаются параметрами метода,
+    в том числе критерии остановки max_evals, max_time, f_target, stall_window. Известные числовые
+    (NUMERIC_PARAMS) и логические (BOOLEAN_PARAMS) параметры приводятся к своим типам при выполнении
+    задания: ошибочное значение дает результат задания со статусом error.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        for number, row in enumerate(rows):
+            yield _normalize_job(row, number)
+
+
+def _normalize_job(row, number):
+    params = dict(row.pop("params", None) or {})
+    job = {"id": row.pop("id", None) or number}
+    for field in JOB_FIELDS[1:]:
+        value = row.pop(field, None)
+        if value not in (None, ""):
+            job[field] = value
+    for key, value in row.items():
+        if value not in (None, ""):
+            params[key] = value
+    job["params"] = params
+    return job
+
+
+def _convert_params(params):
+    """
+    Приведение известных числовых (NUMERIC_PARAMS) и логических (BOOLEAN_PARAMS) параметров к их типам;
+    остальные передаются как есть. Логические значения разбираются строго: true/false/1/0 без учета регистра,
+    иначе ValueError (bool("false") было бы истиной).
+    """
+    converted = dict(params)
+    for key, value in params.items():
+        if key in BOOLEAN_PARAMS:
+            converted[key] = _parse_bool(key, value)
+        elif key in NUMERIC_PARAMS and isinstance(value, (str, int, float)):
+            converted[key] = int(float(value)) if NUMERIC_PARAMS[key] is int else float(value)
+    return converted
+
+
+def _parse_bool(key, value):
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text not in BOOLEAN_VALUES:
+        raise ValueError(f"Параметр {key}: ожидается true/false/1/0, получено {value!r}")
+    return BOOLEAN_VALUES[text]
+
+
+def run_job(job, timeout=None, budget=None):
+    """
+    Выполнение одного задания.
+
+    :param job: Задание (словарь с полями expression, x0, method, tol, max_iter, params).
+    :param timeout: Ограничение времени на задание в секундах. Зависший вызов целевой функции прерывается
+                    сигналом (см. _alarm); где это невозможно, время проверяется перед каждым вычислением.
+    :param budget: Критерии остановки по умолчанию (max_evals, max_time, ...); поля задания их переопределяют.
+    :return: Запись результата.
+    """
+    start = perf_counter()
+    record = {"id": job["id"], "expression": job.get("expression"), "x0": job.get("x0"), "method": job.get("method")}
+    evaluator = None
+    try:
+        with _alarm(timeout):
+            compiled = compile_expression(job["expression"])  # Кэш компиляции свой в каждом процессе
+            x0 = job["x0"]
+            x0 = get_x0(compiled.params, x0) if isinstance(x0, str) else np.array(x0, dtype=float)
+            func = compiled.func
+            if timeout is not None:
+                func = _with_deadline(func, start + timeout)
+            evaluator = Evaluator(func)
+            result = run_method(
+                get_method_name(job["method"]), evaluator, x0,
+                tol=float(job.get("tol", 1e-6)), max_iter=int(float(job.get("max_iter", 1000))), expression=compiled,
+                **{**(budget or {}), **_convert_params(job["params"])})
+        record.update(status="ok", value=float(result.fun), x=[float(arg) for arg in result.x],
+                      iterations=int(result.nit), reason=result.reason)
+    except JobTimeout:
+        record["status"] = "timeout"
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["nfev"] = evaluator.nfev if evaluator is not None else 0
+    record["time"] = perf_counter() - start
+    return record
+
+
+def run_chunk(jobs, timeout=None, budget=None):
+    return [run_job(job, timeout, budget) for job in jobs]
+
+
+@contextmanager
+def _alarm(timeout):
+    """
+    Прерывание задания по истечении timeout: обработчик SIGALRM выбрасывает JobTimeout посреди вызова
+    целевой функции, даже если вызов завис. Сигналы доступны только на POSIX и только в главном потоке
+    процесса (в нем ProcessPoolExecutor выполняет задания); в остальных случаях ограничение кооперативное -
+    _with_deadline проверяет время перед каждым вычислением, а зависший вызов не прерывается.
+    """
+    if not timeout or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def interrupt(signum, frame):
+        raise JobTimeout()
+
+    previous = signal.signal(signal.SIGALRM, interrupt)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _with_deadline(func, deadline):
+    """
+    Кооперативное ограничение времени: JobTimeout перед вычислением функции после срока deadline.
+    """
+
+    def wrapped(*args):
+        if perf_counter() > deadline:
+            raise JobTimeout()
+        return func(*args)
+
+    return wrapped
+
+
+class ResultWriter:
+    """
+    Потоковая запись результатов в JSONL или CSV по мере их готовности.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.csv = None
+        if path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            self.csv.writeheader()
+
+    def write(self, records):
+        for record in records:
+            if self.csv is not None:
+                row = dict(record)
+                if isinstance(row.get("x"), list):
+                    row["x"] = " ".join(str(arg) for arg in row["x"])
+                self.csv.writerow(row)
+            else:
+                self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run_batch(input_path, output_path, workers=None, chunksize=16, timeout=None, budget=None):
+    """
+    Выполнение заданий из файла в пуле процессов с потоковой записью результатов.
+
+    Задания отправляются порциями по chunksize, в работе одновременно не больше 2 * workers порций,
+    поэтому ни задания, ни результаты не накапливаются в памяти целиком.
+
+    :param input_path: Файл заданий (CSV или JSONL).
+    :param output_path: Файл результатов (CSV или JSONL).
+    :param workers: Число процессов (по умолчанию число доступных ядер).
+    :param chunksize: Число заданий в одной порции.
+    :param timeout: Ограничение времени на одно задание в секундах.
+    :param budget: Критерии остановки по умолчанию для всех заданий (см. run_job).
+    :return: Статистика выполнения.
+    """
+    workers = workers or available_cpus()
+    stats = {"jobs": 0, "ok": 0, "timeout": 0, "error": 0, "nfev": 0}
+    jobs = read_jobs(input_path)
+    chunks = iter(lambda: list(islice(jobs, chunksize)), [])
+    writer = ResultWriter(output_path)
+    start = perf_counter()
+
+    def collect(records):
+        writer.write(records)
+        for record in records:
+            stats["jobs"] += 1
+            stats[record["status"]] += 1
+            stats["nfev"] += record["nfev"]
+
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                collect(run_chunk(chunk, timeout, budget))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = set()
+                for chunk in islice(chunks, 2 * workers):
+                    pending.add(executor.submit(run_chunk, chunk, timeout, budget))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+                    for chunk in islice(chunks, len(done)):
+                        pending.add(executor.submit(run_chunk, chunk, timeout, budget))
+    finally:
+        writer.close()
+
+    elapsed = perf_counter() - start
+    stats["time"] = elapsed
+    stats["jobs_per_second"] = stats["jobs"] / elapsed if elapsed > 0 else 0.0
+    stats["evals_per_second"] = stats["nfev"] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный запуск задач оптимизации")
+    parser.add_argument("input", help="Файл заданий (.csv или .jsonl)")
+    parser.add_argument("-o", "--output", required=True, help="Файл результатов (.csv или .jsonl)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Число процессов")
+    parser.add_argument("--chunksize", type=int, default=16, help="Число заданий в одной порции")
+    parser.add_argument("--timeout", type=float, default=None, help="Ограничение времени на задание, с")
+    parser.add_argument("--max-evals", type=int, default=None, help="Максимальное число вычислений на задание")
+    parser.add_argument("--max-time", type=float, default=None,
+                        help="Время на задание, с (в отличие от --timeout задание завершается с лучшей точкой)")
+    parser.add_argument("--f-target", type=float, default=None, help="Целевое значение функции")
+    parser.add_argument("--stall-window", type=int, default=None, help="Число итераций без улучшения")
+    args = parser.parse_args(argv)
+
+    budget = {key: value for key, value in (("max_evals", args.max_evals), ("max_time", args.max_time),
+                                            ("f_target", args.f_target), ("stall_window", args.stall_window))
+              if value is not None}
+    stats = run_batch(args.input, args.output, workers=args.workers, chunksize=args.chunksize,
+                      timeout=args.timeout, budget=budget)
+    print(f"Заданий: {stats['jobs']} (успешно {stats['ok']}, по времени {stats['timeout']}, "
+          f"с ошибкой {stats['error']}) за {stats['time']:.2f} с")
+    print(f"Производительность: {stats['jobs_per_second']:.1f} заданий/с, "
+          f"{stats['evals_per_second']:.0f} вычислений/с")
+
+
+if __name__ == "__main__":
+    main()
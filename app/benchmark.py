@@ -0,0 +1,244 @@
+import argparse
+import csv
+import json
+import sys
+import tracemalloc
+from collections import namedtuple
+from time import perf_counter
+
+import numpy as np
+from scipy.optimize import minimize
+
+from app.core import METHODS
+from app.evaluation import Evaluator
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+QUICK_DIMS = (2, 5, 10)
+FULL_DIMS = (2, 5, 10, 20, 50, 100, 200)
+SCALING_DIMS = (10, 100, 1000)
+SCALING_METHODS = ("hooke_jeeves", "nelder_mead", "powell")
+MIN_TIME = 0.05  # Время меньше этого порога слишком шумное для сравнения, с
+
+# Тестовая задача: функция, начальная точка и точка минимума в зависимости от размерности
+Problem = namedtuple("Problem", ["func", "start", "solution"])
+
+
+# Функции принимают координаты отдельными аргументами, как и скомпилированные выражения,
+# и поддерживают массивы координат для пакетного вычисления
+def sphere(*x):
+    x = np.asarray(x)
+    return np.sum(x ** 2, axis=0)
+
+
+def rosenbrock(*x):
+    x = np.asarray(x)
+    return np.sum(100 * (x[1:] - x[:-1] ** 2) ** 2 + (1 - x[:-1]) ** 2, axis=0)
+
+
+def rastrigin(*x):
+    x = np.asarray(x)
+    return 10 * len(x) + np.sum(x ** 2 - 10 * np.cos(2 * np.pi * x), axis=0)
+
+
+def ackley(*x):
+    x = np.asarray(x)
+    n = len(x)
+    return (-20 * np.exp(-0.2 * np.sqrt(np.sum(x ** 2, axis=0) / n))
+            - np.exp(np.sum(np.cos(2 * np.pi * x), axis=0) / n) + 20 + np.e)
+
+
+def ellipsoid(*x):
+    """
+    Плохо обусловленная квадратичная функция (число обусловленности 10^6).
+    """
+    x = np.asarray(x)
+    n = len(x)
+    weights = 10 ** (6 * np.arange(n) / max(n - 1, 1))
+    return np.sum(weights * x.T ** 2, axis=-1)
+
+
+PROBLEMS = {
+    "sphere": Problem(sphere, lambda n: np.full(n, 3.0), np.zeros),
+    "rosenbrock": Problem(rosenbrock, lambda n: np.resize([-1.2, 1.0], n), np.ones),
+    "rastrigin": Problem(rastrigin, lambda n: np.full(n, 2.5), np.zeros),
+    "ackley": Problem(ackley, lambda n: np.full(n, 2.0), np.zeros),
+    "ellipsoid": Problem(ellipsoid, np.ones, np.zeros),
+}
+
+
+def _scipy_method(name):
+    def method(func, x0, tol=1e-6, max_iter=1000):
+        tolerance = {"Nelder-Mead": "xatol", "Powell": "xtol"}[name]
+        result = minimize(lambda x: func(*x), x0, method=name, options={tolerance: tol, "maxiter": max_iter})
+        return result.x, result.fun, result.nit
+
+    return method
+
+
+BENCHMARK_METHODS = {
+    **METHODS,
+    "scipy_nelder_mead": _scipy_method("Nelder-Mead"),
+    "scipy_powell": _scipy_method("Powell"),
+}
+
+
+def run_case(problem, dim, method, max_iter=1000, tol=1e-6, **method_params):
+    """
+    Запуск одного метода на одной задаче.
+
+    :param method_params: Коэффициенты метода (см. app.sweep).
+    :return: Запись с временем, числом вычислений и итераций и итоговой ошибкой по значению и по точке.
+    """
+    func, start, solution = PROBLEMS[problem]
+    evaluator = Evaluator(func)
+    begin = perf_counter()
+    optimal_args, optimal_value, k = BENCHMARK_METHODS[method](evaluator, start(dim), tol=tol, max_iter=max_iter,
+                                                                    **method_params)
+    elapsed = perf_counter() - begin
+    x_opt = solution(dim)
+    return {
+        "problem": problem,
+        "dim": dim,
+        "method": method,
+        "time": elapsed,
+        "nfev": evaluator.nfev,
+        "iterations": int(k),
+        "error_f": float(abs(optimal_value - func(*x_opt))),
+        "error_x": float(np.linalg.norm(np.asarray(optimal_args) - x_opt)),
+    }
+
+
+def run_suite(problems=None, dims=QUICK_DIMS, methods=None, max_iter=1000):
+    results = []
+    for problem in problems or PROBLEMS:
+        for dim in dims:
+            for method in methods or BENCHMARK_METHODS:
+                results.append(run_case(problem, dim, method, max_iter=max_iter))
+    return results
+
+
+def run_scaling(dims=SCALING_DIMS, methods=SCALING_METHODS, iterations=5):
+    """
+    Масштабирование по размерности: время и число вычислений на итерацию и пиковая память метода.
+
+    Задача - sphere, кэш вычислений отключен, чтобы память отражала только состояние метода
+    (симплекс Нелдера-Мида и матрица направлений Пауэлла сами по себе занимают O(n^2)).
+    Память измеряется отдельным запуском на одну итерацию под tracemalloc, чтобы не искажать время.
+
+    :param iterations: Число итераций каждого запуска.
+    :return: Список записей.
+    """
+    results = []
+    for method in methods:
+        for dim in dims:
+            start = PROBLEMS["sphere"].start(dim)
+            evaluator = Evaluator(sphere, maxsize=0)
+            begin = perf_counter()
+            result = METHODS[method](evaluator, start, tol=0.0, max_iter=iterations)
+            elapsed = perf_counter() - begin
+            nit = max(int(result.nit), 1)
+
+            tracemalloc.start()
+            METHODS[method](Evaluator(sphere, maxsize=0), start, tol=0.0, max_iter=1)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({
+                "method": method,
+                "dim": dim,
+                "iterations": nit,
+                "time_per_iteration": elapsed / nit,
+                "nfev_per_iteration": evaluator.nfev / nit,
+                "time_per_nfev": elapsed / max(evaluator.nfev, 1),
+                "peak_memory_kb": peak / 1024,
+            })
+    return results
+
+
+def _key(record):
+    return f"{record['problem']}/{record['dim']}/{record['method']}"
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    baseline = {_key(record): {"nfev": record["nfev"], "time": record["time"]} for record in results}
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def compare(results, baseline, nfev_threshold=0.1, time_threshold=0.5, check_time=True):
+    """
+    Сравнение результатов с базовыми.
+
+    :param nfev_threshold: Допустимый относительный рост числа вычислений.
+    :param time_threshold: Допустимый относительный рост времени (короткие замеры не сравниваются).
+    :return: Список описаний регрессий.
+    """
+    regressions = []
+    for record in results:
+        reference = baseline.get(_key(record))
+        if reference is None:
+            continue
+        if record["nfev"] > reference["nfev"] * (1 + nfev_threshold):
+            regressions.append(f"{_key(record)}: nfev {reference['nfev']} -> {record['nfev']}")
+        if (check_time and reference["time"] >= MIN_TIME
+                and record["time"] > reference["time"] * (1 + time_threshold)):
+            regressions.append(f"{_key(record)}: время {reference['time']:.3f} -> {record['time']:.3f} с")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк методов оптимизации")
+    parser.add_argument("--problems", nargs="+", choices=list(PROBLEMS), help="Задачи")
+    parser.add_argument("--methods", nargs="+", choices=list(BENCHMARK_METHODS), help="Методы")
+    parser.add_argument("--dims", nargs="+", type=int, default=None, help="Размерности")
+    parser.add_argument("--full", action="store_true", help=f"Размерности {FULL_DIMS}")
+    parser.add_argument("--max-iter", type=int, default=1000, help="Максимальное число итераций")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Файл базовых результатов")
+    parser.add_argument("--save-baseline", action="store_true", help="Сохранить результаты как базовые")
+    parser.add_argument("--nfev-threshold", type=float, default=0.1, help="Допустимый рост nfev")
+    parser.add_argument("--time-threshold", type=float, default=0.5, help="Допустимый рост времени")
+    parser.add_argument("--no-time", action="store_true", help="Не сравнивать время")
+    parser.add_argument("--output", help="CSV файл с результатами")
+    parser.add_argument("--scaling", action="store_true",
+                        help=f"Масштабирование по размерности {SCALING_DIMS} (время на итерацию и память)")
+    args = parser.parse_args(argv)
+
+    from tabulate import tabulate
+
+    if args.scaling:
+        print(tabulate(run_scaling(args.dims or SCALING_DIMS, args.methods or SCALING_METHODS), headers="keys",
+                       floatfmt=".3g"))
+        return 0
+
+    dims = args.dims or (FULL_DIMS if args.full else QUICK_DIMS)
+    results = run_suite(args.problems, dims, args.methods, max_iter=args.max_iter)
+    print(tabulate(results, headers="keys", floatfmt=".3g"))
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        return 0
+
+    try:
+        baseline = load_baseline(args.baseline)
+    except FileNotFoundError:
+        print(f"Базовые результаты не найдены: {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.nfev_threshold, args.time_threshold, not args.no_time)
+    for regression in regressions:
+        print(f"Регрессия: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
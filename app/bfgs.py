@@ -0,0 +1,161 @@
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+from app.derivatives import numerical_gradient
+from app.evaluation import BudgetExhausted, as_evaluator
+from app.result import CALLBACK, CONVERGED, MAX_ITER, NO_DECREASE, OptimizeResult
+from app.stopping import Stopping
+
+ARMIJO = 1e-4  # Требуемая доля убывания в условии Армихо
+BACKTRACK = 0.5  # Коэффициент уменьшения шага при возврате
+CURVATURE_EPS = 1e-10  # Минимальное значение s·y относительно |s||y| для обновления матрицы
+
+
+def bfgs(func, x0, grad=None, tol=1e-6, max_iter=1000, memory=None, callback=None, max_evals=None, max_time=None,
+         f_target=None, stall_window=None, stall_tol=1e-8):
+    """
+    Квазиньютоновский метод BFGS с линейным поиском по условию Армихо.
+
+    Обратная матрица Гессе приближается по разностям градиентов; при заданном memory хранятся только
+    последние memory пар (s, y), и направление считается двухпроходной рекурсией (L-BFGS) за O(memory * n).
+
+    :param func: Целевая функция (или Evaluator, чтобы получить счетчики вычислений).
+    :param x0: Начальная точка.
+    :param grad: Градиент grad(*x) -> массив длины n (None - центральные разности по func).
+    :param tol: Точность ε: поиск останавливается, когда норма градиента меньше tol.
+    :param max_iter: Максимальное число итераций.
+    :param memory: Число хранимых пар (s, y) для L-BFGS (None - полная матрица BFGS).
+    :param callback: Функция callback(k, x, value), вызываемая после каждой итерации;
+                     если она возвращает True, поиск останавливается.
+    :param max_evals: Максимальное число вычислений функции.
+    :param max_time: Максимальное время работы, с.
+    :param f_target: Целевое значение функции.
+    :param stall_window: Число итераций без улучшения, после которого поиск останавливается.
+    :param stall_tol: Относительное улучшение, которое считается улучшением (см. Stopping).
+    :return: OptimizeResult (распаковывается как оптимальная точка, значение функции и число итераций).
+             Причина NO_DECREASE - линейный поиск не нашел убывания, хотя норма градиента больше tol
+             (например, из-за погрешности градиента).
+             Счетчики: njev - число вычислений градиента, line_search_nfev - вычисления в линейном поиске,
+             skipped_updates - пропущенные обновления (нарушено условие кривизны).
+    """
+    func = as_evaluator(func)
+    start_time = perf_counter()
+    start_nfev = func.nfev
+    counters = {"njev": 0, "line_search_nfev": 0, "skipped_updates": 0}
+    reason = MAX_ITER
+
+    def gradient(point):
+        counters["njev"] += 1
+        if grad is None:
+            return numerical_gradient(func, point)
+        return np.asarray(grad(*point), dtype=float)
+
+    def direction(g):
+        """
+        Направление -H·g: явная матрица для BFGS или двухпроходная рекурсия для L-BFGS.
+        """
+        if memory is None:
+            return -inverse_hessian @ g
+        q = g.copy()
+        alphas = []
+        for s, y, rho in reversed(pairs):
+            a = rho * (s @ q)
+            q -= a * y
+            alphas.append(a)
+        if pairs:
+            s, y, _ = pairs[-1]
+            q *= (s @ y) / (y @ y)  # Масштаб начальной матрицы
+        for (s, y, rho), a in zip(pairs, reversed(alphas)):
+            b = rho * (y @ q)
+            q += s * (a - b)
+        return -q
+
+    # 1. Инициализация
+    x = np.array(x0, dtype=float)
+    n = len(x)
+    inverse_hessian = np.eye(n) if memory is None else None
+    pairs = deque(maxlen=int(memory)) if memory is not None else None
+    value = func(*x)
+    g = gradient(x)
+    count_iter = 0
+
+    stopping = Stopping(max_evals, max_time, f_target, stall_window, stall_tol)
+    stopping.start(func, start_nfev, start_time)
+    try:
+        while count_iter < max_iter:
+            # 2. Проверка на сходимость по норме градиента
+            if np.linalg.norm(g) < tol:
+                reason = CONVERGED
+                break
+
+            # 3. Направление спуска (если приближение испорчено, берем антиградиент)
+            d = direction(g)
+            slope = g @ d
+            if slope >= 0:
+                d, slope = -g, -(g @ g)
+            if count_iter == 0:
+                d = d / max(1.0, np.linalg.norm(d))  # Первый шаг без информации о масштабе не длиннее 1
+
+            # 4. Линейный поиск с возвратом по условию Армихо
+            alpha = 1.0
+            nfev_before = func.nfev
+            while True:
+                x_new = x + alpha * d
+                value_new = func(*x_new)
+                if value_new <= value + ARMIJO * alpha * slope:
+                    break
+                alpha *= BACKTRACK
+                if alpha * np.linalg.norm(d) <= np.finfo(float).eps * (1 + np.linalg.norm(x)):
+                    break
+            counters["line_search_nfev"] += func.nfev - nfev_before
+            if not value_new <= value:
+                # Убывание не найдено вплоть до машинной точности шага, хотя норма градиента не меньше tol
+                reason = CONVERGED if np.linalg.norm(g) < tol else NO_DECREASE
+                break
+
+            # 5. Обновление приближения обратной матрицы Гессе
+            g_new = gradient(x_new)
+            s, y = x_new - x, g_new - g
+            sy = s @ y
+            if sy > CURVATURE_EPS * np.linalg.norm(s) * np.linalg.norm(y):
+                if memory is not None:
+                    pairs.append((s, y, 1 / sy))
+                else:
+                    if count_iter == 0:
+                        inverse_hessian *= sy / (y @ y)  # Масштаб по первой паре
+                    rho = 1 / sy
+                    hy = inverse_hessian @ y
+                    inverse_hessian += (rho * rho * (y @ hy) + rho) * np.outer(s, s) - rho * (
+                            np.outer(hy, s) + np.outer(s, hy))
+            else:
+                counters["skipped_updates"] += 1
+            x, value, g = x_new, value_new, g_new
+
+            count_iter += 1
+
+            if callback is not None and callback(count_iter, x, value):
+                reason = CALLBACK
+                break
+
+            stop = stopping.check(value)
+            if stop is not None:
+                reason = stop
+                break
+    except BudgetExhausted as e:
+        reason = e.reason  # Бюджет исчерпан посреди итерации: текущее состояние не изменялось
+    finally:
+        stopping.finish()
+
+    return OptimizeResult(x, value, count_iter, nfev=func.nfev - start_nfev, time=perf_counter() - start_time,
+                          reason=reason, counters=counters)
+
+
+def lbfgs(func, x0, grad=None, tol=1e-6, max_iter=1000, memory=10, **kwargs):
+    """
+    L-BFGS: метод BFGS с ограниченной памятью (см. bfgs).
+
+    :param memory: Число хранимых пар (s, y).
+    """
+    return bfgs(func, x0, grad=grad, tol=tol, max_iter=max_iter, memory=memory, **kwargs)
@@ -0,0 +1,162 @@
+import os
+import pickle
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+CHECKPOINT_VERSION = 3  # Версия формата файла контрольной точки
+DEFAULT_INTERVAL = 60.0  # Интервал сохранения по умолчанию, с
+# Параметры, которые при продолжении можно изменить: они не влияют на последовательность точек метода
+RESUMABLE_PARAMS = ("max_evals", "max_time", "f_target", "stall_window", "stall_tol", "workers")
+
+
+class Checkpoint:
+    """
+    Периодическое сохранение полного состояния метода в файл и продолжение с сохраненного состояния.
+
+    Состояние сохраняется в конце итерации, если с прошлого сохранения прошло every_evals вычислений
+    или every_seconds секунд (если оба не заданы - DEFAULT_INTERVAL секунд). Сохраняется пошаговый оптимизатор
+    метода целиком (вместе с моделью surrogate), кэш и счетчики Evaluator и критерии застоя, поэтому запуск
+    с тем же файлом продолжает поиск точно так же, как если бы процесс не прерывался. Файл записывается
+    во временный и затем атомарно заменяет прежний: прерывание во время записи не портит контрольную точку.
+
+    Продолжается только тот же запуск: метод, его параметры (кроме RESUMABLE_PARAMS) и функция должны
+    совпадать с сохраненными, иначе start выдает ValueError. После нормального завершения метода файл
+    удаляется (complete), поэтому повторный запуск с тем же путем начинает поиск заново.
+
+    :param path: Путь к файлу контрольной точки.
+    :param every_evals: Интервал сохранения по числу вычислений функции.
+    :param every_seconds: Интервал сохранения по времени, с.
+    """
+
+    def __init__(self, path, every_evals=None, every_seconds=None):
+        self.path = Path(path)
+        self.every_evals = every_evals
+        self.every_seconds = DEFAULT_INTERVAL if every_evals is None and every_seconds is None else every_seconds
+        self.saves = 0  # Число сохранений в текущем запуске
+        self._method = None
+        self._params = None
+        self._last_nfev = 0
+        self._last_time = 0.0
+
+    def start(self, func, method, params):
+        """
+        Начало запуска метода: чтение сохраненного состояния, если файл уже есть.
+
+        Кэш и счетчики Evaluator восстанавливаются здесь, оптимизатор берется из состояния (см. run_optimizer).
+
+        :param func: Evaluator метода.
+        :param method: Внутреннее имя метода.
+        :param params: Параметры запуска (для resume), в том числе начальная точка x0.
+        :return: Словарь состояния или None, если сохраненного состояния нет.
+        """
+        self._method, self._params = method, params
+        self.saves = 0
+        state = None
+        if self.path.exists():
+            data = load_checkpoint(self.path)
+            if data["method"] != method:
+                raise ValueError(f"Контрольная точка {self.path} сохранена методом {data['method']}")
+            changed = [key for key in data["params"].keys() | params.keys()
+                       if key not in RESUMABLE_PARAMS and not _same(data["params"].get(key), params.get(key))]
+            if changed:
+                raise ValueError(f"Контрольная точка {self.path} сохранена с другими параметрами: "
+                                 f"{', '.join(sorted(changed))}")
+            _check_function(func, data["evaluator"], self.path)
+            func.restore(data["evaluator"])
+            state = data["state"]
+        self._last_nfev, self._last_time = func.nfev, perf_counter()
+        return state
+
+    def due(self, func):
+        """
+        Пора ли сохранять состояние.
+        """
+        if self.every_evals is not None and func.nfev - self._last_nfev >= self.every_evals:
+            return True
+        return self.every_seconds is not None and perf_counter() - self._last_time >= self.every_seconds
+
+    def save(self, func, state):
+        """
+        Запись состояния вместе с кэшем и счетчиками Evaluator.
+
+        :param func: Evaluator метода.
+        :param state: Словарь состояния: оптимизатор между итерациями, момент запуска и критерии застоя.
+        """
+        data = {"version": CHECKPOINT_VERSION, "method": self._method, "params": self._params,
+                "evaluator": func.snapshot(), "state": state}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "wb") as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self.saves += 1
+        self._last_nfev, self._last_time = func.nfev, perf_counter()
+
+    def complete(self):
+        """
+        Нормальное завершение метода: контрольная точка больше не нужна и удаляется.
+        """
+        self.path.unlink(missing_ok=True)
+
+
+def _same(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(np.asarray(a), np.asarray(b))
+    return a == b
+
+
+def _check_function(func, snapshot, path):
+    """
+    Проверка, что функция та же: значение в одной из сохраненных точек кэша вычисляется заново
+    (без учета в счетчиках Evaluator) и сравнивается с сохраненным.
+    """
+    if not snapshot["cache"]:
+        return
+    point, value = snapshot["cache"][0]
+    if not np.array_equal(np.asarray(func.func(*point), dtype=float), np.asarray(value, dtype=float), equal_nan=True):
+        raise ValueError(f"Контрольная точка {path} сохранена для другой функции")
+
+
+def as_checkpoint(checkpoint):
+    """
+    Checkpoint по значению параметра checkpoint метода: None, путь к файлу или готовый Checkpoint.
+    """
+    if checkpoint is None or isinstance(checkpoint, Checkpoint):
+        return checkpoint
+    return Checkpoint(checkpoint)
+
+
+def load_checkpoint(path):
+    """
+    Чтение файла контрольной точки.
+
+    :return: Словарь с полями method, params, evaluator и state.
+    """
+    with open(path, "rb") as file:
+        data = pickle.load(file)
+    if data.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия контрольной точки: {data.get('version')}")
+    return data
+
+
+def resume(path, func, every_evals=None, every_seconds=None, **overrides):
+    """
+    Продолжение запуска с контрольной точки: метод и его параметры берутся из файла.
+
+    :param path: Путь к файлу контрольной точки.
+    :param func: Целевая функция (та же, что и в прерванном запуске; функции в файл не сохраняются).
+    :param every_evals: Интервал дальнейших сохранений по числу вычислений.
+    :param every_seconds: Интервал дальнейших сохранений по времени, с.
+    :param overrides: Параметры, которые не сохраняются (callback, trace, executor).
+    :return: OptimizeResult.
+    """
+    from app.core import METHODS  # app.core импортирует методы, которые импортируют этот модуль
+
+    data = load_checkpoint(path)
+    params = {**data["params"], **overrides}
+    checkpoint = Checkpoint(path, every_evals=every_evals, every_seconds=every_seconds)
+    return METHODS[data["method"]](func, checkpoint=checkpoint, **params)
@@ -0,0 +1,152 @@
+import timeit
+from collections import OrderedDict
+from time import perf_counter
+
+import numpy as np
+import sympy as sp
+
+CACHE_SIZE = 64  # Максимальное число записей в кэше скомпилированных выражений
+
+# Функции, из-за которых выражение не дифференцируемо всюду
+NON_SMOOTH = (sp.Abs, sp.sign, sp.Heaviside, sp.floor, sp.ceiling, sp.Min, sp.Max, sp.Piecewise, sp.Mod)
+
+_cache = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "compile_time": 0.0, "saved_time": 0.0}
+
+
+class CompiledExpression:
+    """
+    Разобранное и скомпилированное выражение целевой функции.
+
+    :param source: Исходная строка выражения.
+    :param expr: Выражение sympy.
+    :param params: Переменные выражения, упорядоченные по имени.
+    :param func: Скомпилированная функция (sympy.lambdify с исключением общих подвыражений).
+    :param compile_time: Время разбора и компиляции в секундах.
+    """
+
+    def __init__(self, source, expr, params, func, compile_time):
+        self.source = source
+        self.expr = expr
+        self.params = params
+        self.func = func
+        self.compile_time = compile_time
+        self._gradient = None
+        self._hessian = None
+
+    @property
+    def param_names(self):
+        return [str(param) for param in self.params]
+
+    @property
+    def differentiable(self):
+        """
+        Выражение гладкое: не содержит модулей, ветвлений и других негладких функций.
+        """
+        return not self.expr.has(*NON_SMOOTH)
+
+    @property
+    def gradient(self):
+        """
+        Скомпилированный градиент: функция координат, возвращающая массив длины n.
+        Производные берутся символьно один раз и хранятся вместе с выражением (и в кэше компиляции).
+        """
+        if self._gradient is None:
+            start = perf_counter()
+            gradient = sp.lambdify(self.params, [sp.diff(self.expr, param) for param in self.params], cse=True)
+            self._gradient = _as_array(gradient, (len(self.params),))
+            self.compile_time += perf_counter() - start
+        return self._gradient
+
+    @property
+    def hessian(self):
+        """
+        Скомпилированная матрица Гессе: функция координат, возвращающая массив (n, n).
+        """
+        if self._hessian is None:
+            start = perf_counter()
+            hessian = sp.lambdify(self.params, sp.hessian(self.expr, self.params).tolist(), cse=True)
+            self._hessian = _as_array(hessian, (len(self.params),) * 2)
+            self.compile_time += perf_counter() - start
+        return self._hessian
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def call_time(self, point=None, number=1000):
+        """
+        Среднее время одного вызова скомпилированной функции в секундах.
+
+        :param point: Точка вычисления (по умолчанию начало координат).
+        :param number: Число вызовов для усреднения.
+        """
+        if point is None:
+            point = [0.0] * len(self.params)
+        func = self.func
+        return timeit.timeit(lambda: func(*point), number=number) / number
+
+
+def compile_expression(source):
+    """
+    Разбор и компиляция выражения с кэшированием.
+
+    Выражение разбирается и компилируется один раз; повторные запросы той же строки
+    или эквивалентной записи (отличающейся пробелами или порядком слагаемых) берутся из кэша.
+
+    :param source: Строка выражения функции.
+    :return: CompiledExpression.
+    """
+    key = "".join(source.split())
+    compiled = _lookup(key)
+    if compiled is not None:
+        return compiled
+
+    start = perf_counter()
+    expr = sp.sympify(source)
+    normalized = sp.srepr(expr)
+    compiled = _lookup(normalized)
+    if compiled is None:
+        params = sorted(expr.free_symbols, key=str)
+        # cse=True: повторяющиеся подвыражения вычисляются один раз за вызов
+        func = sp.lambdify(params, expr, cse=True)
+        compiled = CompiledExpression(source, expr, params, func, perf_counter() - start)
+        _stats["misses"] += 1
+        _stats["compile_time"] += compiled.compile_time
+        _store(normalized, compiled)
+    _store(key, compiled)
+    return compiled
+
+
+def _as_array(func, shape):
+    def wrapped(*args):
+        return np.array(func(*args), dtype=float).reshape(shape)
+
+    return wrapped
+
+
+def cache_info():
+    """
+    Статистика кэша: попадания, промахи, суммарное время компиляции и сэкономленное кэшем время.
+    """
+    return {**_stats, "size": len(_cache)}
+
+
+def clear_cache():
+    _cache.clear()
+    _stats.update(hits=0, misses=0, compile_time=0.0, saved_time=0.0)
+
+
+def _lookup(key):
+    compiled = _cache.get(key)
+    if compiled is not None:
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        _stats["saved_time"] += compiled.compile_time
+    return compiled
+
+
+def _store(key, compiled):
+    _cache[key] = compiled
+    _cache.move_to_end(key)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)  # Вытесняем давно не использованное выражение
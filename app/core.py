@@ -0,0 +1,167 @@
+import numpy as np
+
+from app.bfgs import bfgs, lbfgs
+from app.compiler import compile_expression
+from app.hooke_jeeves import hooke_jeeves
+from app.nelder_mead import nelder_mead
+from app.newton import newton
+from app.powell import powell
+from app.utils import format_number
+
+# Методы оптимизации по внутренним именам
+METHODS = {
+    "hooke_jeeves": hooke_jeeves,
+    "nelder_mead": nelder_mead,
+    "powell": powell,
+    "bfgs": bfgs,
+    "lbfgs": lbfgs,
+    "newton": newton,
+}
+
+# Названия методов в интерфейсе
+METHOD_TITLES = {
+    "hooke_jeeves": "Хука-Дживса",
+    "nelder_mead": "Нелдера-Мида",
+    "powell": "Пауэлла",
+    "bfgs": "BFGS",
+    "lbfgs": "L-BFGS",
+    "newton": "Ньютона (доверительная область)",
+}
+
+# Параметры методов и их значения по умолчанию
+METHOD_PARAMS = {
+    "hooke_jeeves": {"step_size": 0.5, "step_reduction": 0.5},
+    "nelder_mead": {"alpha": 1.0, "beta": 0.5, "gamma": 2.0},
+    "powell": {},
+    "bfgs": {},
+    "lbfgs": {"memory": 10},
+    "newton": {"radius": 1.0},
+}
+
+# Градиентные методы и нужные им производные выражения
+GRADIENT_METHODS = {
+    "bfgs": ("grad",),
+    "lbfgs": ("grad",),
+    "newton": ("grad", "hess"),
+}
+GRADIENT_FALLBACK = "nelder_mead"  # Метод прямого поиска для недифференцируемых выражений
+
+# Параметры, общие для всех методов (передаются и методу прямого поиска при откате)
+COMMON_PARAMS = ("callback", "max_evals", "max_time", "f_target", "stall_window", "stall_tol")
+
+
+def get_method_name(method):
+    """
+    Внутреннее имя метода по имени или названию из интерфейса.
+    """
+    if method in METHODS:
+        return method
+    for name, title in METHOD_TITLES.items():
+        if title == method:
+            return name
+    raise ValueError("Не выбран метод оптимизации")
+
+
+def get_function(input_expr):
+    """
+    Разбор выражения функции.
+
+    :param input_expr: Строка выражения.
+    :return: Выражение sympy и имена переменных, упорядоченные по алфавиту.
+    """
+    compiled = compile_expression(input_expr)
+    return compiled.expr, compiled.param_names
+
+
+def get_x0(params, input_x0):
+    """
+    Разбор начальной точки из строки с координатами через пробел или запятую.
+
+    :param params: Переменные функции.
+    :param input_x0: Строка координат.
+    :return: Начальная точка (numpy массив).
+    """
+    x0 = [float(value) for value in input_x0.replace(",", " ").split()]
+    if len(x0) != len(params):
+        raise ValueError(f"Ожидалось координат начальной точки: {len(params)}, получено: {len(x0)}")
+    return np.array(x0)
+
+
+def run_method(method, func, x0, tol=1e-6, max_iter=1000, expression=None, **method_params):
+    """
+    Запуск метода оптимизации по имени.
+
+    Градиентным методам передаются производные выражения expression (символьные, вычисляемые один раз).
+    Если выражение недифференцируемо или градиент в начальной точке не конечен, вместо градиентного метода
+    запускается метод прямого поиска GRADIENT_FALLBACK; его имя записывается в счетчик fallback результата.
+
+    :param method: Внутреннее имя или название метода.
+    :param func: Целевая функция.
+    :param x0: Начальная точка.
+    :param tol: Точность ε (эпсилон).
+    :param max_iter: Максимальное число итераций.
+    :param expression: CompiledExpression функции (None - градиентные методы используют конечные разности).
+    :param method_params: Параметры метода (а также callback).
+    :return: OptimizeResult.
+    """
+    name = get_method_name(method)
+    x0 = np.array(x0, dtype=float)
+    if name in GRADIENT_METHODS and expression is not None:
+        derivatives = {"grad": lambda: expression.gradient, "hess": lambda: expression.hessian}
+        if expression.differentiable:
+            for key in GRADIENT_METHODS[name]:
+                method_params.setdefault(key, derivatives[key]())
+        if not expression.differentiable or not np.all(np.isfinite(method_params["grad"](*x0))):
+            params = {key: value for key, value in method_params.items() if key in COMMON_PARAMS}
+            result = METHODS[GRADIENT_FALLBACK](func, x0, tol=tol, max_iter=max_iter, **params)
+            result.counters["fallback"] = GRADIENT_FALLBACK
+            return result
+    return METHODS[name](func, x0, tol=tol, max_iter=max_iter, **method_params)
+
+
+def solve(input_expr, input_x0, method, tol=1e-6, max_iter=1000, history=None, warm_start=False, separate=False,
+          **method_params):
+    """
+    Решение задачи, заданной строками выражения и начальной точки.
+
+    :param history: HistoryStore: результат такого же задания берется из истории, новый результат записывается.
+    :param warm_start: Начинать поиск с сохраненного в истории оптимума, ближайшего к начальной точке.
+    :param separate: Разбить сумму слагаемых без общих переменных на независимые подзадачи (app.separable);
+                     параметр workers тогда задает число процессов для подзадач (см. solve_separable).
+    :return: OptimizeResult.
+    """
+    from app.separable import solve_separable  # app.separable сам использует run_method этого модуля
+
+    compiled = compile_expression(input_expr)
+    x0 = get_x0(compiled.params, input_x0) if isinstance(input_x0, str) else input_x0
+
+    def run(x_start):
+        if separate:
+            return solve_separable(compiled, x_start, method, tol=tol, max_iter=max_iter, **method_params)
+        return run_method(method, compiled.func, x_start, tol=tol, max_iter=max_iter, expression=compiled,
+                          **method_params)
+
+    if history is None:
+        return run(x0)
+
+    method = get_method_name(method)
+    params = {"tol": tol, "max_iter": max_iter, **method_params}
+    if warm_start:
+        params["warm_start"] = True
+    if separate:
+        params["separate"] = True
+    result = history.lookup(compiled, x0, method, params)
+    if result is None:
+        start = history.nearest(compiled, x0) if warm_start else None
+        result = run(x0 if start is None else start)
+        history.save_result(compiled, x0, method, params, result)
+    return result
+
+
+def format_point(param_names, point):
+    return "\n".join([f"{param}={format_number(val)}" for param, val in zip(param_names, point)])
+
+
+def format_parameters(tol, max_iter, method_params):
+    return f"ε = {tol}\nmax k = {max_iter}\n" + "\n".join(
+        [f"{key} = {value}" for key, value in method_params.items()])
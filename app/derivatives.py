@@ -0,0 +1,37 @@
+import numpy as np
+
+FD_STEP = 1e-6  # Относительный шаг центральных разностей для градиента
+FD_HESSIAN_STEP = 1e-5  # Относительный шаг центральных разностей для матрицы Гессе
+
+
+def numerical_gradient(func, x, step=FD_STEP):
+    """
+    Градиент центральными разностями (2n вычислений функции).
+
+    Нужен, когда функция задана не выражением sympy (например, в бенчмарке).
+    """
+    x = np.asarray(x, dtype=float)
+    gradient = np.empty(len(x))
+    for i in range(len(x)):
+        h = step * max(1.0, abs(x[i]))
+        x_plus, x_minus = x.copy(), x.copy()
+        x_plus[i] += h
+        x_minus[i] -= h
+        gradient[i] = (func(*x_plus) - func(*x_minus)) / (2 * h)
+    return gradient
+
+
+def numerical_hessian(grad, x, step=FD_HESSIAN_STEP):
+    """
+    Матрица Гессе центральными разностями градиента (2n вычислений градиента), симметризованная.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    hessian = np.empty((n, n))
+    for i in range(n):
+        h = step * max(1.0, abs(x[i]))
+        x_plus, x_minus = x.copy(), x.copy()
+        x_plus[i] += h
+        x_minus[i] -= h
+        hessian[i] = (grad(*x_plus) - grad(*x_minus)) / (2 * h)
+    return (hessian + hessian.T) / 2
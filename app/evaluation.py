@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+from time import perf_counter
+
+import numpy as np
+
+from app.result import MAX_EVALS, MAX_TIME
+
+
+class BudgetExhausted(Exception):
+    """
+    Исчерпан бюджет вычислений или времени; reason - причина остановки (MAX_EVALS или MAX_TIME).
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Evaluator:
+    """
+    Обёртка над целевой функцией с ограниченным LRU-кэшем значений.
+
+    Ключом кэша служит точка целиком (кортеж координат), поэтому каждая
+    различная точка вычисляется только один раз, пока она не вытеснена из кэша.
+    Метод batch вычисляет сразу массив точек одним векторизованным вызовом.
+
+    :param func: Целевая функция, принимающая координаты точки как отдельные аргументы.
+    :param maxsize: Максимальное число точек в кэше (0 отключает кэширование).
+    """
+
+    def __init__(self, func, maxsize=1024):
+        self.func = func
+        self.maxsize = maxsize
+        self.hits = 0  # Число обращений, обслуженных кэшем
+        self.misses = 0  # Число обращений, потребовавших вычисления функции
+        self.vectorized = True  # Сбрасывается, если функция не принимает массивы
+        self.max_nfev = None  # Предел числа вычислений (см. Stopping)
+        self.deadline = None  # Момент perf_counter, после которого вычисления запрещены
+        self._cache = OrderedDict()
+
+    @property
+    def nfev(self):
+        """
+        Число фактических вычислений целевой функции.
+        """
+        return self.misses
+
+    def __call__(self, *args):
+        key = tuple(map(float, args))
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)  # Отмечаем точку как недавно использованную
+            return cache[key]
+
+        self._check_budget(1)
+        self.misses += 1
+        value = self.func(*args)
+        self._store(key, value)
+        return value
+
+    def batch(self, points):
+        """
+        Вычисление функции сразу в нескольких точках.
+
+        Точки, уже находящиеся в кэше, берутся из него, остальные вычисляются
+        одним вызовом func над столбцами массива (sympy.lambdify поддерживает массивы numpy).
+
+        :param points: Массив точек размерности (m, n).
+        :return: Массив значений функции длины m.
+        """
+        points = np.asarray(points, dtype=float)
+        values = np.empty(len(points))
+        cache = self._cache
+        pending = {}  # Ключ точки -> индексы строк, в которых она встречается
+        for i, key in enumerate(map(tuple, points.tolist())):
+            if key in cache:
+                self.hits += 1
+                cache.move_to_end(key)
+                values[i] = cache[key]
+            elif key in pending:
+                self.hits += 1  # Повтор точки внутри одного пакета
+                pending[key].append(i)
+            else:
+                pending[key] = [i]
+
+        if pending:
+            self._check_budget(len(pending))
+            self.misses += len(pending)
+            rows = [indices[0] for indices in pending.values()]
+            computed = self._evaluate_many(points[rows])
+            for (key, indices), value in zip(pending.items(), computed):
+                values[indices] = value
+                self._store(key, value)
+        return values
+
+    def concurrent(self, points, executor, stop_below=None):
+        """
+        Вычисление функции в нескольких точках параллельно на пуле потоков или процессов.
+
+        Точки из кэша не вычисляются; остальные отправляются в executor, а результаты
+        записываются в кэш в вызывающем потоке, поэтому кэш остается однопоточным.
+
+        :param points: Массив точек размерности (m, n).
+        :param executor: concurrent.futures.Executor (для пула процессов функция должна сериализоваться pickle).
+        :param stop_below: Если задано, вычисление прекращается на первом значении меньше stop_below:
+                           еще не начатые вычисления отменяются.
+        :return: Массив значений функции длины m (nan для точек, вычисление которых отменено).
+        """
+        points = np.asarray(points, dtype=float)
+        values = np.full(len(points), np.nan)
+        cache = self._cache
+        pending = {}  # Ключ точки -> индексы строк, в которых она встречается
+        for i, key in enumerate(map(tuple, points.tolist())):
+            if key in cache:
+                self.hits += 1
+                cache.move_to_end(key)
+                values[i] = cache[key]
+            elif key in pending:
+                self.hits += 1
+                pending[key].append(i)
+            else:
+                pending[key] = [i]
+        if stop_below is not None and np.nanmin(values, initial=np.inf) < stop_below:
+            return values  # Улучшение уже найдено в кэше
+
+        if pending:
+            self._check_budget(len(pending))
+            futures = {executor.submit(self.func, *key): key for key in pending}
+            self.misses += len(futures)
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, return_when=FIRST_COMPLETED)
+                improved = False
+                for future in done:
+                    key = futures[future]
+                    value = future.result()
+                    values[pending[key]] = value
+                    self._store(key, value)
+                    improved = improved or (stop_below is not None and value < stop_below)
+                if improved:
+                    # Отмененные вычисления не выполнялись и не входят в nfev
+                    self.misses -= sum(future.cancel() for future in not_done)
+                    break
+        return values
+
+    def _check_budget(self, count):
+        """
+        Проверка, что еще count вычислений укладываются в бюджет.
+        """
+        if self.max_nfev is not None and self.misses + count > self.max_nfev:
+            raise BudgetExhausted(MAX_EVALS)
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise BudgetExhausted(MAX_TIME)
+
+    def _evaluate_many(self, points):
+        """
+        Векторизованное вычисление функции с откатом на поточечный цикл.
+        """
+        if self.vectorized:
+            try:
+                values = np.asarray(self.func(*points.T), dtype=float)
+                # Для константных выражений lambdify возвращает скаляр
+                return np.broadcast_to(values, (len(points),))
+            except (TypeError, ValueError):
+                # Функция написана для скаляров (math.*, ветвления по значению и т.п.)
+                self.vectorized = False
+        return np.array([self.func(*point) for point in points], dtype=float)
+
+    def _store(self, key, value):
+        if self.maxsize > 0:
+            cache = self._cache
+            cache[key] = value
+            if len(cache) > self.maxsize:
+                cache.popitem(last=False)  # Вытесняем давно не использованную точку
+
+    def snapshot(self):
+        """
+        Кэш и счетчики для контрольной точки (см. Checkpoint).
+        """
+        return {"cache": list(self._cache.items()), "hits": self.hits, "misses": self.misses,
+                "vectorized": self.vectorized}
+
+    def restore(self, snapshot):
+        """
+        Восстановление кэша и счетчиков из snapshot.
+        """
+        self._cache = OrderedDict(snapshot["cache"])
+        self.hits, self.misses, self.vectorized = snapshot["hits"], snapshot["misses"], snapshot["vectorized"]
+
+    def clear(self):
+        """
+        Очистка кэша и сброс счетчиков.
+        """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def as_evaluator(func):
+    """
+    Возвращает func, если это уже Evaluator, иначе оборачивает её в Evaluator.
+
+    Так вызывающий код может передать свой Evaluator и после оптимизации прочитать его счетчики.
+    """
+    if isinstance(func, Evaluator):
+        return func
+    return Evaluator(func)
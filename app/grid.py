@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+import numpy as np
+
+GRID_CACHE_SIZE = 16  # Максимальное число сохраненных сеток (сетка 500x500 занимает ~2 МБ)
+
+_grid_cache = OrderedDict()
+
+
+def evaluate_on_grid(func, x0, indices, axes):
+    """
+    Вычисление функции на сетке одним векторизованным вызовом.
+
+    Выбранные переменные заменяются массивами сетки, остальные фиксируются значениями из x0,
+    после чего numpy распространяет вычисление на все узлы сетки.
+
+    :param func: Целевая функция, принимающая координаты как отдельные аргументы.
+    :param x0: Точка, задающая значения невыбранных переменных.
+    :param indices: Индексы выбранных переменных.
+    :param axes: Массивы значений выбранных переменных (одинаковой формы).
+    :return: Массив значений функции той же формы, что и axes.
+    """
+    args = [float(value) for value in x0]
+    for idx, axis in zip(indices, axes):
+        args[idx] = axis
+    shape = np.shape(axes[0])
+    try:
+        values = np.asarray(func(*args), dtype=float)
+    except (TypeError, ValueError):
+        # Функция не поддерживает массивы: вычисляем поэлементно
+        values = np.vectorize(func, otypes=[float])(*args)
+    # Если выражение не зависит от выбранных переменных, результат скалярный
+    return np.array(np.broadcast_to(values, shape))
+
+
+def compute_grid(func, x0, indices, bounds, resolution, key=None):
+    """
+    Построение сетки для графика функции одной или двух переменных с кэшированием.
+
+    :param func: Целевая функция.
+    :param x0: Точка, задающая значения невыбранных переменных.
+    :param indices: Индексы одной или двух выбранных переменных.
+    :param bounds: Границы (min, max) по каждой выбранной переменной.
+    :param resolution: Число узлов сетки по каждой оси.
+    :param key: Ключ выражения (например, строка функции); если задан, сетка кэшируется.
+    :return: Кортеж (оси сетки..., значения функции).
+    """
+    indices = tuple(indices)
+    bounds = tuple((float(low), float(high)) for low, high in bounds)
+    # Выбранные координаты на результат не влияют, поэтому в ключ входят только фиксированные
+    fixed = tuple(float(value) for i, value in enumerate(x0) if i not in indices)
+    cache_key = (key, indices, fixed, bounds, int(resolution))
+    if key is not None and cache_key in _grid_cache:
+        _grid_cache.move_to_end(cache_key)
+        return _grid_cache[cache_key]
+
+    lines = [np.linspace(low, high, int(resolution)) for low, high in bounds]
+    axes = np.meshgrid(*lines) if len(lines) > 1 else lines
+    grid = (*axes, evaluate_on_grid(func, x0, indices, axes))
+
+    if key is not None:
+        _grid_cache[cache_key] = grid
+        if len(_grid_cache) > GRID_CACHE_SIZE:
+            _grid_cache.popitem(last=False)
+    return grid
@@ -0,0 +1,154 @@
+import json
+import numbers
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import sympy as sp
+
+from app.result import CALLBACK, MAX_TIME, OptimizeResult
+
+# Файл истории по умолчанию (можно переопределить переменной окружения)
+DEFAULT_HISTORY = os.environ.get("ZERO_OPTIMIZATION_HISTORY",
+                                 str(Path.home() / ".zero-optimization" / "history.sqlite3"))
+NOT_REUSABLE = (CALLBACK, MAX_TIME)  # Результаты, зависящие не только от задания
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    expression TEXT NOT NULL,
+    source TEXT NOT NULL,
+    method TEXT NOT NULL,
+    params TEXT NOT NULL,
+    x0 TEXT NOT NULL,
+    x TEXT NOT NULL,
+    value REAL NOT NULL,
+    iterations INTEGER NOT NULL,
+    nfev INTEGER NOT NULL,
+    time REAL NOT NULL,
+    reason TEXT NOT NULL,
+    message TEXT NOT NULL,
+    counters TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_job ON runs (expression, method, params, x0);
+CREATE INDEX IF NOT EXISTS runs_expression_value ON runs (expression, value);
+"""
+
+
+class HistoryStore:
+    """
+    История запусков в базе SQLite.
+
+    Задание определяется нормализованным выражением (sympy.srepr, поэтому эквивалентные записи совпадают),
+    методом, параметрами и начальной точкой; индекс по этим полям позволяет сразу найти
+    результат повторного запуска, а индекс по выражению - сохраненные оптимумы для теплого старта.
+
+    :param path: Путь к файлу базы (":memory:" - база в памяти).
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def lookup(self, compiled, x0, method, params):
+        """
+        Результат такого же задания, если он уже есть в истории.
+
+        :param compiled: CompiledExpression целевой функции.
+        :param x0: Начальная точка.
+        :param method: Внутреннее имя метода.
+        :param params: Параметры запуска (tol, max_iter, параметры метода).
+        :return: OptimizeResult или None.
+        """
+        row = self.connection.execute(
+            "SELECT * FROM runs WHERE expression = ? AND method = ? AND params = ? AND x0 = ? "
+            f"AND reason NOT IN ({', '.join('?' * len(NOT_REUSABLE))}) ORDER BY id DESC LIMIT 1",
+            (_expression_key(compiled), method, _params_key(params), _point_key(x0), *NOT_REUSABLE)).fetchone()
+        if row is None:
+            return None
+        return OptimizeResult(np.array(json.loads(row["x"])), row["value"], row["iterations"], nfev=row["nfev"],
+                              time=row["time"], reason=row["reason"], counters=json.loads(row["counters"]))
+
+    def nearest(self, compiled, x0):
+        """
+        Сохраненный оптимум выражения, ближайший к x0 (для теплого старта).
+
+        :return: Точка (numpy массив) или None, если выражение еще не решалось.
+        """
+        rows = self.connection.execute(
+            "SELECT DISTINCT x FROM runs WHERE expression = ? AND reason != ?",
+            (_expression_key(compiled), CALLBACK)).fetchall()
+        if not rows:
+            return None
+        points = np.array([json.loads(row["x"]) for row in rows])
+        return points[np.argmin(np.linalg.norm(points - np.asarray(x0, dtype=float), axis=1))]
+
+    def save(self, compiled, x0, method, params, x, value, iterations, nfev=0, time=0.0, reason="", message="",
+             counters=None):
+        """
+        Запись результата запуска.
+
+        :return: Идентификатор записи.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (created, expression, source, method, params, x0, x, value, iterations, nfev, "
+                "time, reason, message, counters) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), _expression_key(compiled), compiled.source, method,
+                 _params_key(params), _point_key(x0), _point_key(x), float(value), int(iterations), int(nfev),
+                 float(time), reason, message, json.dumps(counters or {})))
+        return cursor.lastrowid
+
+    def save_result(self, compiled, x0, method, params, result):
+        """
+        Запись OptimizeResult.
+        """
+        return self.save(compiled, x0, method, params, result.x, result.fun, result.nit, nfev=result.nfev,
+                         time=result.time, reason=result.reason, message=result.message, counters=result.counters)
+
+    def records(self, limit=1000):
+        """
+        Последние записи истории, новые первыми.
+
+        :return: Список словарей с полями записи (params, x0 и x разобраны из JSON).
+        """
+        rows = self.connection.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        records = []
+        for row in rows:
+            record = dict(row)
+            for field in ("params", "x0", "x", "counters"):
+                record[field] = json.loads(record[field])
+            records.append(record)
+        return records
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def _expression_key(compiled):
+    return sp.srepr(compiled.expr)
+
+
+def _params_key(params):
+    # В ключ входят числовые и строковые параметры; объекты (callback, trace) на результат не влияют.
+    # Числа приводятся к float, чтобы max_iter=1000 и max_iter=1000.0 давали один ключ
+    key = {}
+    for name, value in params.items():
+        if isinstance(value, bool) or isinstance(value, str):
+            key[name] = value
+        elif isinstance(value, numbers.Real):
+            key[name] = float(value)
+    return json.dumps(key, sort_keys=True)
+
+
+def _point_key(point):
+    return json.dumps([float(value) for value in point])
@@ -1,75 +1,294 @@
-import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
-logger = logging.getLogger(__name__)
+from app.optimizer import Optimizer, run_optimizer
+from app.result import CALLBACK, CONVERGED, MAX_ITER
+from app.trace import ITERATION, PROBE
+from app.utils import available_cpus
 
+POLLS = ("complete", "opportunistic")  # Режимы параллельного исследующего поиска
 
-def hooke_jeeves(func, x0, step_size=0.5, step_reduction=0.5, tol=1e-6, max_iter=1000):
+
+class HookeJeeves(Optimizer):
     """
-    Реализация метода Хука-Дживса для минимизации.
+    Метод Хука-Дживса в виде пошагового оптимизатора (ask/tell, см. Optimizer).
 
-    :param func: Целевая функция.
-    :param x0: Начальная точка.
-    :param step_size: Начальный шаг.
-    :param step_reduction: Коэффициент уменьшения шага.
-    :param tol: Точность ε (эпсилон).
-    :param max_iter: Максимальное число итераций.
-    :return: Оптимальная точка и значение функции в этой точке.
+    Параметры - как у hooke_jeeves. Исследующий поиск запрашивает пробные точки по одной,
+    в режиме batch или poll - все 2n пробных точек одним запросом. Значение в текущей точке
+    запрашивается, только если оно еще не известно. Перезапуск возвращает поиск в лучшую найденную
+    точку с начальным шагом.
     """
 
-    def explore(x, step):
+    name = "hooke_jeeves"
+
+    def __init__(self, x0, step_size=0.5, step_reduction=0.5, tol=1e-6, max_iter=1000, batch=False, poll=None,
+                 surrogate=None, trace=None, restarts=0, restart_window=None):
+        if poll is not None and poll not in POLLS:
+            raise ValueError(f"Неизвестный режим poll: {poll}")
+        super().__init__(surrogate, trace, restarts, restart_window)
+        self.step_size = step_size
+        self.restart_step = step_size  # Шаг после перезапуска
+        self.step_reduction = step_reduction
+        self.tol = tol
+        self.max_iter = max_iter
+        self.batch = batch
+        self.poll = poll
+        self.counters = {"explore": 0, "explore_nfev": 0, "pattern": 0, "reduce": 0}
+        if restarts:
+            self.counters["restarts"] = 0
+
+        # Все рабочие массивы выделяются один раз и дальше изменяются на месте
+        self.x_base = np.array(x0, dtype=float)  # Базовая точка
+        n = len(self.x_base)
+        self.x_opt = np.copy(self.x_base)  # Оптимальная точка, начинаем с x0
+        self.value_opt = None  # Значение в x_opt, если оно уже известно
+        self.x_best, self.value_best = np.copy(self.x_base), np.inf  # Лучшая точка среди найденных исследующим поиском
+        self._point = np.empty(n)  # Результат исследующего поиска
+        self._difference, self._bound, self._mask = np.empty(n), np.empty(n), np.empty(n, dtype=bool)
+        self._probes = None  # Пробные точки пакетного и параллельного поиска
+        if poll is not None:
+            self._probes = np.empty((2 * n + 1, n))
+        elif batch:
+            self._probes = np.empty((2 * n, n))
+
+    def _iterate(self):
+        while self.step_size > self.tol and self.nit < self.max_iter:
+            # 2. Исследующий поиск: пытаемся найти улучшение вдоль каждой координаты
+            nfev_before = self.nfev
+            if self.poll is not None:
+                x_new, value_new = yield from self._explore_poll(self.x_opt, self.step_size)
+            elif self.batch:
+                x_new, value_new = yield from self._explore_batch(self.x_opt, self.step_size)
+            else:
+                x_new, value_new = yield from self._explore(self.x_opt, self.step_size)
+            self.counters["explore"] += 1
+            self.counters["explore_nfev"] += self.nfev - nfev_before
+            if self.trace is not None:
+                self.trace.record(x_new, value_new, self.step_size, ITERATION)
+            if value_new < self.value_best:
+                self.x_best[:] = x_new
+                self.value_best = value_new
+
+            # 3. Если улучшений нет, уменьшаем шаг
+            proposal = None
+            if self.surrogate is not None and self._unchanged(x_new, self.x_opt):
+                # Исследующий поиск окружил точку пробами: минимум модели проверяется до уменьшения шага
+                proposal = yield from self._surrogate_step(self.x_opt, value_new, self.step_size)
+            if proposal is not None:
+                # Переходим в точку модели; шаг - длина перехода, что пропускает промежуточные уменьшения
+                x_new, value_new = proposal
+                self.step_size = min(self.step_size, max(np.linalg.norm(x_new - self.x_opt), self.tol))
+                self.x_opt[:] = x_new
+                self.x_base[:] = x_new
+                self.x_best[:] = x_new
+                self.value_opt = self.value_best = value_new
+            elif self._unchanged(x_new, self.x_opt):
+                self.step_size = self.step_size * self.step_reduction  # Уменьшаем шаг
+                self.counters["reduce"] += 1
+            else:
+                # 4. Поиск по образцу: перемещаемся в направлении улучшения
+                np.subtract(x_new, self.x_base, out=self.x_opt)  # Делаем шаг в направлении улучшения:
+                self.x_opt += x_new  # x_opt = x_new + (x_new - x_base)
+                self.x_base[:] = x_new  # Обновляем базовую точку
+                self.value_opt = None
+                self.counters["pattern"] += 1
+
+            if self.restarts and self._restart_due(self.value_best, self.step_size <= self.tol):
+                # Шаг уменьшился до точности или поиск застрял: продолжаем из лучшей точки с начальным шагом
+                self.x_opt[:] = self.x_best
+                self.x_base[:] = self.x_best
+                self.value_opt = self.value_best
+                self.step_size = self.restart_step
+
+            # Увеличиваем счетчик итераций
+            self.nit += 1
+            self.x, self.fun = x_new.copy(), value_new  # x_new может быть буфером исследующего поиска
+            yield None
+        self.reason = CONVERGED if self.step_size <= self.tol else MAX_ITER
+
+    def _finish(self):
+        if self.reason not in (CONVERGED, MAX_ITER, CALLBACK) or self.restarts and (
+                self.value_opt is None or self.value_best < self.value_opt):
+            # Остановка по бюджету или критерию (с перезапусками - всегда): лучшая точка с известным значением
+            self.x_opt, self.value_opt = self.x_best, self.value_best
+        # 5. Оптимальные параметры и значение функции
+        if self.value_opt is None or self.value_opt == np.inf:
+            self.value_opt = (yield self.x_opt[np.newaxis])[0]
+        self.x, self.fun = self.x_opt, self.value_opt
+
+    def _value_opt(self, x):
+        """
+        Значение в текущей точке x (= x_opt): запрашивается, только если еще не известно.
+        """
+        if self.value_opt is None:
+            self.value_opt = (yield x[np.newaxis])[0]
+        return self.value_opt
+
+    def _explore(self, x, step):
         """
         Исследующий поиск: пробуем перемещаться вдоль каждой переменной в положительном и отрицательном направлениях.
+        Пробные точки строятся в буфере point изменением одной координаты на месте.
         """
-        logger.debug(f"Исследующий поиск для {x} с шагом {step}")
-        for i in range(len(x)):
-            logger.debug(f"Для x{i}={x[i]}")
+        point = self._point
+        request = point[np.newaxis]  # Запрос одной пробной точки - представление буфера point
+        value = yield from self._value_opt(x)
+        point[:] = x
+        for i in range(len(point)):
             # Движение в положительном/отрицательном направлении
             for direction in [1, -1]:
-                logger.debug(f"Направление {direction}")
-                x_new = np.copy(x)  # Создаем копию текущей точки
-                x_new[i] += direction * step  # Изменяем координату в текущем направлении
-                logger.debug(f"Сдвиг {x_new[i]}")
-                value = func(*x)
-                value_new = func(*x_new)
+                previous = point[i]
+                point[i] += direction * step  # Изменяем координату в текущем направлении
+                value_new = (yield request)[0]
+                if self.trace is not None:
+                    self.trace.record(point, value_new, step, PROBE)
                 # Проверяем, улучшилась ли функция
                 if value_new < value:
-                    logger.debug(f"Есть улучшение: {value_new} < {value}")
-                    x = x_new  # Обновляем текущую точку
+                    value = value_new  # Оставляем сдвиг
                 else:
-                    logger.debug(f"Нет улучшения: {value_new} >= {value}")
-        return x
-
-    # 1. Инициализация: задаем начальную точку, шаг, и счетчик итераций
-    x_base = np.array(x0, dtype=float)  # Начальная точка
-    x_opt = np.copy(x_base)  # Оптимальная точка, начинаем с x0
-    count_iter = 0  # Счетчик итераций
-
-    while step_size > tol and count_iter < max_iter:
-        # Логируем текущее состояние перед исследующим поиском
-        logger.debug(
-            f"Итерация #{count_iter}: шаг={step_size}"
-            f", f({', '.join(str(arg) for arg in x_opt)}) = {func(*x_opt)}"
-        )
-
-        # 2. Исследующий поиск: пытаемся найти улучшение вдоль каждой координаты
-        x_new = explore(x_opt, step_size)
-
-        # 3. Если улучшений нет, уменьшаем шаг
-        if np.allclose(x_new, x_opt):
-            new_step = step_size * step_reduction  # Уменьшаем шаг
-            logger.debug(f"Улучшений не найдено, уменьшаем шаг до {new_step}")
-            step_size = new_step
+                    point[i] = previous  # Возвращаем координату
+        return point, value
+
+    def _explore_batch(self, x, step):
+        """
+        Исследующий поиск с одновременным вычислением всех 2n пробных точек вокруг x.
+        По каждой координате выбирается лучшее направление, затем улучшающие сдвиги объединяются.
+        """
+        point, probes = self._point, self._probes
+        n = len(point)
+        coords = np.arange(n)
+        probes[:] = x
+        probes[2 * coords, coords] += step  # Положительные сдвиги
+        probes[2 * coords + 1, coords] -= step  # Отрицательные сдвиги
+        values = np.asarray((yield probes), dtype=float)
+        if self.trace is not None:
+            for probe, probe_value in zip(probes, values):
+                self.trace.record(probe, probe_value, step, PROBE)
+        values = values.reshape(n, 2)
+        value = yield from self._value_opt(x)
+        point[:] = x
+
+        best_directions = np.argmin(values, axis=1)
+        best_values = values[coords, best_directions]
+        improved = best_values < value
+        if not improved.any():
+            return point, value
+
+        point[improved] += np.where(best_directions == 0, step, -step)[improved]
+        if np.count_nonzero(improved) == 1:
+            return point, best_values.min()
+        value_new = (yield point[np.newaxis])[0]
+        if value_new >= best_values.min():
+            # Совместный сдвиг хуже лучшей пробы: берем лучшую одиночную пробу
+            point[:] = probes[np.argmin(values)]
+            return point, best_values.min()
+        return point, value_new
+
+    def _explore_poll(self, x, step):
+        """
+        Параллельный исследующий поиск: 2n пробных точек вокруг x запрашиваются одним запросом,
+        в режиме "opportunistic" - с разрешением прекратить вычисления на первом улучшении.
+        """
+        point, probes = self._point, self._probes
+        n = len(point)
+        coords = np.arange(n)
+        probes[:] = x  # Последняя строка - сама точка x
+        probes[2 * coords, coords] += step
+        probes[2 * coords + 1, coords] -= step
+        if self.poll == "opportunistic":
+            value = yield from self._value_opt(x)  # Значение в x нужно раньше проб, чтобы распознать улучшение
+            self.stop_below = value
+            values = np.asarray((yield probes[:-1]), dtype=float)
+            self.stop_below = None
+        elif self.value_opt is None:
+            # Точка x вычисляется вместе с пробами: весь поиск занимает одно "время вычисления"
+            values = np.asarray((yield probes), dtype=float)
+            self.value_opt = value = values[-1]
+            values = values[:-1]
         else:
-            # 4. Поиск по образцу: перемещаемся в направлении улучшения
-            logger.debug(f"Найдено улучшение: перемещение из {x_base} в {x_new}")
-            x_opt = x_new + (x_new - x_base)  # Делаем шаг в направлении улучшения
-            x_base = np.copy(x_new)  # Обновляем базовую точку
+            value = self.value_opt
+            values = np.asarray((yield probes[:-1]), dtype=float)
+        if self.trace is not None:
+            for probe, probe_value in zip(probes, values):
+                if not np.isnan(probe_value):
+                    self.trace.record(probe, probe_value, step, PROBE)
+        best = np.nanargmin(values)
+        if values[best] < value:
+            point[:] = probes[best]
+            return point, values[best]
+        point[:] = x
+        return point, value
+
+    def _unchanged(self, a, b):
+        """
+        np.allclose(a, b) без временных массивов: |a - b| <= atol + rtol * |b|.
+        """
+        difference, bound = self._difference, self._bound
+        np.subtract(a, b, out=difference)
+        np.abs(difference, out=difference)
+        np.abs(b, out=bound)
+        np.multiply(bound, 1e-5, out=bound)
+        np.add(bound, 1e-8, out=bound)
+        return np.less_equal(difference, bound, out=self._mask).all()
+
 
-        # Увеличиваем счетчик итераций
-        count_iter += 1
+def hooke_jeeves(func, x0, step_size=0.5, step_reduction=0.5, tol=1e-6, max_iter=1000, batch=False,
+                 callback=None, trace=None, max_evals=None, max_time=None, f_target=None, stall_window=None,
+                 stall_tol=1e-8, poll=None, workers=None, executor=None, surrogate=None, checkpoint=None,
+                 restarts=0, restart_window=None):
+    """
+    Реализация метода Хука-Дживса для минимизации (цикл над пошаговым оптимизатором HookeJeeves).
 
-    # 5. Возвращаем оптимальные параметры и значение функции
-    logger.debug(f"Оптимизация завершена: f({', '.join(str(arg) for arg in x_opt)}) = {func(*x_opt)}")
-    return x_opt, func(*x_opt), count_iter
+    :param func: Целевая функция (или Evaluator, чтобы получить счетчики вычислений).
+    :param x0: Начальная точка.
+    :param step_size: Начальный шаг.
+    :param step_reduction: Коэффициент уменьшения шага.
+    :param tol: Точность ε (эпсилон).
+    :param max_iter: Максимальное число итераций.
+    :param batch: Вычислять все 2n пробных точек исследующего поиска одним векторизованным вызовом.
+    :param callback: Функция callback(k, x, value), вызываемая после каждой итерации с лучшей найденной точкой;
+                     если она возвращает True, поиск останавливается.
+    :param trace: Trace для записи пробных точек, значений и шагов (None - трасса не ведется).
+    :param max_evals: Максимальное число вычислений функции.
+    :param max_time: Максимальное время работы, с.
+    :param f_target: Целевое значение функции.
+    :param stall_window: Число итераций без улучшения, после которого поиск останавливается.
+    :param stall_tol: Относительное улучшение, которое считается улучшением (см. Stopping).
+    :param poll: Параллельный исследующий поиск для дорогих функций: "complete" - все 2n пробных точек
+                 вычисляются одновременно и берется лучшая, "opportunistic" - берется первое найденное улучшение,
+                 остальные вычисления отменяются (результат может зависеть от порядка их завершения).
+    :param workers: Число потоков для poll (по умолчанию число доступных ядер).
+    :param executor: Свой пул для poll вместо пула потоков (например, ProcessPoolExecutor для функций,
+                     удерживающих GIL; функция должна сериализоваться pickle).
+    :param surrogate: Модель для дорогих функций ("quadratic", "rbf" или Surrogate): когда исследующий поиск
+                      не нашел улучшения, вычисляется минимум модели в области радиуса, пропорционального шагу;
+                      если он лучше текущей точки, поиск переходит в него с шагом, равным длине перехода.
+    :param checkpoint: Checkpoint или путь к файлу: состояние периодически сохраняется, а если файл уже есть,
+                       поиск продолжается с сохраненного состояния (см. app.checkpoint.resume).
+    :param restarts: Наибольшее число перезапусков: когда шаг уменьшился до tol (или restart_window итераций
+                     нет улучшения), поиск продолжается из лучшей найденной точки с начальным шагом,
+                     если с прошлого перезапуска значение улучшилось. Результат - лучшая найденная точка.
+    :param restart_window: Число итераций без заметного улучшения, после которого поиск перезапускается.
+    :return: OptimizeResult (распаковывается как оптимальная точка, значение функции и число итераций).
+             Счетчики: explore и explore_nfev - число исследующих поисков и вычислений в них,
+             pattern - число шагов по образцу, reduce - число уменьшений шага
+             (с моделью также surrogate_proposed и surrogate_accepted - число предложенных и принятых кандидатов,
+             с перезапусками - restarts).
+    """
+    optimizer = HookeJeeves(x0, step_size, step_reduction, tol, max_iter, batch=batch, poll=poll,
+                            surrogate=surrogate, trace=trace, restarts=restarts, restart_window=restart_window)
+    params = {"x0": optimizer.x_base.copy(), "step_size": step_size, "step_reduction": step_reduction, "tol": tol,
+              "max_iter": max_iter, "batch": batch, "max_evals": max_evals, "max_time": max_time,
+              "f_target": f_target, "stall_window": stall_window, "stall_tol": stall_tol, "poll": poll,
+              "workers": workers, "surrogate": None if optimizer.surrogate is None else optimizer.surrogate.model,
+              "restarts": restarts, "restart_window": restart_window}
+    own_executor = poll is not None and executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=workers or available_cpus())
+    try:
+        return run_optimizer(optimizer, func, callback, max_evals, max_time, f_target, stall_window, stall_tol,
+                             checkpoint=checkpoint, params=params, batch=batch,
+                             executor=executor if poll is not None else None)
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)  # Не ждем вычислений, ставших ненужными
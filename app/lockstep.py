@@ -0,0 +1,238 @@
+from time import perf_counter
+
+import numpy as np
+
+from app.result import CALLBACK, CONVERGED, MAX_ITER, OptimizeResult
+
+
+def _make_objective(func, args, nfev, counters):
+    """
+    Вычисление функции сразу для строк points, принадлежащих экземплярам rows.
+
+    func вызывается один раз над столбцами координат (и столбцами параметров экземпляров args).
+    """
+
+    def evaluate(points, rows):
+        np.add.at(nfev, rows, 1)  # Строки одного экземпляра могут повторяться (вершины симплекса)
+        counters["calls"] += 1
+        extra = () if args is None else args[rows].T
+        values = np.asarray(func(*points.T, *extra), dtype=float)
+        return np.array(np.broadcast_to(values, (len(rows),)))
+
+    return evaluate
+
+
+def _prepare(x0s, args):
+    x0s = np.array(x0s, dtype=float)
+    if x0s.ndim != 2:
+        raise ValueError("Начальные точки должны быть массивом (M, n)")
+    if args is not None:
+        args = np.asarray(args, dtype=float).reshape(len(x0s), -1)
+    return x0s, args
+
+
+def hooke_jeeves_many(func, x0s, step_size=0.5, step_reduction=0.5, tol=1e-6, max_iter=1000, args=None,
+                      callback=None):
+    """
+    Метод Хука-Дживса для M независимых задач одной структуры, выполняемых вместе.
+
+    Состояние всех задач хранится в массивах (M, n) с собственным шагом и признаком завершения
+    для каждой задачи. Каждая пробная точка исследующего поиска вычисляется сразу для всех еще
+    не завершенных задач одним векторизованным вызовом, поэтому вместо M циклов Python выполняется один.
+    Для каждой задачи последовательность точек совпадает с hooke_jeeves.
+
+    :param func: Векторизованная целевая функция func(*координаты, *параметры): аргументы - массивы длины m.
+    :param x0s: Начальные точки, массив (M, n).
+    :param step_size: Начальный шаг (число или массив длины M).
+    :param step_reduction: Коэффициент уменьшения шага.
+    :param tol: Точность ε (эпсилон).
+    :param max_iter: Максимальное число итераций каждой задачи.
+    :param args: Параметры задач, массив (M, k): передаются func после координат.
+    :param callback: Функция callback(k, x, values), вызываемая после каждой общей итерации с массивами (M, n)
+                     и длины M для всех задач: результат последнего исследующего поиска каждой задачи и значение
+                     в нем (у завершенных задач - последние известные, как callback у hooke_jeeves);
+                     если она возвращает True, все задачи останавливаются.
+    :return: OptimizeResult с массивами: x (M, n), fun, nit, nfev и reason длины M.
+             Счетчик calls - число векторизованных вызовов функции.
+    """
+    start_time = perf_counter()
+    x0s, args = _prepare(x0s, args)
+    m, n = x0s.shape
+    nfev = np.zeros(m, dtype=int)
+    counters = {"calls": 0}
+    evaluate = _make_objective(func, args, nfev, counters)
+
+    # 1. Инициализация состояния всех задач
+    x_base = x0s.copy()
+    x_opt = x0s.copy()
+    x_explored, value_explored = x0s.copy(), np.full(m, np.nan)  # Результаты исследующего поиска для callback
+    steps = np.broadcast_to(np.asarray(step_size, dtype=float), (m,)).copy()
+    nit = np.zeros(m, dtype=int)
+    reason = np.full(m, CONVERGED, dtype=object)
+    active = (steps > tol) & (nit < max_iter)
+    iteration = 0
+
+    while active.any():
+        rows = np.flatnonzero(active)
+        step = steps[rows]
+
+        # 2. Исследующий поиск: каждая пробная точка вычисляется сразу для всех активных задач
+        point = x_opt[rows]
+        value = evaluate(point, rows)
+        for i in range(n):
+            for direction in [1, -1]:
+                previous = point[:, i].copy()
+                point[:, i] += direction * step
+                value_new = evaluate(point, rows)
+                improved = value_new < value
+                value = np.where(improved, value_new, value)
+                point[:, i] = np.where(improved, point[:, i], previous)
+
+        x_explored[rows], value_explored[rows] = point, value
+
+        # 3. Задачи без улучшения уменьшают шаг (сравнение как в np.allclose по каждой строке)
+        current = x_opt[rows]
+        unchanged = np.all(np.abs(point - current) <= 1e-8 + 1e-5 * np.abs(current), axis=1)
+        steps[rows[unchanged]] *= step_reduction
+
+        # 4. Остальные делают шаг по образцу
+        moved = rows[~unchanged]
+        x_opt[moved] = point[~unchanged] + (point[~unchanged] - x_base[moved])
+        x_base[moved] = point[~unchanged]
+
+        nit[rows] += 1
+        iteration += 1
+        active = (steps > tol) & (nit < max_iter)
+        reason[(steps > tol) & (nit >= max_iter)] = MAX_ITER
+
+        if callback is not None and callback(iteration, x_explored, value_explored):
+            reason[active] = CALLBACK
+            break
+
+    # 5. Значения функции в итоговых точках всех задач
+    fun = evaluate(x_opt, np.arange(m))
+    return OptimizeResult(x_opt, fun, nit, nfev=nfev, time=perf_counter() - start_time, reason=reason,
+                          counters=counters)
+
+
+def nelder_mead_many(func, x0s, alpha=1.0, beta=0.5, gamma=2.0, tol=1e-6, max_iter=1000, adaptive=False, args=None,
+                     callback=None):
+    """
+    Метод Нелдера-Мида для M независимых задач одной структуры, выполняемых вместе.
+
+    Симплексы всех задач хранятся в массиве (M, n+1, n). На каждой общей итерации отражение вычисляется
+    одним вызовом для всех активных задач, растяжение, сжатие и редукция - одним вызовом для тех задач,
+    которым они нужны.
+
+    :param func: Векторизованная целевая функция func(*координаты, *параметры): аргументы - массивы длины m.
+    :param x0s: Начальные точки, массив (M, n).
+    :param alpha: Коэффициент отражения.
+    :param beta: Коэффициент сжатия.
+    :param gamma: Коэффициент растяжения.
+    :param tol: Точность ε (эпсилон).
+    :param max_iter: Максимальное число итераций каждой задачи.
+    :param adaptive: Использовать коэффициенты, зависящие от размерности (Гао-Хан).
+    :param args: Параметры задач, массив (M, k): передаются func после координат.
+    :param callback: Функция callback(k, x, values), вызываемая после каждой общей итерации с массивами (M, n)
+                     и длины M для всех задач: лучшие вершины и их значения (у завершенных задач - итоговые);
+                     если она возвращает True, все задачи останавливаются.
+    :return: OptimizeResult с массивами: x (M, n), fun, nit, nfev и reason длины M.
+             Счетчики: calls - число векторизованных вызовов функции, reflect, expand, contract, shrink.
+    """
+    start_time = perf_counter()
+    x0s, args = _prepare(x0s, args)
+    m, n = x0s.shape
+    nfev = np.zeros(m, dtype=int)
+    counters = {"calls": 0, "reflect": 0, "expand": 0, "contract": 0, "shrink": 0}
+    evaluate = _make_objective(func, args, nfev, counters)
+    delta = 0.5
+    if adaptive:
+        dim = max(n, 2)
+        alpha, gamma, beta, delta = 1.0, 1 + 2 / dim, 0.75 - 1 / (2 * dim), 1 - 1 / dim
+
+    # 1. Начальные симплексы: x0 и сдвиги на 1 по каждой координате
+    simplices = np.repeat(x0s[:, np.newaxis, :], n + 1, axis=1)
+    simplices[:, np.arange(1, n + 1), np.arange(n)] += 1.0
+    vertex_rows = np.repeat(np.arange(m), n + 1)
+    values = evaluate(simplices.reshape(-1, n), vertex_rows).reshape(m, n + 1)
+    nit = np.zeros(m, dtype=int)
+    reason = np.full(m, MAX_ITER, dtype=object)
+    active = nit < max_iter
+    iteration = 0
+
+    while active.any():
+        rows = np.flatnonzero(active)
+        k = len(rows)
+        local = np.arange(k)
+        simplex, vals = simplices[rows], values[rows]
+
+        # 2. Лучшая, вторая с конца и худшая вершины каждой задачи
+        order = np.argsort(vals, axis=1, kind="stable")
+        best, second_worst, worst = order[:, 0], order[:, -2], order[:, -1]
+        x_best, x_worst = simplex[local, best], simplex[local, worst]
+        centroid = (simplex.sum(axis=1) - x_worst) / n
+
+        # 3. Отражение для всех задач сразу
+        x_reflection = centroid + alpha * (centroid - x_worst)
+        value_reflection = evaluate(x_reflection, rows)
+        x_new, value_new = x_reflection.copy(), value_reflection.copy()
+        accepted = value_reflection < vals[local, second_worst]
+        counters["reflect"] += int(accepted.sum())
+
+        # Растяжение там, где отражение лучше лучшей вершины
+        expand = np.flatnonzero(accepted & (value_reflection < vals[local, best]))
+        if len(expand):
+            x_expansion = centroid[expand] + gamma * (x_reflection[expand] - centroid[expand])
+            value_expansion = evaluate(x_expansion, rows[expand])
+            better = value_expansion < value_reflection[expand]
+            x_new[expand[better]], value_new[expand[better]] = x_expansion[better], value_expansion[better]
+            counters["expand"] += int(better.sum())
+            counters["reflect"] -= int(better.sum())
+
+        # Сжатие там, где отражение не принято
+        contract = np.flatnonzero(~accepted)
+        shrink = np.empty(0, dtype=int)
+        if len(contract):
+            x_contraction = centroid[contract] + beta * (x_worst[contract] - centroid[contract])
+            value_contraction = evaluate(x_contraction, rows[contract])
+            better = value_contraction < vals[contract, worst[contract]]
+            x_new[contract[better]], value_new[contract[better]] = x_contraction[better], value_contraction[better]
+            accepted[contract[better]] = True
+            counters["contract"] += int(better.sum())
+            shrink = contract[~better]
+
+        # Замена худшей вершины
+        replace = np.flatnonzero(accepted)
+        simplex[replace, worst[replace]] = x_new[replace]
+        vals[replace, worst[replace]] = value_new[replace]
+
+        # 4. Редукция к лучшей вершине: все новые вершины всех таких задач вычисляются одним вызовом
+        if len(shrink):
+            counters["shrink"] += len(shrink)
+            anchor = x_best[shrink][:, np.newaxis, :]
+            simplex[shrink] = anchor + delta * (simplex[shrink] - anchor)
+            others = order[shrink, 1:]
+            points = simplex[shrink[:, np.newaxis], others].reshape(-1, n)
+            vals[shrink[:, np.newaxis], others] = evaluate(points, np.repeat(rows[shrink], n)).reshape(-1, n)
+
+        simplices[rows], values[rows] = simplex, vals
+
+        # 5. Проверка на сходимость каждой задачи
+        order = np.argsort(vals, axis=1, kind="stable")
+        size = np.linalg.norm(simplex[local, order[:, 0]] - simplex[local, order[:, -1]], axis=1)
+        converged = size < tol
+        reason[rows[converged]] = CONVERGED
+        nit[rows[~converged]] += 1
+        active[rows[converged]] = False
+        active &= nit < max_iter
+        iteration += 1
+
+        if callback is not None:
+            best = np.argmin(values, axis=1)
+            if callback(iteration, simplices[np.arange(m), best], values[np.arange(m), best]):
+                reason[active] = CALLBACK
+                break
+
+    best = np.argmin(values, axis=1)
+    return OptimizeResult(simplices[np.arange(m), best], values[np.arange(m), best], nit, nfev=nfev,
+                          time=perf_counter() - start_time, reason=reason, counters=counters)
@@ -1,21 +1,25 @@
-import matplotlib
-
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-from matplotlib import cm
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
-import numpy as np
-import sympy as sp
-from datetime import datetime
-
-from app.hooke_jeeves import hooke_jeeves
-from app.nelder_mead import nelder_mead
-from app.powell import powell
+from time import perf_counter
+
+from app.compiler import compile_expression
+from app.core import METHOD_PARAMS, METHOD_TITLES, format_parameters, format_point, get_method_name, run_method
+from app.evaluation import Evaluator
+from app.grid import compute_grid
+from app.history import HistoryStore
+from app.multistart import SAMPLINGS, multistart
+from app.separable import solve_separable
 from app.utils import format_number
 
-history_data = []  # Список для хранения истории поиска
+MAX_SURFACE_FACETS = 150  # Предел числа отображаемых граней поверхности по каждой оси
+PROGRESS_INTERVAL = 0.1  # Минимальный интервал между сообщениями о ходе поиска, с
+POLL_INTERVAL = 50  # Период опроса очереди сообщений фонового поиска, мс
+
+history = None  # История запусков (HistoryStore), открывается в main
+HISTORY_LIMIT = 1000  # Число последних записей в окне истории
 
 checkbuttons = []  # Список для переменных BooleanVar
 checkbuttons_widgets = []  # Список для чекбоксов
@@ -25,6 +29,13 @@ step_reduction_entry = None
 alpha_entry = None
 beta_entry = None
 gamma_entry = None
+memory_entry = None
+radius_entry = None
+budget_entries = {}  # Поля критериев остановки по бюджету
+
+progress_queue = queue.Queue()  # Сообщения фонового поиска для главного потока
+cancel_event = threading.Event()  # Запрос отмены поиска
+convergence_plot = None  # Окно графика сходимости и его данные
 
 
 def update_variables(*args):
@@ -38,8 +49,8 @@ def update_variables(*args):
         if not expr_input.strip():
             return
 
-        param_names = sorted(set(sp.sympify(expr_input).free_symbols), key=str)
-        param_names = [str(p) for p in param_names]
+        compiled = compile_expression(expr_input)
+        param_names = compiled.param_names
 
         global initial_entries, checkbuttons, checkbuttons_widgets, selected_checkboxes
         initial_entries = []
@@ -101,7 +112,7 @@ def update_checkboxes():
 
 
 def update_method_params(*args):
-    global step_size_entry, step_reduction_entry, alpha_entry, beta_entry, gamma_entry
+    global step_size_entry, step_reduction_entry, alpha_entry, beta_entry, gamma_entry, memory_entry, radius_entry
     # Сначала очищаем старые параметры
     for widget in method_param_frame.winfo_children():
         widget.grid_forget()
@@ -143,8 +154,21 @@ def update_method_params(*args):
         # Для метода Пауэлла параметры не меняются, можно оставить пустым или убрать
         pass  # Или добавьте здесь другие параметры, если нужно
 
+    elif method == METHOD_TITLES["lbfgs"]:
+        tk.Label(method_param_frame, text="Память (число пар s, y)").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        memory_entry = tk.Entry(method_param_frame, width=10)
+        memory_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        memory_entry.insert(0, str(METHOD_PARAMS["lbfgs"]["memory"]))  # Значение по умолчанию
+
+    elif method == METHOD_TITLES["newton"]:
+        tk.Label(method_param_frame, text="Начальный радиус области").grid(row=0, column=0, padx=5, pady=5,
+                                                                           sticky="w")
+        radius_entry = tk.Entry(method_param_frame, width=10)
+        radius_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        radius_entry.insert(0, str(METHOD_PARAMS["newton"]["radius"]))  # Значение по умолчанию
+
     # Важно обновить интерфейс
-    method_param_frame.grid(row=10, column=0, columnspan=5, padx=5, pady=5, sticky="w")
+    method_param_frame.grid(row=11, column=0, columnspan=5, padx=5, pady=5, sticky="w")
 
 
 def update_optimal_fields(param_names):
@@ -167,11 +191,18 @@ def update_optimal_fields(param_names):
 
 
 def show_graph():
+    # matplotlib загружается только при первом построении графика
+    import matplotlib
+
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
+
     try:
         # Получаем выражение функции
         expr_input = function_entry.get()
-        param_names = sorted(set(sp.sympify(expr_input).free_symbols), key=str)
-        param_names = [str(p) for p in param_names]
+        compiled = compile_expression(expr_input)
+        param_names = compiled.param_names
 
         # Проверяем, выбрано ли хотя бы одна переменная
         selected_indices = [i for i, var in enumerate(checkbuttons) if var.get()]
@@ -179,31 +210,27 @@ def show_graph():
             messagebox.showerror("Ошибка", "Для построения графика выберите хотя бы одну переменную.")
             return
 
-        # Если выбрана только одна переменная, строим 2D-график
-        if len(selected_indices) == 1:
-            var = param_names[selected_indices[0]]
-            idx = selected_indices[0]
-
-            # Получаем значения начальной точки
-            x0 = [float(entry.get()) for entry in initial_entries]
+        if len(selected_indices) > 2:
+            messagebox.showerror("Ошибка", "Для построения графика выберите ровно одну или две переменные.")
+            return
 
-            # Устанавливаем диапазон для графика
-            x_min = float(min_entry.get())
-            x_max = float(max_entry.get())
+        # Получаем значения начальной точки (фиксируют невыбранные переменные)
+        x0 = [float(entry.get()) for entry in initial_entries]
 
-            # Создаем сетку значений для выбранной переменной
-            x = np.linspace(x_min, x_max, 100)
+        # Устанавливаем диапазон и разрешение сетки для графика
+        x_min = float(min_entry.get())
+        x_max = float(max_entry.get())
+        resolution = int(resolution_combobox.get())
+        func = compiled.func
 
-            # Вычисляем значения функции
-            params = sp.symbols(param_names)
-            expr = sp.sympify(expr_input)
-            func = sp.lambdify(params, expr)
+        # Сетка вычисляется векторизованно и кэшируется по выражению, фиксированным координатам и границам
+        grid = compute_grid(func, x0, selected_indices, [(x_min, x_max)] * len(selected_indices), resolution,
+                            key=expr_input)
 
-            # Фиксируем остальные переменные
-            Z = np.zeros_like(x)
-            for i in range(x.shape[0]):
-                x0[idx] = x[i]  # Первая (и единственная) выделенная переменная
-                Z[i] = func(*x0)  # Вычисляем значение функции
+        # Если выбрана только одна переменная, строим 2D-график
+        if len(selected_indices) == 1:
+            var = param_names[selected_indices[0]]
+            x, Z = grid
 
             # Построение 2D-графика
             plt.plot(x, Z)
@@ -214,42 +241,17 @@ def show_graph():
             plt.show()
 
         # Если выбраны две переменные, строим 3D-график
-        elif len(selected_indices) == 2:
-            # Определяем две выделенные переменные и их индексы
+        else:
+            # Определяем две выделенные переменные
             var1, var2 = [param_names[i] for i in selected_indices]
-            idx1, idx2 = selected_indices
-
-            # Получаем значения начальной точки
-            x0 = [float(entry.get()) for entry in initial_entries]
-
-            # Устанавливаем диапазон для графика
-            x_min = float(min_entry.get())
-            x_max = float(max_entry.get())
-            y_min = x_min
-            y_max = x_max
-
-            # Создаем сетку значений для выделенных переменных
-            x = np.linspace(x_min, x_max, 100)
-            y = np.linspace(y_min, y_max, 100)
-            X, Y = np.meshgrid(x, y)
-
-            # Вычисляем значения функции
-            params = sp.symbols(param_names)
-            expr = sp.sympify(expr_input)
-            func = sp.lambdify(params, expr)
-
-            # Фиксируем остальные переменные
-            Z = np.zeros_like(X)
-            for i in range(X.shape[0]):
-                for j in range(X.shape[1]):
-                    x0[idx1] = X[i, j]  # Первая выделенная переменная
-                    x0[idx2] = Y[i, j]  # Вторая выделенная переменная
-                    Z[i, j] = func(*x0)  # Вычисляем значение функции
-
-            # Построение 3D-графика
+            X, Y, Z = grid
+
+            # Построение 3D-графика: число отображаемых граней ограничено, чтобы график оставался интерактивным
             fig = plt.figure()
             ax = fig.add_subplot(111, projection='3d')
-            surf = ax.plot_surface(X, Y, Z, cmap=cm.viridis, edgecolor='k', alpha=0.8)
+            count = min(resolution, MAX_SURFACE_FACETS)
+            surf = ax.plot_surface(X, Y, Z, rcount=count, ccount=count, cmap=cm.viridis,
+                                   edgecolor='k' if resolution <= 100 else 'none', alpha=0.8)
 
             # Формируем название графика
             ax.set_title(f"График функции f({', '.join(param_names)}) = {expr_input}")
@@ -264,10 +266,6 @@ def show_graph():
 
             plt.show()
 
-        else:
-            messagebox.showerror("Ошибка", "Для построения графика выберите ровно одну или две переменные.")
-            return
-
     except Exception as e:
         messagebox.showerror("Ошибка", f"Ошибка при построении графика: {e}")
         raise e
@@ -276,77 +274,234 @@ def show_graph():
 def optimize():
     try:
         expr_input = function_entry.get()
-        param_names = sorted(set(sp.sympify(expr_input).free_symbols), key=str)
-        param_names = [str(p) for p in param_names]
+        compiled = compile_expression(expr_input)
+        param_names = compiled.param_names
 
         x0 = [float(entry.get()) for entry in initial_entries]
 
-        method = method_combobox.get()
+        method = get_method_name(method_combobox.get())
         tol = float(tol_entry.get())
         max_iter = float(max_iter_entry.get())
 
-        params = sp.symbols(param_names)
-        expr = sp.sympify(expr_input)
-        func = sp.lambdify(params, expr)
-
-        # Инициализируем параметры для записи в историю
-        method_params = {}
-
-        if method == "Хука-Дживса":
-            step_size = float(step_size_entry.get())
-            step_reduction = float(step_reduction_entry.get())
+        # Параметры метода (записываются и в историю)
+        if method == "hooke_jeeves":
             method_params = {
-                "step_size": step_size,
-                "step_reduction": step_reduction
+                "step_size": float(step_size_entry.get()),
+                "step_reduction": float(step_reduction_entry.get())
             }
-            optimal_args, optimal_value, k = hooke_jeeves(func, np.array(x0), tol=tol, max_iter=max_iter,
-                                                          step_size=step_size, step_reduction=step_reduction)
-        elif method == "Нелдера-Мида":
-            alpha = float(alpha_entry.get())
-            beta = float(beta_entry.get())
-            gamma = float(gamma_entry.get())
+        elif method == "nelder_mead":
             method_params = {
-                "alpha": alpha,
-                "beta": beta,
-                "gamma": gamma
+                "alpha": float(alpha_entry.get()),
+                "beta": float(beta_entry.get()),
+                "gamma": float(gamma_entry.get())
             }
-            optimal_args, optimal_value, k = nelder_mead(func, np.array(x0), tol=tol, max_iter=max_iter, alpha=alpha,
-                                                         beta=beta, gamma=gamma)
-        elif method == "Пауэлла":
-            method_params = {}  # Для метода Пауэлла параметры не меняются, если нет других
-            optimal_args, optimal_value, k = powell(func, np.array(x0), tol=tol, max_iter=max_iter)
+        elif method == "lbfgs":
+            method_params = {"memory": int(memory_entry.get())}
+        elif method == "newton":
+            method_params = {"radius": float(radius_entry.get())}
         else:
-            raise ValueError("Не выбран метод оптимизации")
-
-        for i, entry in enumerate(optimal_entries):
-            entry.delete(0, tk.END)
-            entry.insert(0, format_number(optimal_args[i]))
-        result_entry.delete(0, tk.END)
-        result_entry.insert(0, format_number(optimal_value))
-
-        # Обновляем поле для вывода k
-        k_entry.delete(0, tk.END)
-        k_entry.insert(0, str(k))
-
-        # Добавление записи в историю
-        history_data.append({
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "function": expr_input,
-            "initial_point": "\n".join([entry.get() for entry in initial_entries]),
+            method_params = {}  # Для методов Пауэлла и BFGS параметры не меняются
+        method_params.update(get_budget())
+
+        # Описание запуска для записи в историю после его завершения
+        task = {
+            "compiled": compiled,
+            "param_names": param_names,
+            "x0": x0,
             "method": method,
-            "parameters": f"ε = {tol}\nmax k = {max_iter}\n" + "\n".join(
-                [f"{key} = {value}" for key, value in method_params.items()]),
-            "iterations": k,
-            "function_value": format_number(optimal_value),
-            "optimal_point": "\n".join(
-                [f"{param}={format_number(val)}" for param, val in zip(param_names, optimal_args)]),
-        })
+            "params": {"tol": tol, "max_iter": max_iter, **method_params},
+        }
+
+        n_starts = int(starts_entry.get())
+        if n_starts > 1:
+            # Мультистарт: старты выбираются в прямоугольнике [min, max], как и область графика.
+            # Старты идут в отдельных процессах, поэтому ход поиска не передается и отмена недоступна
+            low, high, sampling = float(min_entry.get()), float(max_entry.get()), sampling_combobox.get()
+            task["params"].update(starts=n_starts, sampling=sampling, low=low, high=high)
+
+            def run():
+                return multistart(expr_input, low, high, method, n_starts=n_starts, sampling=sampling, tol=tol,
+                                  max_iter=max_iter, **method_params)
+        else:
+            separate = separate_var.get()
+            if separate:
+                task["params"]["separate"] = True
+            stored = history.lookup(compiled, x0, method, task["params"])
+            if stored is not None:
+                # Такое же задание уже решалось: результат берется из истории
+                finish_optimization(task, stored, reused=True)
+                return
+
+            x_start = x0
+            if warm_start_var.get():
+                task["params"]["warm_start"] = True
+                x_start = history.nearest(compiled, x0)
+                if x_start is None:
+                    x_start = x0  # Выражение еще не решалось
+            evaluator = Evaluator(compiled.func)
+            last_report = 0.0
+
+            def report_progress(k, x, value):
+                # Вызывается в фоновом потоке: виджеты не трогаем, только отправляем сообщение в очередь
+                nonlocal last_report
+                now = perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    progress_queue.put(("progress", k, float(value), evaluator.nfev))
+                return cancel_event.is_set()  # Остановка не позже чем через одну итерацию
+
+            def run():
+                if separate:
+                    # Подзадачи вычисляются своими функциями: в ходе поиска nfev в сообщениях не обновляется
+                    return solve_separable(compiled, x_start, method, tol=tol, max_iter=max_iter,
+                                           callback=report_progress, **method_params)
+                return run_method(method, evaluator, x_start, tol=tol, max_iter=max_iter, expression=compiled,
+                                  callback=report_progress, **method_params)
+
+        cancel_event.clear()
+        find_button.config(state="disabled")
+        cancel_button.config(state="disabled" if n_starts > 1 else "normal")
+        if convergence_var.get():
+            open_convergence_plot()
+        threading.Thread(target=run_in_background, args=(run,), daemon=True).start()
+        root.after(POLL_INTERVAL, poll_progress, task)
 
     except Exception as e:
         messagebox.showerror("Ошибка", f"Ошибка при поиске: {e}")
         raise e
 
 
+def get_budget():
+    """
+    Заполненные критерии остановки по бюджету.
+    """
+    budget = {}
+    for key, entry in budget_entries.items():
+        text = entry.get().strip()
+        if text:
+            budget[key] = int(text) if key in ("max_evals", "stall_window") else float(text)
+    return budget
+
+
+def run_in_background(run):
+    try:
+        progress_queue.put(("done", run()))
+    except Exception as e:
+        progress_queue.put(("error", e))
+
+
+def cancel_optimization():
+    cancel_event.set()
+
+
+def poll_progress(task):
+    """
+    Обработка сообщений фонового поиска в главном потоке Tk.
+    """
+    while True:
+        try:
+            message = progress_queue.get_nowait()
+        except queue.Empty:
+            root.after(POLL_INTERVAL, poll_progress, task)
+            return
+
+        if message[0] == "progress":
+            _, k, value, nfev = message
+            set_entry(k_entry, k)
+            set_entry(nfev_entry, nfev)
+            set_entry(result_entry, format_number(value))
+            update_convergence_plot(k, value)
+            continue
+
+        find_button.config(state="normal")
+        cancel_button.config(state="disabled")
+        if message[0] == "error":
+            messagebox.showerror("Ошибка", f"Ошибка при поиске: {message[1]}")
+            raise message[1]
+        finish_optimization(task, message[1])
+        return
+
+
+def finish_optimization(task, result, reused=False):
+    param_names = task["param_names"]
+    if isinstance(result, dict):
+        # Результат мультистарта
+        optimal_args, optimal_value, k = result["x"], result["value"], result["iterations"]
+        nfev, message = result["nfev"], f"бассейнов: {len(result['basins'])}"
+        history.save(task["compiled"], task["x0"], task["method"], task["params"], optimal_args, optimal_value, k,
+                     nfev=nfev, reason="multistart", message=message)
+        messagebox.showinfo("Мультистарт", f"Найдено бассейнов: {len(result['basins'])}, "
+                                           f"остановлено стартов: {result['pruned']}\n\n" + "\n\n".join(
+            f"f = {format_number(basin['value'])} (стартов: {basin['count']})\n"
+            + format_point(param_names, basin["x"]) for basin in result["basins"][:5]))
+    else:
+        optimal_args, optimal_value, k = result
+        nfev, message = result.nfev, result.message
+        if "fallback" in result.counters:
+            message += f" (выражение недифференцируемо: {METHOD_TITLES[result.counters['fallback']]})"
+        if result.counters.get("groups", 1) > 1:
+            message += f" (независимых подзадач: {result.counters['groups']})"
+        update_convergence_plot(k, optimal_value)
+        if not reused:
+            history.save_result(task["compiled"], task["x0"], task["method"], task["params"], result)
+
+    for i, entry in enumerate(optimal_entries):
+        set_entry(entry, format_number(optimal_args[i]))
+    set_entry(result_entry, format_number(optimal_value))
+
+    # Обновляем поля для вывода k и nfev
+    set_entry(k_entry, k)
+    set_entry(nfev_entry, nfev)
+
+
+def set_entry(entry, value):
+    entry.delete(0, tk.END)
+    entry.insert(0, str(value))
+
+
+def open_convergence_plot():
+    """
+    Окно графика сходимости, которое дополняется по мере поступления сообщений о ходе поиска.
+    """
+    global convergence_plot
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+
+    if convergence_plot is not None:
+        convergence_plot["window"].destroy()
+
+    window = tk.Toplevel(root)
+    window.title("Сходимость")
+    figure = Figure(figsize=(5, 3), tight_layout=True)
+    axes = figure.add_subplot(111)
+    axes.set_xlabel("k")
+    axes.set_ylabel("f(x)")
+    axes.set_yscale("symlog")
+    axes.grid(True)
+    line, = axes.plot([], [], marker=".")
+    canvas = FigureCanvasTkAgg(figure, master=window)
+    canvas.get_tk_widget().pack(fill="both", expand=True)
+    convergence_plot = {"window": window, "axes": axes, "line": line, "canvas": canvas, "k": [], "values": []}
+
+    def close():
+        global convergence_plot
+        convergence_plot = None
+        window.destroy()
+
+    window.protocol("WM_DELETE_WINDOW", close)
+
+
+def update_convergence_plot(k, value):
+    if convergence_plot is None:
+        return
+    convergence_plot["k"].append(k)
+    convergence_plot["values"].append(value)
+    convergence_plot["line"].set_data(convergence_plot["k"], convergence_plot["values"])
+    convergence_plot["axes"].relim()
+    convergence_plot["axes"].autoscale_view()
+    convergence_plot["canvas"].draw_idle()
+
+
 def show_history():
     # Создаем новое окно для истории
     history_window = tk.Toplevel(root)
@@ -376,11 +531,15 @@ def show_history():
     for col in tree["columns"]:
         tree.column(col, width=100, anchor="w")
 
-    # Добавляем данные в таблицу
-    for record in history_data:
+    # Добавляем данные в таблицу (последние записи, новые первыми)
+    for record in history.records(HISTORY_LIMIT):
+        params = dict(record["params"])
+        tol, max_iter = params.pop("tol"), params.pop("max_iter")
         values = (
-            record["date"], record["function"], record["initial_point"], record["method"], record["parameters"],
-            record["iterations"], record["function_value"], record["optimal_point"]
+            record["created"], record["source"], "\n".join(format_number(value) for value in record["x0"]),
+            METHOD_TITLES[record["method"]], format_parameters(tol, max_iter, params),
+            f"{record['iterations']}\nnfev = {record['nfev']}\n{record['message']}", format_number(record["value"]),
+            format_point(compile_expression(record["source"]).param_names, record["x"])
         )
         # Вставляем строку в таблицу
         tree.insert("", "end", values=values)
@@ -394,102 +553,168 @@ def enable_copy_paste(entry_widget):
     entry_widget.bind("<Control-x>", lambda e: entry_widget.event_generate("<<Cut>>"))
 
 
-root = tk.Tk()
-root.title("Оптимизация функции")
-root.geometry("410x800")
-
-# Меню
-menu_bar = tk.Menu(root)
-root.config(menu=menu_bar)
-
-history_menu = tk.Menu(menu_bar, tearoff=0)
-menu_bar.add_cascade(label="История", command=show_history)
-
-# Ввод (заголовок)
-tk.Label(root, text="Ввод", font=("Arial", 12, "bold")).grid(row=0, column=0, columnspan=5, padx=5, pady=5, sticky="w")
-
-# Выражение функции
-function_label = tk.Label(root, text="Выражение функции")
-function_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
-function_entry = tk.Entry(root)
-function_entry.insert(0, "(x-2)**2+(y-3)**2")
-function_entry.grid(row=1, column=1, columnspan=3, padx=5, pady=5, sticky="ew")
-function_entry.bind("<Return>", update_variables)  # Обновление при нажатии Enter
-enable_copy_paste(function_entry)  # Добавляем поддержку Ctrl+C и Ctrl+X
-
-# Кнопка "Ввод" рядом с выражением функции
-tk.Button(root, text="Ввод", command=update_variables).grid(row=1, column=4, padx=5, pady=5, sticky="ew")
-
-# Начальная точка
-tk.Label(root, text="Начальная точка").grid(row=2, column=0, padx=5, pady=5, sticky="w")
-variable_frame = tk.Frame(root)
-variable_frame.grid(row=3, column=0, columnspan=5, padx=5, pady=5, sticky="ew")
-
-# Инпуты для min и max, и кнопка "График"
-tk.Label(root, text="min").grid(row=4, column=0, padx=5, pady=5, sticky="e")  # Выравнивание по левому краю
-min_entry = tk.Entry(root, width=10)
-min_entry.insert(0, "-100")  # Значение по умолчанию для min
-min_entry.grid(row=4, column=1, padx=5, pady=5, sticky="ew")  # Растягиваем по горизонтали
-
-tk.Label(root, text="max").grid(row=4, column=2, padx=5, pady=5, sticky="w")  # Выравнивание по левому краю
-max_entry = tk.Entry(root, width=10)
-max_entry.insert(0, "100")  # Значение по умолчанию для max
-max_entry.grid(row=4, column=3, padx=5, pady=5, sticky="ew")  # Растягиваем по горизонтали
-
-# Кнопка "График" в одной строке с min и max
-tk.Button(root, text="График", command=show_graph).grid(
-    row=4, column=4, padx=5, pady=5, sticky="ew")  # Выравнивание по левому краю
-
-# Метод (заголовок)
-tk.Label(root, text="Метод", font=("Arial", 12, "bold")).grid(
-    row=5, column=0, columnspan=5, padx=5, pady=5, sticky="w")
-
-# Метод и кнопка "Найти" в одной строке
-tk.Label(root, text="Тип").grid(row=6, column=0, padx=5, pady=5, sticky="w")
-method_combobox = ttk.Combobox(root, values=["Хука-Дживса", "Нелдера-Мида", "Пауэлла"], state="readonly")
-method_combobox.set("Хука-Дживса")
-method_combobox.grid(row=6, column=1, columnspan=3, padx=5, pady=5, sticky="ew")
-method_combobox.bind("<<ComboboxSelected>>", update_method_params)
-
-# Кнопка "Найти" справа от выбора метода
-tk.Button(root, text="Найти", command=optimize).grid(row=6, column=4, padx=5, pady=5, sticky="ew")
-
-# Параметры метода
-tk.Label(root, text="Параметры метода").grid(row=7, column=0, columnspan=5, padx=5, pady=5, sticky="w")
-
-tk.Label(root, text="Критерий точности (ε)").grid(row=8, column=0, padx=5, pady=5, sticky="w")
-tol_entry = tk.Entry(root, width=10)
-tol_entry.insert(0, "1e-6")  # Значение по умолчанию для tol
-tol_entry.grid(row=8, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(root, text="Максимальное кол-во (k)").grid(row=9, column=0, padx=5, pady=5, sticky="w")
-max_iter_entry = tk.Entry(root, width=10)
-max_iter_entry.insert(0, "1000")  # Значение по умолчанию для max_iter
-max_iter_entry.grid(row=9, column=1, padx=5, pady=5, sticky="ew")
-
-# Рамка для параметров метода
-method_param_frame = tk.Frame(root)
-method_param_frame.grid(row=10, column=0, columnspan=5, padx=5, pady=5, sticky="w")
-
-# Вывод (заголовок)
-tk.Label(root, text="Вывод", font=("Arial", 12, "bold")).grid(
-    row=11, column=0, columnspan=5, padx=5, pady=5, sticky="w")
-
-# Результат
-tk.Label(root, text="Значение функции").grid(row=12, column=0, padx=5, pady=5, sticky="w")
-result_entry = tk.Entry(root, width=30)
-result_entry.grid(row=12, column=1, columnspan=4, padx=5, pady=5, sticky="ew")
-
-# Внесение изменений в интерфейс для добавления поля k
-tk.Label(root, text="Количество итераций (k)").grid(row=13, column=0, padx=5, pady=5, sticky="w")
-k_entry = tk.Entry(root, width=10)
-k_entry.grid(row=13, column=1, padx=5, pady=5, sticky="ew")  # Растягиваем по горизонтали
-
-# Оптимальная точка
-tk.Label(root, text="Оптимальная точка").grid(row=14, column=0, padx=5, pady=5, sticky="w")
-optimal_frame = tk.Frame(root)
-optimal_frame.grid(row=15, column=0, columnspan=5, padx=5, pady=5, sticky="ew")
-
-update_variables()
-
-root.mainloop()
+def main():
+    global root, function_label, function_entry, variable_frame, min_entry, max_entry, resolution_combobox
+    global method_combobox, tol_entry, max_iter_entry, method_param_frame, result_entry, k_entry, optimal_frame
+    global nfev_entry, find_button, cancel_button, convergence_var
+    global starts_entry, sampling_combobox, budget_entries, warm_start_var, separate_var, history
+
+    history = HistoryStore()
+
+    root = tk.Tk()
+    root.title("Оптимизация функции")
+    root.geometry("410x905")
+
+    # Меню
+    menu_bar = tk.Menu(root)
+    root.config(menu=menu_bar)
+
+    history_menu = tk.Menu(menu_bar, tearoff=0)
+    menu_bar.add_cascade(label="История", command=show_history)
+
+    # Ввод (заголовок)
+    tk.Label(root, text="Ввод", font=("Arial", 12, "bold")).grid(
+        row=0, column=0, columnspan=5, padx=5, pady=5, sticky="w")
+
+    # Выражение функции
+    function_label = tk.Label(root, text="Выражение функции")
+    function_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+    function_entry = tk.Entry(root)
+    function_entry.insert(0, "(x-2)**2+(y-3)**2")
+    function_entry.grid(row=1, column=1, columnspan=3, padx=5, pady=5, sticky="ew")
+    function_entry.bind("<Return>", update_variables)  # Обновление при нажатии Enter
+    enable_copy_paste(function_entry)  # Добавляем поддержку Ctrl+C и Ctrl+X
+
+    # Кнопка "Ввод" рядом с выражением функции
+    tk.Button(root, text="Ввод", command=update_variables).grid(row=1, column=4, padx=5, pady=5, sticky="ew")
+
+    # Начальная точка
+    tk.Label(root, text="Начальная точка").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+
+    # Разрешение сетки графика
+    tk.Label(root, text="Сетка").grid(row=2, column=2, padx=5, pady=5, sticky="w")
+    resolution_combobox = ttk.Combobox(root, values=["50", "100", "200", "500"], width=7)
+    resolution_combobox.set("100")  # Значение по умолчанию для разрешения
+    resolution_combobox.grid(row=2, column=3, padx=5, pady=5, sticky="ew")
+
+    variable_frame = tk.Frame(root)
+    variable_frame.grid(row=3, column=0, columnspan=5, padx=5, pady=5, sticky="ew")
+
+    # Инпуты для min и max, и кнопка "График"
+    tk.Label(root, text="min").grid(row=4, column=0, padx=5, pady=5, sticky="e")  # Выравнивание по левому краю
+    min_entry = tk.Entry(root, width=10)
+    min_entry.insert(0, "-100")  # Значение по умолчанию для min
+    min_entry.grid(row=4, column=1, padx=5, pady=5, sticky="ew")  # Растягиваем по горизонтали
+
+    tk.Label(root, text="max").grid(row=4, column=2, padx=5, pady=5, sticky="w")  # Выравнивание по левому краю
+    max_entry = tk.Entry(root, width=10)
+    max_entry.insert(0, "100")  # Значение по умолчанию для max
+    max_entry.grid(row=4, column=3, padx=5, pady=5, sticky="ew")  # Растягиваем по горизонтали
+
+    # Кнопка "График" в одной строке с min и max
+    tk.Button(root, text="График", command=show_graph).grid(
+        row=4, column=4, padx=5, pady=5, sticky="ew")  # Выравнивание по левому краю
+
+    # Метод (заголовок)
+    tk.Label(root, text="Метод", font=("Arial", 12, "bold")).grid(
+        row=5, column=0, columnspan=5, padx=5, pady=5, sticky="w")
+
+    # Метод и кнопка "Найти" в одной строке
+    tk.Label(root, text="Тип").grid(row=6, column=0, padx=5, pady=5, sticky="w")
+    method_combobox = ttk.Combobox(root, values=list(METHOD_TITLES.values()), state="readonly")
+    method_combobox.set(METHOD_TITLES["hooke_jeeves"])
+    method_combobox.grid(row=6, column=1, columnspan=3, padx=5, pady=5, sticky="ew")
+    method_combobox.bind("<<ComboboxSelected>>", update_method_params)
+
+    # Кнопка "Найти" справа от выбора метода
+    find_button = tk.Button(root, text="Найти", command=optimize)
+    find_button.grid(row=6, column=4, padx=5, pady=5, sticky="ew")
+
+    # Параметры метода
+    tk.Label(root, text="Параметры метода").grid(row=7, column=0, columnspan=4, padx=5, pady=5, sticky="w")
+
+    # Кнопка "Отмена" под кнопкой "Найти" (активна во время поиска)
+    cancel_button = tk.Button(root, text="Отмена", command=cancel_optimization, state="disabled")
+    cancel_button.grid(row=7, column=4, padx=5, pady=5, sticky="ew")
+
+    tk.Label(root, text="Критерий точности (ε)").grid(row=8, column=0, padx=5, pady=5, sticky="w")
+    tol_entry = tk.Entry(root, width=10)
+    tol_entry.insert(0, "1e-6")  # Значение по умолчанию для tol
+    tol_entry.grid(row=8, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(root, text="Максимальное кол-во (k)").grid(row=9, column=0, padx=5, pady=5, sticky="w")
+    max_iter_entry = tk.Entry(root, width=10)
+    max_iter_entry.insert(0, "1000")  # Значение по умолчанию для max_iter
+    max_iter_entry.grid(row=9, column=1, padx=5, pady=5, sticky="ew")
+
+    # Мультистарт: число стартов и способ их выбора
+    tk.Label(root, text="Старты").grid(row=8, column=2, padx=5, pady=5, sticky="w")
+    starts_entry = tk.Entry(root, width=10)
+    starts_entry.insert(0, "1")  # Один старт из начальной точки
+    starts_entry.grid(row=8, column=3, padx=5, pady=5, sticky="ew")
+
+    tk.Label(root, text="Выборка").grid(row=9, column=2, padx=5, pady=5, sticky="w")
+    sampling_combobox = ttk.Combobox(root, values=SAMPLINGS, state="readonly", width=7)
+    sampling_combobox.set("lhs")
+    sampling_combobox.grid(row=9, column=3, padx=5, pady=5, sticky="ew")
+
+    # Критерии остановки по бюджету (пустое поле - без ограничения)
+    budget_frame = tk.Frame(root)
+    budget_frame.grid(row=10, column=0, columnspan=5, padx=5, pady=5, sticky="w")
+    budget_entries = {}
+    for i, (key, title) in enumerate([("max_evals", "max nfev"), ("max_time", "max t, с"),
+                                      ("f_target", "f цели"), ("stall_window", "Застой, k")]):
+        tk.Label(budget_frame, text=title).grid(row=i // 2, column=i % 2 * 2, padx=5, pady=2, sticky="w")
+        budget_entries[key] = tk.Entry(budget_frame, width=10)
+        budget_entries[key].grid(row=i // 2, column=i % 2 * 2 + 1, padx=5, pady=2, sticky="ew")
+
+    # Теплый старт: поиск начинается с ближайшего к начальной точке оптимума из истории
+    warm_start_var = tk.BooleanVar()
+    tk.Checkbutton(budget_frame, text="Теплый старт из истории", variable=warm_start_var).grid(
+        row=2, column=0, columnspan=4, padx=5, pady=2, sticky="w")
+
+    # Разбиение суммы независимых слагаемых на подзадачи меньшей размерности
+    separate_var = tk.BooleanVar()
+    tk.Checkbutton(budget_frame, text="Разделять независимые слагаемые", variable=separate_var).grid(
+        row=3, column=0, columnspan=4, padx=5, pady=2, sticky="w")
+
+    # Рамка для параметров метода
+    method_param_frame = tk.Frame(root)
+    method_param_frame.grid(row=11, column=0, columnspan=5, padx=5, pady=5, sticky="w")
+
+    # Вывод (заголовок)
+    tk.Label(root, text="Вывод", font=("Arial", 12, "bold")).grid(
+        row=12, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
+    # Живой график сходимости во время поиска
+    convergence_var = tk.BooleanVar()
+    tk.Checkbutton(root, text="График сходимости", variable=convergence_var).grid(
+        row=12, column=2, columnspan=3, padx=5, pady=5, sticky="w")
+
+    # Результат
+    tk.Label(root, text="Значение функции").grid(row=13, column=0, padx=5, pady=5, sticky="w")
+    result_entry = tk.Entry(root, width=30)
+    result_entry.grid(row=13, column=1, columnspan=4, padx=5, pady=5, sticky="ew")
+
+    # Внесение изменений в интерфейс для добавления поля k
+    tk.Label(root, text="Количество итераций (k)").grid(row=14, column=0, padx=5, pady=5, sticky="w")
+    k_entry = tk.Entry(root, width=10)
+    k_entry.grid(row=14, column=1, padx=5, pady=5, sticky="ew")  # Растягиваем по горизонтали
+
+    # Число вычислений функции рядом с k
+    tk.Label(root, text="nfev").grid(row=14, column=2, padx=5, pady=5, sticky="w")
+    nfev_entry = tk.Entry(root, width=10)
+    nfev_entry.grid(row=14, column=3, padx=5, pady=5, sticky="ew")
+
+    # Оптимальная точка
+    tk.Label(root, text="Оптимальная точка").grid(row=15, column=0, padx=5, pady=5, sticky="w")
+    optimal_frame = tk.Frame(root)
+    optimal_frame.grid(row=16, column=0, columnspan=5, padx=5, pady=5, sticky="ew")
+
+    update_variables()
+
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import math
+import multiprocessing
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from app.compiler import compile_expression
+from app.core import get_method_name, run_method
+from app.evaluation import Evaluator
+from app.utils import available_cpus
+
+SAMPLINGS = ("uniform", "lhs", "sobol")
+
+_incumbent = None  # Общее для процессов лучшее найденное значение (multiprocessing.Value)
+
+
+class Pruned(Exception):
+    """
+    Старт остановлен досрочно: его значение заведомо хуже лучшего найденного.
+    """
+
+
+def sample_starts(n_starts, low, high, dim, sampling="lhs", seed=None):
+    """
+    Генерация начальных точек внутри прямоугольника [low, high]^dim.
+
+    :param n_starts: Число точек.
+    :param low: Нижняя граница (число или вектор).
+    :param high: Верхняя граница (число или вектор).
+    :param dim: Размерность задачи.
+    :param sampling: Способ выборки: "uniform", "lhs" (латинский гиперкуб) или "sobol".
+    :param seed: Зерно генератора случайных чисел.
+    :return: Массив начальных точек размерности (n_starts, dim).
+    """
+    if sampling == "uniform":
+        unit = np.random.default_rng(seed).random((n_starts, dim))
+    elif sampling in ("lhs", "sobol"):
+        from scipy.stats import qmc
+
+        if sampling == "lhs":
+            sampler = qmc.LatinHypercube(d=dim, seed=seed)
+        else:
+            sampler = qmc.Sobol(d=dim, seed=seed)
+        with warnings.catch_warnings():
+            # Sobol предупреждает, если число точек не степень двойки
+            warnings.simplefilter("ignore", UserWarning)
+            unit = sampler.random(n_starts)
+    else:
+        raise ValueError(f"Неизвестный способ выборки: {sampling}")
+    low = np.broadcast_to(np.asarray(low, dtype=float), (dim,))
+    high = np.broadcast_to(np.asarray(high, dtype=float), (dim,))
+    return low + unit * (high - low)
+
+
+class _PruningObjective:
+    """
+    Целевая функция, прерывающая старт, чей лучший результат после разогрева
+    хуже лучшего найденного значения более чем на заданный запас.
+    """
+
+    def __init__(self, func, incumbent, prune_after, prune_margin):
+        self.func = func
+        self.incumbent = incumbent
+        self.prune_after = prune_after
+        self.prune_margin = prune_margin
+        self.count = 0
+        self.best_value = math.inf
+        self.best_point = None
+
+    def __call__(self, *args):
+        value = self.func(*args)
+        self.count += 1
+        if value < self.best_value:
+            self.best_value = value
+            self.best_point = [float(arg) for arg in args]
+        elif self.incumbent is not None and self.count >= self.prune_after:
+            incumbent = self.incumbent.value
+            if self.best_value > incumbent + self.prune_margin * max(1.0, abs(incumbent)):
+                raise Pruned()
+        return value
+
+
+def _init_worker(incumbent):
+    global _incumbent
+    _incumbent = incumbent
+
+
+def _run_start(input_expr, method, x0, tol, max_iter, method_params, prune_after, prune_margin):
+    compiled = compile_expression(input_expr)
+    objective = _PruningObjective(compiled.func, _incumbent, prune_after, prune_margin)
+    evaluator = Evaluator(objective)
+    record = {"x0": x0.tolist()}
+    try:
+        result = run_method(method, evaluator, x0, tol=tol, max_iter=max_iter, expression=compiled,
+                            **method_params)
+        record.update(status="ok", x=np.asarray(result.x, dtype=float).tolist(), value=float(result.fun),
+                      iterations=int(result.nit), reason=result.reason)
+        if _incumbent is not None:
+            with _incumbent.get_lock():
+                _incumbent.value = min(_incumbent.value, record["value"])
+    except Pruned:
+        record.update(status="pruned", x=objective.best_point, value=float(objective.best_value))
+    record["nfev"] = evaluator.nfev
+    return record
+
+
+def cluster_optima(records, dedup_tol):
+    """
+    Объединение близких оптимумов (расстояние меньше dedup_tol) в бассейны.
+
+    :return: Список бассейнов по возрастанию значения функции.
+    """
+    basins = []
+    for record in sorted(records, key=lambda r: r["value"]):
+        x = np.array(record["x"])
+        for basin in basins:
+            if np.linalg.norm(x - basin["x"]) < dedup_tol:
+                basin["count"] += 1
+                break
+        else:
+            basins.append({"x": x, "value": record["value"], "count": 1})
+    return basins
+
+
+def multistart(input_expr, low, high, method="nelder_mead", n_starts=16, sampling="lhs", workers=None, seed=None,
+               tol=1e-6, max_iter=1000, prune=True, prune_after=100, prune_margin=0.5, dedup_tol=1e-3,
+               **method_params):
+    """
+    Многостартовая оптимизация: локальный метод запускается из нескольких точек в прямоугольнике [low, high].
+
+    Старты выполняются в пуле процессов и делят между собой лучшее найденное значение:
+    старт, который после prune_after вычислений хуже него более чем на prune_margin * max(1, |f*|),
+    останавливается досрочно.
+
+    :param input_expr: Строка выражения функции (компилируется в каждом процессе).
+    :param low: Нижняя граница области выбора стартов.
+    :param high: Верхняя граница области выбора стартов.
+    :param method: Внутреннее имя или название локального метода.
+    :param n_starts: Число стартов.
+    :param sampling: Способ выборки стартов: "uniform", "lhs" или "sobol".
+    :param workers: Число процессов (по умолчанию число доступных ядер).
+    :param seed: Зерно генератора стартов.
+    :param prune: Разрешить досрочную остановку заведомо худших стартов.
+    :param dedup_tol: Расстояние, ближе которого оптимумы считаются одним бассейном.
+    :return: Словарь с лучшей точкой (x), значением (value), числом итераций лучшего старта (iterations),
+             списком бассейнов (basins), числом остановленных стартов (pruned) и вычислений (nfev).
+    """
+    compiled = compile_expression(input_expr)
+    method = get_method_name(method)
+    starts = sample_starts(n_starts, low, high, len(compiled.params), sampling, seed)
+    workers = min(workers or available_cpus(), n_starts)
+    incumbent = multiprocessing.Value("d", math.inf) if prune else None
+    args = (tol, max_iter, method_params, prune_after, prune_margin)
+
+    if workers == 1:
+        _init_worker(incumbent)
+        try:
+            records = [_run_start(input_expr, method, x0, *args) for x0 in starts]
+        finally:
+            _init_worker(None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(incumbent,)) as executor:
+            futures = [executor.submit(_run_start, input_expr, method, x0, *args) for x0 in starts]
+            records = [future.result() for future in as_completed(futures)]
+
+    finished = [record for record in records if record["status"] == "ok"]
+    basins = cluster_optima(finished, dedup_tol)
+    best = min(finished, key=lambda r: r["value"])
+    return {
+        "x": np.array(best["x"]),
+        "value": best["value"],
+        "iterations": best["iterations"],
+        "basins": basins,
+        "starts": len(records),
+        "pruned": len(records) - len(finished),
+        "nfev": sum(record["nfev"] for record in records),
+    }
@@ -2,76 +2,252 @@ import logging
 
 import numpy as np
 
+from app.optimizer import Optimizer, run_optimizer
+from app.result import CONVERGED, MAX_ITER
+
 logger = logging.getLogger(__name__)
 
+DEGENERACY_TOL = 1e-10  # Нормированный объем симплекса, ниже которого симплекс считается вырожденным
+
+
+class NelderMead(Optimizer):
+    """
+    Метод Нелдера-Мида в виде пошагового оптимизатора (ask/tell, см. Optimizer).
+
+    Параметры - как у nelder_mead. Вершины начального симплекса и вершины после редукции
+    запрашиваются одним запросом, кандидаты отражения, растяжения и сжатия - по одному,
+    в режиме batch - спекулятивно все три одним запросом. Перезапуск строит вокруг лучшей вершины
+    новый симплекс начального размера, ориентированный по ребрам прежнего (см. _restart_simplex).
+    """
+
+    name = "nelder_mead"
+
+    def __init__(self, x0, alpha=1.0, beta=0.5, gamma=2.0, tol=1e-6, max_iter=1000, batch=False, adaptive=False,
+                 surrogate=None, restarts=0, restart_window=None):
+        super().__init__(surrogate, restarts=restarts, restart_window=restart_window)
+        self.tol = tol
+        self.max_iter = max_iter
+        self.batch = batch
+        self.counters = {"reflect": 0, "expand": 0, "contract": 0, "shrink": 0}
+        if restarts:
+            self.counters["restarts"] = 0
+
+        # 1. Инициализация симплекса
+        x0 = np.array(x0, dtype=float)
+        n = len(x0)
+        delta = 0.5  # Коэффициент редукции
+        if adaptive:
+            dim = max(n, 2)  # При n = 1 формулы вырождаются (редукция в точку)
+            alpha, gamma, beta, delta = 1.0, 1 + 2 / dim, 0.75 - 1 / (2 * dim), 1 - 1 / dim
+        self.alpha, self.beta, self.gamma, self.delta = alpha, beta, gamma, delta
+        self.simplex = np.empty((n + 1, n))
+        self.simplex[:] = x0  # Начальная точка
+        self.simplex[np.arange(1, n + 1), np.arange(n)] += 1.0  # Отклоняем по одной координате для остальных вершин
+        self.values = None  # Значения в вершинах (запрашиваются в начале поиска)
+        self.order = None  # Индексы вершин по возрастанию значения функции
+        self.total = self.simplex.sum(axis=0)  # Сумма всех вершин для пересчета центроида
+        # Буферы кандидатов и центроида: итерация изменяет только заранее выделенные массивы
+        self._centroid, self._x_best, self._difference = np.empty(n), np.empty(n), np.empty(n)
+        self._candidates = np.empty((3, n))  # Отражение, растяжение и сжатие
+        self._offsets = np.empty((n + 1, n)) if self.surrogate is not None else None  # Смещения от лучшей вершины
+
+    def _iterate(self):
+        simplex, total, n = self.simplex, self.total, len(self.total)
+        centroid, x_best, difference = self._centroid, self._x_best, self._difference
+        candidates = self._candidates
+        x_reflection, x_expansion, x_contraction = candidates  # Представления строк буфера кандидатов
+        if self.values is None:
+            self.values = np.array((yield simplex), dtype=float)
+            self.order = np.argsort(self.values, kind="stable")
+        values = self.values
+
+        while self.nit < self.max_iter:
+            # 2. Лучшая, вторая с конца и худшая вершины берутся из упорядоченных индексов
+            order = self.order
+            best, second_worst, worst = order[0], order[-2], order[-1]
+            x_worst = simplex[worst]
+            np.subtract(total, x_worst, out=centroid)
+            centroid /= n
+
+            # 3. Шаг отражения: x_r = c + alpha * (c - x_worst), x_e = c + gamma * (x_r - c),
+            # x_c = c + beta * (x_worst - c)
+            _affine(centroid, self.alpha, centroid, x_worst, out=x_reflection)
+            _affine(centroid, self.gamma, x_reflection, centroid, out=x_expansion)
+            _affine(centroid, self.beta, x_worst, centroid, out=x_contraction)
+            speculative = None
+            if self.batch:
+                # Спекулятивно запрашиваем всех кандидатов сразу
+                speculative = (yield candidates)
+            x_new = None
+            proposal = None
+            if self.surrogate is not None:
+                # Минимум модели в области размера симплекса заменяет худшую вершину, если он лучше лучшей
+                offsets = self._offsets
+                np.subtract(simplex, simplex[best], out=offsets)
+                proposal = yield from self._surrogate_step(simplex[best], values[best],
+                                                           np.linalg.norm(offsets, axis=1).max())
+            if proposal is not None:
+                x_new, value_new = proposal
+                step = None  # Учитывается в счетчиках модели
+            else:
+                value_reflection = speculative[0] if self.batch else (yield x_reflection[np.newaxis])[0]
+                if value_reflection < values[second_worst]:
+                    x_new, value_new, step = x_reflection, value_reflection, "reflect"
+                    if value_reflection < values[best]:
+                        # Шаг растяжения
+                        value_expansion = speculative[1] if self.batch else (yield x_expansion[np.newaxis])[0]
+                        if value_expansion < value_reflection:
+                            x_new, value_new, step = x_expansion, value_expansion, "expand"
+                else:
+                    # Шаг сжатия
+                    value_contraction = speculative[2] if self.batch else (yield x_contraction[np.newaxis])[0]
+                    if value_contraction < values[worst]:
+                        x_new, value_new, step = x_contraction, value_contraction, "contract"
+
+            if x_new is not None:
+                if step is not None:
+                    self.counters[step] += 1
+                # Заменяем худшую вершину и вставляем ее индекс на место по значению функции
+                np.subtract(x_new, x_worst, out=difference)
+                total += difference
+                simplex[worst] = x_new
+                values[worst] = value_new
+                position = np.searchsorted(values[order[:-1]], value_new, side="right")
+                order[position + 1:] = order[position:-1]
+                order[position] = worst
+                if (self.nit + 1) % (n + 1) == 0:
+                    np.sum(simplex, axis=0, out=total)  # Периодически сбрасываем накопленную погрешность суммы
+            else:
+                # Шаг редукции к лучшей вершине
+                self.counters["shrink"] += 1
+                others = order[1:]
+                x_best[:] = simplex[best]
+                simplex -= x_best  # Лучшая вершина при этом не меняется: (x_best - x_best) * delta + x_best
+                simplex *= self.delta
+                simplex += x_best
+                values[others] = (yield simplex[others])
+                self.order = np.argsort(values, kind="stable")
+                np.sum(simplex, axis=0, out=total)
+
+            # 4. Проверка на сходимость
+            np.subtract(simplex[self.order[0]], simplex[self.order[-1]], out=difference)
+            converged = np.linalg.norm(difference) < self.tol
+            if self.restarts:
+                # Вырождение проверяется вместе с периодическим пересчетом суммы вершин
+                stuck = converged or (self.nit + 1) % (n + 1) == 0 and self._degenerate()
+                if self._restart_due(values[self.order[0]], stuck):
+                    yield from self._restart_simplex()
+                    converged = False
+            if converged:
+                self.reason = CONVERGED
+                return
+
+            self.nit += 1
+            self.x, self.fun = simplex[self.order[0]].copy(), values[self.order[0]]  # Вершины изменяются на месте
+            yield None
+        self.reason = MAX_ITER
 
-def nelder_mead(func, x0, alpha=1.0, beta=0.5, gamma=2.0, tol=1e-6, max_iter=1000):
+    def _degenerate(self):
+        """
+        Симплекс вырожден: его объем, нормированный на произведение длин ребер из лучшей вершины,
+        меньше DEGENERACY_TOL (вершины почти лежат в подпространстве меньшей размерности).
+        """
+        best = self.order[0]
+        edges = np.delete(self.simplex, best, axis=0) - self.simplex[best]
+        lengths = np.linalg.norm(edges, axis=1)
+        if not lengths.all():
+            return True
+        sign, log_volume = np.linalg.slogdet(edges)
+        return sign == 0 or log_volume - np.log(lengths).sum() < np.log(DEGENERACY_TOL)
+
+    def _restart_simplex(self):
+        """
+        Перезапуск: новый симплекс вокруг лучшей вершины с ребрами начальной длины вдоль ортонормированных
+        направлений ребер прежнего симплекса. Каждое направление берется в сторону убывания функции
+        по симплексному градиенту (решение системы ребра @ g = разности значений).
+        """
+        best = self.order[0]
+        others = np.delete(np.arange(len(self.simplex)), best)
+        x_best = self.simplex[best].copy()
+        edges = self.simplex[others] - x_best
+        gradient = np.linalg.lstsq(edges, self.values[others] - self.values[best], rcond=None)[0]
+        directions = np.linalg.qr(edges.T)[0].T  # Строки - ортонормированный базис, первая - вдоль первого ребра
+        signs = np.where(directions @ gradient > 0, -1.0, 1.0)
+        self.simplex[others] = x_best + signs[:, np.newaxis] * directions
+        self.values[others] = (yield self.simplex[others])
+        self.order = np.argsort(self.values, kind="stable")
+        np.sum(self.simplex, axis=0, out=self.total)
+
+    def _finish(self):
+        if self.values is None:
+            # Остановка до вычисления начального симплекса: результат - начальная точка
+            self.values = np.full(len(self.simplex), np.inf)
+            self.values[0] = (yield self.simplex[:1])[0]
+            self.order = np.argsort(self.values, kind="stable")
+        # Возвращаем оптимальную точку и значение функции
+        best = self.order[0]
+        self.x, self.fun = self.simplex[best].copy(), self.values[best]
+
+
+def nelder_mead(func, x0, alpha=1.0, beta=0.5, gamma=2.0, tol=1e-6, max_iter=1000, batch=False, adaptive=False,
+                callback=None, max_evals=None, max_time=None, f_target=None, stall_window=None, stall_tol=1e-8,
+                surrogate=None, checkpoint=None, restarts=0, restart_window=None):
     """
-    Реализация метода Нелдера-Мида для минимизации функции.
+    Реализация метода Нелдера-Мида для минимизации функции (цикл над пошаговым оптимизатором NelderMead).
+
+    Вершины симплекса хранятся в массиве (n+1, n) вместе с их значениями; порядок вершин
+    поддерживается массивом индексов, в который замененная вершина вставляется на свое место,
+    а центроид считается по накопленной сумме вершин. Поэтому итерация без редукции требует
+    O(1) вычислений функции и O(n) арифметических операций.
 
-    :param func: Целевая функция.
+    :param func: Целевая функция (или Evaluator, чтобы получить счетчики вычислений).
     :param x0: Начальная точка (вектор).
     :param alpha: Коэффициент отражения.
     :param beta: Коэффициент сжатия.
     :param gamma: Коэффициент растяжения.
     :param tol: Точность ε (эпсилон).
     :param max_iter: Максимальное число итераций.
-    :return: Оптимальная точка и значение функции в этой точке.
+    :param batch: Вычислять точки пакетами: вершины после редукции и, спекулятивно,
+                  кандидатов отражения/растяжения/сжатия одним векторизованным вызовом.
+    :param adaptive: Использовать коэффициенты, зависящие от размерности (Гао-Хан),
+                     вместо alpha, beta, gamma; нужно при n в сотни.
+    :param callback: Функция callback(k, x, value), вызываемая после каждой итерации с лучшей вершиной;
+                     если она возвращает True, поиск останавливается.
+    :param max_evals: Максимальное число вычислений функции.
+    :param max_time: Максимальное время работы, с.
+    :param f_target: Целевое значение функции.
+    :param stall_window: Число итераций без улучшения, после которого поиск останавливается.
+    :param stall_tol: Относительное улучшение, которое считается улучшением (см. Stopping).
+    :param surrogate: Модель для дорогих функций ("quadratic", "rbf" или Surrogate): в начале итерации
+                      вычисляется минимум модели в области размера симплекса; если он лучше лучшей вершины,
+                      он заменяет худшую вершину вместо отражения.
+    :param checkpoint: Checkpoint или путь к файлу: состояние периодически сохраняется, а если файл уже есть,
+                       поиск продолжается с сохраненного состояния (см. app.checkpoint.resume).
+    :param restarts: Наибольшее число перезапусков: когда симплекс сжался до tol, выродился (вершины почти
+                     в одной гиперплоскости) или restart_window итераций нет улучшения, вокруг лучшей вершины
+                     строится новый ориентированный симплекс начального размера, если с прошлого перезапуска
+                     значение улучшилось.
+    :param restart_window: Число итераций без заметного улучшения, после которого поиск перезапускается.
+    :return: OptimizeResult (распаковывается как оптимальная точка, значение функции и число итераций).
+             Счетчики: reflect, expand, contract, shrink - число выполненных шагов каждого вида
+             (с моделью также surrogate_proposed и surrogate_accepted, с перезапусками - restarts).
     """
+    optimizer = NelderMead(x0, alpha, beta, gamma, tol, max_iter, batch=batch, adaptive=adaptive,
+                           surrogate=surrogate, restarts=restarts, restart_window=restart_window)
+    params = {"x0": np.array(x0, dtype=float), "alpha": alpha, "beta": beta, "gamma": gamma, "tol": tol,
+              "max_iter": max_iter, "batch": batch, "adaptive": adaptive, "max_evals": max_evals,
+              "max_time": max_time, "f_target": f_target, "stall_window": stall_window, "stall_tol": stall_tol,
+              "surrogate": None if optimizer.surrogate is None else optimizer.surrogate.model,
+              "restarts": restarts, "restart_window": restart_window}
+    return run_optimizer(optimizer, func, callback, max_evals, max_time, f_target, stall_window, stall_tol,
+                         checkpoint=checkpoint, params=params, batch=batch)
 
-    def sort_simplex(simplex, func):
-        """
-        Сортировка точек симплекса по значению функции.
-        """
-        values = [func(*point) for point in simplex]
-        sorted_simplex = [x for _, x in sorted(zip(values, simplex), key=lambda pair: pair[0])]
-        return sorted_simplex
-
-    # 1. Инициализация симплекса
-    n = len(x0)
-    simplex = [x0.tolist()]  # Начальная точка
-    for i in range(n):
-        x_new = np.copy(x0)
-        x_new[i] += 1.0  # Отклоняем одну координату для формирования симплекса
-        simplex.append(x_new.tolist())
-
-    simplex = np.array(simplex)
-    count_iter = 0
-
-    while count_iter < max_iter:
-        # 2. Сортировка точек симплекса по значению функции
-        simplex = sort_simplex(simplex, func)
-        x_best = simplex[0]
-        x_worst = simplex[-1]
-        x_second_worst = simplex[-2]
-        centroid = np.mean(simplex[:-1], axis=0)
-
-        # 3. Шаг отражения
-        x_reflection = centroid + alpha * (centroid - x_worst)
-        if func(*x_reflection) < func(*x_second_worst):
-            if func(*x_reflection) < func(*x_best):
-                # Шаг растяжения
-                x_expansion = centroid + gamma * (x_reflection - centroid)
-                if func(*x_expansion) < func(*x_reflection):
-                    simplex[-1] = x_expansion
-                else:
-                    simplex[-1] = x_reflection
-            else:
-                simplex[-1] = x_reflection
-        else:
-            # Шаг сжатия
-            x_contraction = centroid + beta * (x_worst - centroid)
-            if func(*x_contraction) < func(*x_worst):
-                simplex[-1] = x_contraction
-            else:
-                # Шаг редукции
-                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
 
-        # 4. Проверка на сходимость
-        if np.linalg.norm(simplex[0] - simplex[-1]) < tol:
-            break
-
-        count_iter += 1
-
-    # Возвращаем оптимальную точку и значение функции
-    return simplex[0], func(*simplex[0]), count_iter
+def _affine(origin, coefficient, a, b, out):
+    """
+    out = origin + coefficient * (a - b) без временных массивов.
+    """
+    np.subtract(a, b, out=out)
+    out *= coefficient
+    out += origin
+    return out
@@ -0,0 +1,167 @@
+import math
+from time import perf_counter
+
+import numpy as np
+
+from app.derivatives import numerical_gradient, numerical_hessian
+from app.evaluation import BudgetExhausted, as_evaluator
+from app.result import CALLBACK, CONVERGED, MAX_ITER, NO_DECREASE, OptimizeResult
+from app.stopping import Stopping
+
+
+def steihaug_cg(g, hessian, radius):
+    """
+    Приближенное решение подзадачи доверительной области min g·p + p·H·p / 2 при |p| <= radius
+    методом сопряженных градиентов Штайхауга: итерации обрываются на границе области
+    или на направлении неположительной кривизны, поэтому H может быть незнакоопределенной.
+
+    :param g: Градиент.
+    :param hessian: Матрица Гессе.
+    :param radius: Радиус доверительной области.
+    :return: Шаг p, признак выхода на границу области и число итераций.
+    """
+    z = np.zeros_like(g)
+    r = g.copy()
+    d = -r
+    g_norm = np.linalg.norm(g)
+    eps = min(0.5, math.sqrt(g_norm)) * g_norm  # Требуемая точность растет по мере сходимости
+    if g_norm <= eps:
+        return z, False, 0
+
+    for k in range(1, 2 * len(g) + 1):
+        hd = hessian @ d
+        curvature = d @ hd
+        if curvature <= 0:
+            return z + _to_boundary(z, d, radius) * d, True, k
+        alpha = (r @ r) / curvature
+        z_new = z + alpha * d
+        if np.linalg.norm(z_new) >= radius:
+            return z + _to_boundary(z, d, radius) * d, True, k
+        r_new = r + alpha * hd
+        if np.linalg.norm(r_new) < eps:
+            return z_new, False, k
+        d = -r_new + (r_new @ r_new) / (r @ r) * d
+        z, r = z_new, r_new
+    return z, False, 2 * len(g)
+
+
+def _to_boundary(z, d, radius):
+    """
+    Положительный корень уравнения |z + t·d| = radius.
+    """
+    a, b, c = d @ d, 2 * (z @ d), z @ z - radius ** 2
+    return (-b + math.sqrt(b * b - 4 * a * c)) / (2 * a)
+
+
+def newton(func, x0, grad=None, hess=None, tol=1e-6, max_iter=1000, radius=1.0, max_radius=1000.0, eta=0.15,
+           callback=None, max_evals=None, max_time=None, f_target=None, stall_window=None, stall_tol=1e-8):
+    """
+    Метод Ньютона с доверительной областью.
+
+    Шаг ищется по квадратичной модели с точной матрицей Гессе внутри области радиуса radius
+    (метод Штайхауга); радиус уменьшается, если модель плохо предсказывает убывание функции,
+    и увеличивается, если шаг удачный и упирается в границу.
+
+    :param func: Целевая функция (или Evaluator, чтобы получить счетчики вычислений).
+    :param x0: Начальная точка.
+    :param grad: Градиент grad(*x) -> массив длины n (None - центральные разности по func).
+    :param hess: Матрица Гессе hess(*x) -> массив (n, n) (None - центральные разности градиента).
+    :param tol: Точность ε: поиск останавливается, когда норма градиента меньше tol.
+    :param max_iter: Максимальное число итераций (пробных шагов).
+    :param radius: Начальный радиус доверительной области.
+    :param max_radius: Максимальный радиус.
+    :param eta: Минимальное отношение фактического убывания к предсказанному для принятия шага.
+    :param callback: Функция callback(k, x, value), вызываемая после каждой итерации;
+                     если она возвращает True, поиск останавливается.
+    :param max_evals: Максимальное число вычислений функции.
+    :param max_time: Максимальное время работы, с.
+    :param f_target: Целевое значение функции.
+    :param stall_window: Число итераций без улучшения, после которого поиск останавливается.
+    :param stall_tol: Относительное улучшение, которое считается улучшением (см. Stopping).
+    :return: OptimizeResult (распаковывается как оптимальная точка, значение функции и число итераций).
+             Причина NO_DECREASE - модель не предсказывает убывания или доверительная область сжалась
+             до машинной точности, хотя норма градиента больше tol (например, из-за погрешности производных).
+             Счетчики: njev и nhev - число вычислений градиента и матрицы Гессе,
+             cg_iterations - итерации сопряженных градиентов, rejected - отклоненные шаги.
+    """
+    func = as_evaluator(func)
+    start_time = perf_counter()
+    start_nfev = func.nfev
+    counters = {"njev": 0, "nhev": 0, "cg_iterations": 0, "rejected": 0}
+    reason = MAX_ITER
+
+    def gradient(point):
+        counters["njev"] += 1
+        if grad is None:
+            return numerical_gradient(func, point)
+        return np.asarray(grad(*point), dtype=float)
+
+    def hessian(point):
+        counters["nhev"] += 1
+        if hess is None:
+            return numerical_hessian(lambda *args: gradient(np.array(args)), point)
+        return np.asarray(hess(*point), dtype=float)
+
+    # 1. Инициализация
+    x = np.array(x0, dtype=float)
+    value = func(*x)
+    g = gradient(x)
+    h = hessian(x)
+    count_iter = 0
+
+    stopping = Stopping(max_evals, max_time, f_target, stall_window, stall_tol)
+    stopping.start(func, start_nfev, start_time)
+    try:
+        while count_iter < max_iter:
+            # 2. Проверка на сходимость по норме градиента
+            if np.linalg.norm(g) < tol:
+                reason = CONVERGED
+                break
+            if radius < np.finfo(float).eps * (1 + np.linalg.norm(x)):
+                # Область сжалась при градиенте больше tol: модель не согласуется с функцией, это не сходимость
+                reason = NO_DECREASE
+                break
+
+            # 3. Шаг по квадратичной модели внутри доверительной области
+            p, on_boundary, cg_iterations = steihaug_cg(g, h, radius)
+            counters["cg_iterations"] += cg_iterations
+            predicted = -(g @ p + p @ h @ p / 2)
+            if predicted == 0:
+                # Шаг модели ничего не меняет (например, нулевой): уменьшение области не поможет
+                reason = NO_DECREASE
+                break
+            value_new = func(*(x + p))
+            ratio = (value - value_new) / predicted if predicted > 0 else -1.0
+
+            # 4. Изменение радиуса по качеству модели
+            if ratio < 0.25:
+                radius = np.linalg.norm(p) / 4
+            elif ratio > 0.75 and on_boundary:
+                radius = min(2 * radius, max_radius)
+
+            # 5. Принятие или отклонение шага
+            if ratio > eta:
+                x = x + p
+                value = value_new
+                g = gradient(x)
+                h = hessian(x)
+            else:
+                counters["rejected"] += 1
+
+            count_iter += 1
+
+            if callback is not None and callback(count_iter, x, value):
+                reason = CALLBACK
+                break
+
+            stop = stopping.check(value)
+            if stop is not None:
+                reason = stop
+                break
+    except BudgetExhausted as e:
+        reason = e.reason  # Бюджет исчерпан посреди итерации: текущее состояние не изменялось
+    finally:
+        stopping.finish()
+
+    return OptimizeResult(x, value, count_iter, nfev=func.nfev - start_nfev, time=perf_counter() - start_time,
+                          reason=reason, counters=counters)
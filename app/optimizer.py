@@ -0,0 +1,293 @@
+from time import perf_counter
+
+import numpy as np
+
+from app.checkpoint import as_checkpoint
+from app.evaluation import BudgetExhausted, as_evaluator
+from app.result import CALLBACK, OptimizeResult
+from app.stopping import Stopping
+from app.surrogate import make_surrogate
+
+RESTART_TOL = 1e-8  # Относительное улучшение, которое считается продвижением между перезапусками (как stall_tol)
+
+
+class Optimizer:
+    """
+    Пошаговый (ask/tell) метод оптимизации: метод не вызывает целевую функцию сам, а запрашивает ее значения.
+
+    ask() возвращает точки, значения в которых нужны методу, tell(values) передает эти значения.
+    Вычисления можно выполнять где угодно: пакетами сразу для многих оптимизаторов, в очереди задач
+    или вперемешку с другой работой. Функции hooke_jeeves, nelder_mead и powell - циклы над такими
+    объектами с вычислением через Evaluator (см. run_optimizer).
+
+    Метод записан генератором _iterate: он отдает массивы запрашиваемых точек, а в конце каждой
+    итерации - None. Состояние между итерациями хранится в атрибутах, поэтому между итерациями
+    (пока запроса нет) оптимизатор сохраняется pickle, а после загрузки генератор создается заново
+    с начала следующей итерации (см. Checkpoint).
+
+    Атрибуты: nit - число итераций, nfev - число вычислений по данным tell, reason - причина остановки
+    (None, пока поиск идет), counters - счетчики по фазам метода, x и fun - текущая точка метода и значение
+    в ней (после завершения - результат), stop_below - для запросов параллельного поиска: вычисления можно
+    прекратить на первом значении меньше stop_below (значения невычисленных точек передаются как nan).
+
+    :param surrogate: Модель для дорогих функций ("quadratic", "rbf" или Surrogate).
+    :param trace: Trace для записи точек (не сохраняется pickle).
+    :param restarts: Наибольшее число перезапусков вокруг лучшей точки при вырождении или застое (см. _restart_due).
+    :param restart_window: Число итераций без заметного улучшения, после которого метод перезапускается
+                           (None - перезапуск только при сходимости или вырождении).
+    """
+
+    name = None  # Внутреннее имя метода (см. app.core.METHODS)
+
+    def __init__(self, surrogate=None, trace=None, restarts=0, restart_window=None):
+        self.nit = 0
+        self.nfev = 0
+        self.reason = None
+        self.counters = {}
+        self.x = None
+        self.fun = None
+        self.stop_below = None
+        self.surrogate = make_surrogate(surrogate)
+        if self.surrogate is not None:
+            self.surrogate.start()
+        self.trace = trace
+        self.restarts = restarts
+        self.restart_window = restart_window
+        self._restart_value = np.inf  # Лучшее значение на момент последнего перезапуска
+        self._best_value, self._stall = np.inf, 0  # Лучшее значение и число итераций без улучшения
+        self._steps = None  # Генератор шагов метода
+        self._request = None  # Точки, ожидающие значений
+        self._finished = False
+
+    @property
+    def done(self):
+        return self._finished
+
+    def ask(self):
+        """
+        Точки, значения в которых нужны методу.
+
+        :return: Массив (m, n) или None, если поиск завершен. Массив принадлежит оптимизатору
+                 и может измениться после tell.
+        """
+        while self._request is None and not self._finished:
+            self._advance(None)
+        return self._request
+
+    def tell(self, values, nfev=None):
+        """
+        Передача значений функции в точках последнего запроса.
+
+        :param values: Значения функции в порядке точек запроса.
+        :param nfev: Сколько значений действительно вычислено (меньше len(values), если часть взята из кэша).
+        """
+        request = self._request
+        if request is None:
+            raise RuntimeError("Нет запроса точек: перед tell нужно вызвать ask")
+        if len(values) != len(request):
+            raise ValueError(f"Ожидалось значений: {len(request)}, получено: {len(values)}")
+        self.nfev += len(values) if nfev is None else nfev
+        if self.surrogate is not None:
+            for point, value in zip(request, values):
+                self.surrogate.observe(point, value)
+        self._advance(values)
+
+    def stop(self, reason):
+        """
+        Остановка по внешней причине (обработчик итераций, бюджет, критерий остановки).
+        После нее ask может вернуть точки, значения в которых нужны для результата.
+        """
+        if self._finished:
+            return
+        if self._steps is not None:
+            self._steps.close()
+            self._steps = None
+        self.reason = reason
+        self._request = None
+
+    def result(self, time=0.0):
+        """
+        OptimizeResult завершенного поиска (nfev - по данным tell).
+        """
+        return OptimizeResult(np.array(self.x), self.fun, self.nit, nfev=self.nfev, time=time, reason=self.reason,
+                              counters=self.counters)
+
+    def _advance(self, values):
+        if self._steps is None:
+            self._steps = self._finish() if self.reason is not None else self._run()
+        try:
+            self._request = self._steps.send(values)
+        except StopIteration:
+            self._steps, self._request, self._finished = None, None, True
+            if self.surrogate is not None:
+                self.counters.update(self.surrogate.counters)
+
+    def _run(self):
+        yield from self._iterate()
+        yield from self._finish()
+
+    def _iterate(self):
+        """
+        Итерации метода до остановки: генератор запросов точек, None в конце каждой итерации.
+        Причину остановки записывает в reason.
+        """
+        raise NotImplementedError
+
+    def _finish(self):
+        """
+        Подготовка результата после остановки (может запрашивать точки): записывает x и fun.
+        """
+        yield from ()
+
+    def _surrogate_step(self, center, value, scale):
+        """
+        Шаг к минимуму модели surrogate вокруг center.
+
+        :return: Точка модели и значение в ней или None, если кандидата нет или он не лучше center.
+        """
+        candidate = self.surrogate.propose(center, scale)
+        if candidate is None:
+            return None
+        candidate_value = (yield candidate[np.newaxis])[0]
+        if self.surrogate.accept(candidate_value, value):
+            return candidate, candidate_value
+        return None
+
+    def _restart_due(self, value, stuck=False):
+        """
+        Учет итерации с лучшим значением value и решение о перезапуске.
+
+        Перезапуск нужен, если метод застрял (stuck: сошелся или выродился) или restart_window итераций
+        подряд нет заметного улучшения. Он выполняется, пока не исчерпано число перезапусков и только если
+        с прошлого перезапуска значение заметно улучшилось: иначе точка - действительно минимум с точностью
+        метода. Засчитывает перезапуск в counters["restarts"].
+        """
+        if _improves(value, self._best_value):
+            self._stall = 0
+        else:
+            self._stall += 1
+        self._best_value = min(self._best_value, value)
+        if not stuck and (self.restart_window is None or self._stall < self.restart_window):
+            return False
+        if self.counters["restarts"] >= self.restarts:
+            return False
+        if not _improves(value, self._restart_value):
+            return False
+        self.counters["restarts"] += 1
+        self._restart_value, self._stall = value, 0
+        return True
+
+    def __getstate__(self):
+        if self._request is not None:
+            raise ValueError("Оптимизатор сохраняется только между итерациями (пока нет запроса точек)")
+        state = self.__dict__.copy()
+        state["_steps"] = None  # Генератор создается заново с начала итерации
+        state["trace"] = None
+        return state
+
+
+def _improves(value, reference):
+    """
+    value заметно меньше reference (относительно на RESTART_TOL, любое конечное значение меньше inf).
+    """
+    if reference == np.inf:
+        return value < reference
+    return value < reference - RESTART_TOL * max(1.0, abs(reference))
+
+
+def run_optimizer(optimizer, func, callback=None, max_evals=None, max_time=None, f_target=None, stall_window=None,
+                  stall_tol=1e-8, checkpoint=None, params=None, batch=False, executor=None):
+    """
+    Цикл ask/tell над оптимизатором: значения вычисляются Evaluator, в конце каждой итерации
+    вызывается callback, проверяются критерии остановки и сохраняется контрольная точка.
+
+    Запросы из одной точки вычисляются обычным вызовом, из нескольких - пакетом (batch),
+    на пуле executor или по одной точке; значения передаются оптимизатору вместе с числом
+    фактических вычислений (без взятых из кэша).
+
+    :param optimizer: Optimizer.
+    :param func: Целевая функция (или Evaluator, чтобы получить счетчики вычислений).
+    :param callback: Функция callback(k, x, value), вызываемая после каждой итерации;
+                     если она возвращает True, поиск останавливается.
+    :param max_evals: Максимальное число вычислений функции.
+    :param max_time: Максимальное время работы, с.
+    :param f_target: Целевое значение функции.
+    :param stall_window: Число итераций без улучшения, после которого поиск останавливается.
+    :param stall_tol: Относительное улучшение, которое считается улучшением (см. Stopping).
+    :param checkpoint: Checkpoint или путь к файлу (см. app.checkpoint).
+    :param params: Параметры запуска метода для продолжения с контрольной точки (см. app.checkpoint.resume).
+    :param batch: Вычислять запросы из нескольких точек одним векторизованным вызовом.
+    :param executor: Пул для параллельного вычисления запросов из нескольких точек.
+    :return: OptimizeResult (nfev - число вычислений Evaluator).
+    """
+
+    def evaluate(points):
+        nfev_before = func.nfev
+        if len(points) == 1:
+            values = [func(*points[0])]
+        elif executor is not None:
+            values = func.concurrent(points, executor, stop_below=optimizer.stop_below)
+        elif batch:
+            values = func.batch(points)
+        else:
+            values = [func(*point) for point in points]
+        optimizer.tell(values, func.nfev - nfev_before)
+
+    func = as_evaluator(func)  # Повторные вычисления в одной и той же точке берутся из кэша
+    start_time = perf_counter()
+    start_nfev = func.nfev
+    checkpoint = as_checkpoint(checkpoint)
+    state = None
+    if checkpoint is not None:
+        state = checkpoint.start(func, optimizer.name, params)
+    if state is not None:
+        # Продолжение с контрольной точки: оптимизатор сохранен целиком
+        trace = optimizer.trace
+        optimizer = state["optimizer"]
+        optimizer.trace = trace
+        start_nfev, start_time = state["start_nfev"], perf_counter() - state["elapsed"]
+
+    stopping = Stopping(max_evals, max_time, f_target, stall_window, stall_tol)
+    stopping.start(func, start_nfev, start_time)
+    if state is not None:
+        stopping.best, stopping.stall = state["stall"]
+    count_iter = optimizer.nit
+    try:
+        while True:
+            points = optimizer.ask()
+            if points is None:
+                break
+            evaluate(points)
+            if optimizer.nit == count_iter:
+                continue
+
+            # Конец итерации
+            count_iter = optimizer.nit
+            # Копия: рабочая точка метода (например, у Пауэлла) изменяется на месте следующей итерацией
+            if callback is not None and callback(count_iter, optimizer.x.copy(), optimizer.fun):
+                optimizer.stop(CALLBACK)
+                break
+
+            stop = stopping.check(optimizer.fun)
+            if stop is not None:
+                optimizer.stop(stop)
+                break
+
+            if checkpoint is not None and checkpoint.due(func):
+                checkpoint.save(func, {"optimizer": optimizer, "start_nfev": start_nfev,
+                                       "elapsed": perf_counter() - start_time,
+                                       "stall": (stopping.best, stopping.stall)})
+    except BudgetExhausted as e:
+        optimizer.stop(e.reason)  # Бюджет исчерпан посреди итерации: состояние метода не изменялось
+    finally:
+        stopping.finish()
+
+    # Точки, нужные для результата после остановки, вычисляются вне бюджета
+    points = optimizer.ask()
+    while points is not None:
+        evaluate(points)
+        points = optimizer.ask()
+    if checkpoint is not None:
+        checkpoint.complete()  # Завершенный запуск не продолжается: повторный запуск начнется заново
+    return OptimizeResult(np.array(optimizer.x), optimizer.fun, optimizer.nit, nfev=func.nfev - start_nfev,
+                          time=perf_counter() - start_time, reason=optimizer.reason, counters=optimizer.counters)
@@ -1,70 +1,308 @@
+import math
+
 import numpy as np
 
+from app.optimizer import Optimizer, run_optimizer
+from app.result import CONVERGED, MAX_ITER
+
+GOLDEN_RATIO = (1 + math.sqrt(5)) / 2  # Коэффициент расширения интервала при локализации минимума
+GOLDEN_SECTION = (3 - math.sqrt(5)) / 2  # Доля интервала для шага золотого сечения
+TINY = 1e-20  # Защита от деления на ноль в параболической интерполяции
+
 
-def powell(func, x0, tol=1e-6, max_iter=1000):
+def bracket_minimum(a=0.0, b=1.0, fa=None, grow_limit=100.0, max_iter=100):
     """
-    Реализация метода Пауэлла для минимизации функции без использования производных.
+    Локализация минимума функции одной переменной: поиск тройки a, b, c, для которой f(b) <= f(a) и f(b) <= f(c).
 
-    :param func: Целевая функция.
-    :param x0: Начальная точка (список или numpy массив).
-    :param tol: Точность (порог для остановки).
+    Интервал расширяется в сторону убывания функции (в том числе в отрицательном направлении)
+    шагами золотого сечения с параболической экстраполяцией.
+
+    Генератор шагов: отдает точки, в которых нужно значение функции, и принимает значения (send);
+    результат возвращается через yield from.
+
+    :param a: Первая начальная точка.
+    :param b: Вторая начальная точка.
+    :param fa: Значение f(a), если уже известно.
+    :param grow_limit: Максимальное расширение параболического шага.
+    :param max_iter: Максимальное число расширений интервала.
+    :return: Точки a, b, c и значения функции в них.
+    """
+    fa = (yield a) if fa is None else fa
+    fb = yield b
+    if fb > fa:
+        # Функция возрастает: ищем в противоположном направлении
+        a, b, fa, fb = b, a, fb, fa
+    c = b + GOLDEN_RATIO * (b - a)
+    fc = yield c
+
+    for _ in range(max_iter):
+        if fb <= fc:
+            break
+        # Параболическая экстраполяция по трем точкам
+        r = (b - a) * (fb - fc)
+        q = (b - c) * (fb - fa)
+        u = b - ((b - c) * q - (b - a) * r) / (2 * math.copysign(max(abs(q - r), TINY), q - r))
+        u_limit = b + grow_limit * (c - b)
+        if (b - u) * (u - c) > 0:
+            # Парабола указывает внутрь интервала (b, c)
+            fu = yield u
+            if fu < fc:
+                a, b, fa, fb = b, u, fb, fu
+                break
+            if fu > fb:
+                c, fc = u, fu
+                break
+            u = c + GOLDEN_RATIO * (c - b)
+            fu = yield u
+        elif (c - u) * (u - u_limit) > 0:
+            # Парабола указывает за c, но в допустимых пределах
+            fu = yield u
+            if fu < fc:
+                b, c, u = c, u, u + GOLDEN_RATIO * (u - c)
+                fb, fc = fc, fu
+                fu = yield u
+        elif (u - u_limit) * (u_limit - c) >= 0:
+            u = u_limit
+            fu = yield u
+        else:
+            u = c + GOLDEN_RATIO * (c - b)
+            fu = yield u
+        a, b, c = b, c, u
+        fa, fb, fc = fb, fc, fu
+
+    return a, b, c, fa, fb, fc
+
+
+def brent_minimize(a, b, c, fb, tol=1e-8, max_iter=100):
+    """
+    Метод Брента: поиск минимума функции одной переменной на локализованном интервале
+    сочетанием параболической интерполяции и золотого сечения.
+
+    Генератор шагов, как и bracket_minimum.
+
+    :param a: Граница интервала.
+    :param b: Точка внутри интервала с наименьшим известным значением.
+    :param c: Вторая граница интервала.
+    :param fb: Значение f(b).
+    :param tol: Точность по аргументу: относительная, а при |x| < 1 - абсолютная.
     :param max_iter: Максимальное число итераций.
-    :return: Оптимальная точка и значение функции в этой точке.
+    :return: Точка минимума и значение функции в ней.
+    """
+    low, high = min(a, c), max(a, c)
+    x = w = v = b
+    fx = fw = fv = fb
+    d = e = 0.0
+
+    for _ in range(max_iter):
+        middle = (low + high) / 2
+        tol1 = tol * (abs(x) + 1)  # Вблизи x = 0 точность абсолютная: минимум не уточняется до машинной точности
+        tol2 = 2 * tol1
+        if abs(x - middle) <= tol2 - (high - low) / 2:
+            break
+
+        use_golden = True
+        if abs(e) > tol1:
+            # Пробуем параболический шаг
+            r = (x - w) * (fx - fv)
+            q = (x - v) * (fx - fw)
+            p = (x - v) * q - (x - w) * r
+            q = 2 * (q - r)
+            if q > 0:
+                p = -p
+            q = abs(q)
+            e_previous, e = e, d
+            if abs(p) < abs(q * e_previous / 2) and q * (low - x) < p < q * (high - x):
+                use_golden = False
+                d = p / q
+                if (x + d) - low < tol2 or high - (x + d) < tol2:
+                    d = math.copysign(tol1, middle - x)
+        if use_golden:
+            e = (low - x) if x >= middle else (high - x)
+            d = GOLDEN_SECTION * e
+
+        u = x + d if abs(d) >= tol1 else x + math.copysign(tol1, d)
+        fu = yield u
+        if fu <= fx:
+            if u >= x:
+                low = x
+            else:
+                high = x
+            v, w, x = w, x, u
+            fv, fw, fx = fw, fx, fu
+        else:
+            if u < x:
+                low = u
+            else:
+                high = u
+            if fu <= fw or w == x:
+                v, w = w, u
+                fv, fw = fw, fu
+            elif fu <= fv or v == x or v == w:
+                v, fv = u, fu
+
+    return x, fx
+
+
+class Powell(Optimizer):
+    """
+    Метод Пауэлла в виде пошагового оптимизатора (ask/tell, см. Optimizer).
+
+    Параметры - как у powell. Точки линейных поисков запрашиваются по одной.
     """
 
-    def line_search(curr_func, curr_x, curr_direction):
+    name = "powell"
+
+    def __init__(self, x0, tol=1e-6, max_iter=1000, line_tol=1e-8, surrogate=None):
+        super().__init__(surrogate)
+        self.tol = tol
+        self.max_iter = max_iter
+        self.line_tol = line_tol
+
+        # 1. Инициализация
+        self.x = np.array(x0, dtype=float)  # Начальная точка
+        n = len(self.x)  # Размерность задачи
+        self.fun = None  # Значение в x (запрашивается в начале поиска)
+        self.directions = np.eye(n)  # Набор начальных направлений (единичные векторы)
+        self.counters = {"line_search_nfev_by_slot": [0] * n, "extrapolation_nfev": 0, "direction_updates": 0}
+        self.scale = 1.0  # Длина последней итерации: масштаб области модели
+        # Рабочие массивы выделяются один раз: точка линейного поиска, шаг, начало итерации и новое направление
+        self._probe, self._step, self._x_start, self._new_direction = np.empty(n), np.empty(n), np.empty(n), np.empty(n)
+
+    def _line_search(self, curr_x, curr_value, curr_direction):
         """
-        Линейный поиск минимума вдоль заданного направления.
-        :param curr_func: Целевая функция.
+        Линейный поиск минимума вдоль заданного направления (в обе стороны):
+        локализация интервала и уточнение методом Брента.
         :param curr_x: Текущая точка.
+        :param curr_value: Значение функции в текущей точке.
         :param curr_direction: Направление поиска.
-        :return: Оптимальное значение шага alpha.
+        :return: Оптимальное значение шага alpha и значение функции в новой точке.
         """
-        alpha = 0
-        step_size = 1e-3  # Шаг поиска
-        best_alpha = alpha
-        best_value = curr_func(*(curr_x + alpha * curr_direction))
-
-        # Простая стратегия поиска минимума вдоль направления
-        while True:
-            alpha += step_size
-            new_value = curr_func(*(curr_x + alpha * curr_direction))
-            if new_value < best_value:
-                best_value = new_value
-                best_alpha = alpha
-            else:
-                break  # Останавливаемся, если улучшения больше нет
-        return best_alpha
-
-    # 1. Инициализация
-    x = np.array(x0, dtype=float)  # Начальная точка
-    n = len(x)  # Размерность задачи
-    directions = np.eye(n)  # Набор начальных направлений (единичные векторы)
-    count_iter = 0  # Счетчик итераций
-
-    while count_iter < max_iter:
-        x_start = np.copy(x)  # Сохраняем начальную точку текущей итерации
-
-        # 2. Поочередный линейный поиск по всем направлениям
-        for i in range(n):
-            direction = directions[i]
-            alpha = line_search(func, x, direction)
-            x = x + alpha * direction  # Обновляем текущую точку
-
-        # 3. Генерация нового направления
-        new_direction = x - x_start  # Разница между новой и старой точкой
-        if np.linalg.norm(new_direction) < tol:  # Если шаг слишком мал, завершаем
-            break
-        new_direction /= np.linalg.norm(new_direction)  # Нормируем новое направление
+        a, b, c, _, fb, _ = yield from self._along(bracket_minimum(0.0, 1.0, fa=curr_value), curr_x, curr_direction)
+        alpha, value = yield from self._along(brent_minimize(a, b, c, fb, tol=self.line_tol), curr_x, curr_direction)
+        if value >= curr_value:
+            return 0.0, curr_value  # Улучшения вдоль направления нет
+        return alpha, value
 
-        # Добавляем новое направление и убираем самое старое
-        directions = np.vstack([directions[1:], new_direction])
+    def _along(self, steps, curr_x, curr_direction):
+        """
+        Выполнение генератора шагов одномерного поиска:
+        шаг alpha запрашивается как точка curr_x + alpha * curr_direction.
+        """
+        probe = self._probe
+        request = probe[np.newaxis]
+        value = None
+        try:
+            while True:
+                alpha = steps.send(value)
+                np.multiply(curr_direction, alpha, out=probe)  # probe = curr_x + alpha * curr_direction
+                np.add(probe, curr_x, out=probe)
+                value = (yield request)[0]
+        except StopIteration as stop:
+            return stop.value
 
-        # 4. Проверка сходимости
-        if np.linalg.norm(x - x_start) < tol:
-            break
+    def _iterate(self):
+        x, directions, counters = self.x, self.directions, self.counters
+        probe, step, x_start, new_direction = self._probe, self._step, self._x_start, self._new_direction
+        n = len(x)
+        if self.fun is None:
+            self.fun = (yield x[np.newaxis])[0]
 
-        count_iter += 1
+        while self.nit < self.max_iter:
+            if self.surrogate is not None:
+                # Переход в минимум модели до линейных поисков: они начинаются из него и подтверждают сходимость
+                proposal = yield from self._surrogate_step(x, self.fun, self.scale)
+                if proposal is not None:
+                    x[:], self.fun = proposal
+            x_start[:] = x  # Сохраняем начальную точку текущей итерации
+            value = value_start = self.fun
 
-    # 5. Возвращаем результат
-    return x, func(*x), count_iter
+            # 2. Поочередный линейный поиск по всем направлениям с учетом направления наибольшего убывания
+            biggest_decrease = 0.0
+            biggest_index = 0
+            for i in range(n):
+                direction = directions[i]
+                value_before = value
+                nfev_before = self.nfev
+                alpha, value = yield from self._line_search(x, value, direction)
+                counters["line_search_nfev_by_slot"][i] += self.nfev - nfev_before
+                np.multiply(direction, alpha, out=step)  # Обновляем текущую точку
+                x += step
+                self.fun = value
+                if value_before - value > biggest_decrease:
+                    biggest_decrease = value_before - value
+                    biggest_index = i
+
+            # 3. Генерация нового направления
+            np.subtract(x, x_start, out=new_direction)  # Разница между новой и старой точкой
+            self.scale = np.linalg.norm(new_direction)
+            if self.scale < self.tol:  # Если шаг слишком мал, завершаем
+                self.reason = CONVERGED
+                return
+
+            # 4. Правило Пауэлла: новое направление заменяет направление наибольшего убывания,
+            # если экстраполированная точка лучше начальной и набор направлений не вырождается
+            nfev_before = self.nfev
+            np.add(x, new_direction, out=probe)
+            value_extrapolated = (yield probe[np.newaxis])[0]
+            counters["extrapolation_nfev"] += self.nfev - nfev_before
+            if value_extrapolated < value_start:
+                t = (2 * (value_start - 2 * value + value_extrapolated) * (value_start - value - biggest_decrease) ** 2
+                     - biggest_decrease * (value_start - value_extrapolated) ** 2)
+                if t < 0:
+                    new_direction /= np.linalg.norm(new_direction)  # Нормируем новое направление
+                    nfev_before = self.nfev
+                    alpha, value = yield from self._line_search(x, value, new_direction)
+                    counters["line_search_nfev_by_slot"][-1] += self.nfev - nfev_before
+                    np.multiply(new_direction, alpha, out=step)
+                    x += step
+                    self.fun = value
+                    directions[biggest_index] = directions[-1]
+                    directions[-1] = new_direction
+                    counters["direction_updates"] += 1
+
+            self.nit += 1
+            yield None
+        self.reason = MAX_ITER
+
+    def _finish(self):
+        if self.fun is None:
+            self.fun = (yield self.x[np.newaxis])[0]
+
+
+def powell(func, x0, tol=1e-6, max_iter=1000, line_tol=1e-8, callback=None, max_evals=None, max_time=None,
+           f_target=None, stall_window=None, stall_tol=1e-8, surrogate=None, checkpoint=None):
+    """
+    Реализация метода Пауэлла для минимизации функции без использования производных
+    (цикл над пошаговым оптимизатором Powell).
+
+    :param func: Целевая функция (или Evaluator, чтобы получить счетчики вычислений).
+    :param x0: Начальная точка (список или numpy массив).
+    :param tol: Точность (порог для остановки).
+    :param max_iter: Максимальное число итераций.
+    :param line_tol: Точность линейного поиска по шагу (относительная, при малых шагах - абсолютная).
+    :param callback: Функция callback(k, x, value), вызываемая после каждой итерации;
+                     если она возвращает True, поиск останавливается.
+    :param max_evals: Максимальное число вычислений функции.
+    :param max_time: Максимальное время работы, с.
+    :param f_target: Целевое значение функции.
+    :param stall_window: Число итераций без улучшения, после которого поиск останавливается.
+    :param stall_tol: Относительное улучшение, которое считается улучшением (см. Stopping).
+    :param surrogate: Модель для дорогих функций ("quadratic", "rbf" или Surrogate): в начале итерации
+                      вычисляется минимум модели в области радиуса, пропорционального длине последней итерации;
+                      если он лучше текущей точки, линейные поиски итерации начинаются из него.
+    :param checkpoint: Checkpoint или путь к файлу: состояние периодически сохраняется, а если файл уже есть,
+                       поиск продолжается с сохраненного состояния (см. app.checkpoint.resume).
+    :return: OptimizeResult (распаковывается как оптимальная точка, значение функции и число итераций).
+             Счетчики: line_search_nfev_by_slot - число вычислений линейного поиска по позициям (слотам)
+             набора направлений: слот i - i-я строка набора, а не одно направление (при замене направление
+             последнего слота переходит в слот наибольшего убывания, новое занимает последний),
+             extrapolation_nfev - вычисления в экстраполированных точках,
+             direction_updates - число замен направлений
+             (с моделью также surrogate_proposed и surrogate_accepted).
+    """
+    optimizer = Powell(x0, tol, max_iter, line_tol, surrogate=surrogate)
+    params = {"x0": optimizer.x.copy(), "tol": tol, "max_iter": max_iter, "line_tol": line_tol, "max_evals": max_evals,
+              "max_time": max_time, "f_target": f_target, "stall_window": stall_window, "stall_tol": stall_tol,
+              "surrogate": None if optimizer.surrogate is None else optimizer.surrogate.model}
+    return run_optimizer(optimizer, func, callback, max_evals, max_time, f_target, stall_window, stall_tol,
+                         checkpoint=checkpoint, params=params)
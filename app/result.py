@@ -0,0 +1,69 @@
+import numpy as np
+
+from app.utils import format_number
+
+# Причины остановки
+CONVERGED = "converged"
+MAX_ITER = "max_iter"
+CALLBACK = "callback"
+MAX_EVALS = "max_evals"
+MAX_TIME = "max_time"
+TARGET = "f_target"
+STAGNATION = "stagnation"
+NO_DECREASE = "no_decrease"
+
+REASONS = {
+    CONVERGED: "достигнута точность ε",
+    MAX_ITER: "достигнуто максимальное число итераций",
+    CALLBACK: "остановлено обработчиком итераций",
+    MAX_EVALS: "достигнуто максимальное число вычислений функции",
+    MAX_TIME: "истекло отведенное время",
+    TARGET: "достигнуто целевое значение функции",
+    STAGNATION: "нет улучшения за заданное число итераций",
+    NO_DECREASE: "убывание функции не найдено, хотя норма градиента больше ε",
+}
+
+
+class OptimizeResult:
+    """
+    Результат оптимизации.
+
+    Распаковывается как кортеж (x, fun, nit), поэтому код, ожидающий (x, f, k), продолжает работать.
+
+    :param x: Оптимальная точка.
+    :param fun: Значение функции в оптимальной точке.
+    :param nit: Число итераций.
+    :param nfev: Число вычислений целевой функции.
+    :param time: Время работы в секундах.
+    :param reason: Причина остановки (CONVERGED, MAX_ITER, CALLBACK, MAX_EVALS, MAX_TIME, TARGET, STAGNATION,
+                   NO_DECREASE).
+    :param counters: Счетчики по фазам метода.
+
+    У результатов одновременного решения нескольких задач (app.lockstep) x, fun, nit, nfev и reason - массивы.
+    """
+
+    def __init__(self, x, fun, nit, nfev=0, time=0.0, reason=CONVERGED, counters=None):
+        self.x = x
+        self.fun = fun
+        self.nit = nit
+        self.nfev = nfev
+        self.time = time
+        self.reason = reason
+        self.counters = counters or {}
+
+    def __iter__(self):
+        return iter((self.x, self.fun, self.nit))
+
+    @property
+    def message(self):
+        if np.ndim(self.reason):
+            return [REASONS.get(reason, reason) for reason in self.reason]
+        return REASONS.get(self.reason, self.reason)
+
+    def __repr__(self):
+        if np.ndim(self.fun):
+            return (f"OptimizeResult(x={np.asarray(self.x).tolist()}, fun={np.asarray(self.fun).tolist()}, "
+                    f"nit={np.asarray(self.nit).tolist()}, nfev={np.asarray(self.nfev).tolist()}, "
+                    f"time={self.time:.6f}, reason={list(self.reason)}, counters={self.counters})")
+        return (f"OptimizeResult(x={list(self.x)}, fun={format_number(self.fun)}, nit={self.nit}, "
+                f"nfev={self.nfev}, time={self.time:.6f}, reason={self.reason!r}, counters={self.counters})")
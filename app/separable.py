@@ -0,0 +1,147 @@
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+import sympy as sp
+
+from app.compiler import compile_expression
+from app.core import get_method_name, run_method
+from app.result import CONVERGED, OptimizeResult
+from app.utils import available_cpus
+
+# Критерии, относящиеся ко всей сумме: для отдельной подзадачи они не имеют смысла
+WHOLE_PROBLEM_PARAMS = ("f_target",)
+
+
+def separable_groups(expr, params):
+    """
+    Разбиение аддитивно сепарабельного выражения на независимые группы переменных.
+
+    Слагаемые суммы, имеющие общие переменные, объединяются (система непересекающихся множеств),
+    так что выражение равно сумме выражений групп и константы.
+
+    :param expr: Выражение sympy.
+    :param params: Переменные выражения в порядке координат.
+    :return: Список групп (выражение группы, номера ее переменных по возрастанию) и постоянное слагаемое.
+    """
+    index = {param: i for i, param in enumerate(params)}
+    parent = list(range(len(params)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]  # Сжатие путей
+            i = parent[i]
+        return i
+
+    terms, constant = [], sp.Integer(0)
+    for term in sp.Add.make_args(expr):
+        symbols = [index[symbol] for symbol in term.free_symbols]
+        if not symbols:
+            constant += term
+            continue
+        terms.append((term, symbols))
+        for i in symbols[1:]:
+            parent[find(i)] = find(symbols[0])
+
+    groups = {}
+    for term, symbols in terms:
+        groups.setdefault(find(symbols[0]), []).append(term)
+    result = []
+    for root, group_terms in groups.items():
+        indices = [i for i in range(len(params)) if find(i) == root]
+        result.append((sp.Add(*group_terms), indices))
+    result.sort(key=lambda group: group[1][0])
+    return result, float(constant)
+
+
+def _solve_group(source, method, x0, tol, max_iter, method_params):
+    compiled = compile_expression(source)  # Кэш компиляции свой в каждом процессе
+    return run_method(method, compiled.func, x0, tol=tol, max_iter=max_iter, expression=compiled, **method_params)
+
+
+def _split(total, count):
+    """
+    Разбиение целого total на count почти равных долей.
+    """
+    return [total // count + (i < total % count) for i in range(count)]
+
+
+def solve_separable(compiled, x0, method, tol=1e-6, max_iter=1000, workers=None, **method_params):
+    """
+    Решение с предварительным разбиением на независимые подзадачи.
+
+    Если выражение - сумма слагаемых, не имеющих общих переменных, каждая группа переменных оптимизируется
+    выбранным методом отдельно, а результаты объединяются: вместо поиска в n-мерном пространстве выполняется
+    несколько поисков меньшей размерности. Бюджеты max_evals и max_time относятся ко всей задаче и делятся
+    между подзадачами: последовательно каждая получает равную долю остатка (неизрасходованное переходит
+    к следующим), в пуле процессов число вычислений делится поровну, а время - по числу волн подзадач.
+    Общее nfev не больше max_evals, если max_evals не меньше числа подзадач: начальная точка каждой
+    подзадачи вычисляется в любом случае.
+    stall_window действует на каждую подзадачу, f_target (целевое значение всей суммы) не передается.
+
+    :param compiled: CompiledExpression целевой функции.
+    :param x0: Начальная точка.
+    :param method: Внутреннее имя или название метода.
+    :param workers: Число процессов для подзадач (1 - последовательно, callback передается только в этом случае;
+                    по умолчанию число доступных ядер, а при заданном callback - 1).
+    :param method_params: Параметры метода (а также callback и критерии остановки).
+    :return: OptimizeResult всей задачи: fun - сумма значений подзадач, nit - наибольшее число итераций,
+             nfev - общее число вычислений; числовые счетчики подзадач суммируются, списки (например,
+             line_search_nfev_by_slot Пауэлла) объединяются по порядку подзадач, groups - число подзадач.
+    """
+    start_time = perf_counter()
+    method = get_method_name(method)
+    x0 = np.array(x0, dtype=float)
+    groups, constant = separable_groups(compiled.expr, compiled.params)
+    if len(groups) < 2:
+        result = run_method(method, compiled.func, x0, tol=tol, max_iter=max_iter, expression=compiled,
+                            **method_params)
+        result.counters["groups"] = 1
+        return result
+
+    params = {key: value for key, value in method_params.items() if key not in WHOLE_PROBLEM_PARAMS}
+    max_evals, max_time = params.pop("max_evals", None), params.pop("max_time", None)
+    tasks = [(str(expr), method, x0[indices], tol, max_iter) for expr, indices in groups]
+    if workers is None:
+        workers = 1 if params.get("callback") is not None else available_cpus()
+    workers = min(workers, len(tasks))
+    if workers > 1:
+        params.pop("callback", None)
+        shares = [dict(params) for _ in tasks]
+        if max_evals is not None:
+            for share, evals in zip(shares, _split(int(max_evals), len(tasks))):
+                share["max_evals"] = evals
+        if max_time is not None:
+            for share in shares:
+                share["max_time"] = max_time / -(-len(tasks) // workers)  # Подзадачи идут волнами по workers
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_solve_group, *task, share) for task, share in zip(tasks, shares)]
+            results = [future.result() for future in futures]
+    else:
+        results = []
+        for number, task in enumerate(tasks):
+            left = len(tasks) - number
+            share = dict(params)
+            if max_evals is not None:
+                share["max_evals"] = (int(max_evals) - sum(result.nfev for result in results)) // left
+            if max_time is not None:
+                share["max_time"] = max(max_time - (perf_counter() - start_time), 0.0) / left
+            results.append(_solve_group(*task, share))
+
+    # Объединение результатов подзадач
+    x = np.empty_like(x0)
+    counters = {}
+    for (_, indices), result in zip(groups, results):
+        x[indices] = result.x
+        for key, value in result.counters.items():
+            if isinstance(value, list):
+                counters[key] = counters.get(key, []) + value  # Счетчики по слотам направлений: подзадачи по порядку
+            elif isinstance(value, (int, float)):
+                counters[key] = counters.get(key, 0) + value
+            else:
+                counters[key] = value
+    counters["groups"] = len(groups)
+    reasons = [result.reason for result in results if result.reason != CONVERGED]
+    return OptimizeResult(x, sum(result.fun for result in results) + constant, max(result.nit for result in results),
+                          nfev=sum(result.nfev for result in results), time=perf_counter() - start_time,
+                          reason=reasons[0] if reasons else CONVERGED, counters=counters)
@@ -0,0 +1,78 @@
+import math
+from time import perf_counter
+
+from app.result import MAX_TIME, STAGNATION, TARGET
+
+
+class Stopping:
+    """
+    Общие для всех методов критерии остановки помимо точности и числа итераций.
+
+    Ограничения числа вычислений и времени устанавливаются на Evaluator и проверяются при каждом
+    вычислении функции, поэтому срабатывают и внутри итерации (например, в линейном поиске метода Пауэлла).
+    Целевое значение и застой проверяются по лучшему значению в конце каждой итерации.
+
+    :param max_evals: Максимальное число вычислений функции.
+    :param max_time: Максимальное время работы, с.
+    :param f_target: Целевое значение: поиск останавливается, как только оно достигнуто.
+    :param stall_window: Число итераций подряд без заметного улучшения, после которого поиск останавливается.
+    :param stall_tol: Относительное улучшение, которое считается заметным.
+    """
+
+    def __init__(self, max_evals=None, max_time=None, f_target=None, stall_window=None, stall_tol=1e-8):
+        self.max_evals = max_evals
+        self.max_time = max_time
+        self.f_target = f_target
+        self.stall_window = stall_window
+        self.stall_tol = stall_tol
+        self.deadline = None
+        self.best = math.inf
+        self.stall = 0
+        self._func = None
+        self._limits = None
+
+    def start(self, func, start_nfev=None, start_time=None):
+        """
+        Установка ограничений на Evaluator (прежние ограничения восстанавливает finish).
+
+        :param func: Evaluator метода.
+        :param start_nfev: Число вычислений на момент запуска метода (вычисления при инициализации входят в бюджет).
+        :param start_time: Момент запуска метода по perf_counter.
+        """
+        self._func = func
+        self._limits = (func.max_nfev, func.deadline)
+        if self.max_evals is not None:
+            func.max_nfev = (func.nfev if start_nfev is None else start_nfev) + int(self.max_evals)
+        if self.max_time is not None:
+            self.deadline = (perf_counter() if start_time is None else start_time) + float(self.max_time)
+            func.deadline = self.deadline
+        self.best = math.inf
+        self.stall = 0
+
+    def check(self, value):
+        """
+        Проверка в конце итерации.
+
+        :param value: Лучшее значение функции на текущей итерации.
+        :return: Причина остановки или None.
+        """
+        if self.f_target is not None and value <= self.f_target:
+            return TARGET
+        if self.stall_window is not None:
+            # Первое конечное значение - всегда улучшение (порог inf - inf был бы nan)
+            threshold = self.best if self.best == math.inf else self.best - self.stall_tol * max(1.0, abs(self.best))
+            if value < threshold:
+                self.stall = 0
+            else:
+                self.stall += 1
+            self.best = min(self.best, value)
+            if self.stall >= self.stall_window:
+                return STAGNATION
+        if self.deadline is not None and perf_counter() > self.deadline:
+            return MAX_TIME  # Итерации без новых вычислений (все точки из кэша)
+        return None
+
+    def finish(self):
+        if self._func is not None:
+            self._func.max_nfev, self._func.deadline = self._limits
+            self._func = None
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from app.newton import steihaug_cg
+
+SURROGATE_MODELS = ("quadratic", "rbf")
+MAX_COOLDOWN = 8  # Наибольшее число пропускаемых предложений после неудачных подряд
+FIT_POINTS = 4  # Во сколько раз больше точек, чем коэффициентов модели, берется из архива для построения
+RBF_SAMPLES = 50  # Число случайных кандидатов для минимизации RBF модели (на одну переменную и раунд)
+RBF_ROUNDS = 6  # Число раундов сужения области поиска минимума RBF модели
+
+
+class Surrogate:
+    """
+    Локальная модель целевой функции по уже вычисленным точкам для дорогих функций.
+
+    Модель (квадратичная по методу наименьших квадратов или RBF) строится по ближайшим к текущей точке
+    точкам архива и предлагает кандидата - минимум модели в доверительной области вокруг текущей точки.
+    Целевая функция вычисляется только в кандидате (propose): он принимается методом, если значение
+    действительно меньше текущего (accept). После отклоненного кандидата следующие предложения
+    пропускаются (их число удваивается при неудачах подряд), чтобы модель не тратила вычисления впустую.
+
+    Архив пополняется всеми значениями, переданными оптимизатору (см. Optimizer.tell).
+
+    :param model: "quadratic" (нужно (n+1)(n+2)/2 точек, подходит для небольших n) или "rbf" (scipy, n+1 точек).
+    :param radius: Радиус доверительной области в единицах масштаба метода
+                   (шаг Хука-Дживса, размер симплекса Нелдера-Мида, последний шаг Пауэлла).
+    :param max_points: Наибольшее число точек архива (старые вытесняются).
+    :param seed: Зерно генератора кандидатов RBF модели.
+    """
+
+    def __init__(self, model="quadratic", radius=2.0, max_points=500, seed=0):
+        if model not in SURROGATE_MODELS:
+            raise ValueError(f"Неизвестная модель: {model}")
+        self.model = model
+        self.radius = radius
+        self.max_points = max_points
+        self.archive = OrderedDict()  # Точка (кортеж координат) -> значение функции
+        self.counters = {"surrogate_proposed": 0, "surrogate_accepted": 0}
+        self._rng = np.random.default_rng(seed)
+        self._cooldown = 0  # Длительность пропуска после следующего отклонения
+        self._skip = 0  # Сколько предложений еще пропустить
+
+    def observe(self, point, value):
+        """
+        Добавление вычисленной точки в архив (повторно переданные точки не дублируются).
+        """
+        key = tuple(map(float, point))
+        if np.isfinite(value) and key not in self.archive:
+            self.archive[key] = float(value)
+            if len(self.archive) > self.max_points:
+                self.archive.popitem(last=False)  # Вытесняем самую старую точку
+
+    def start(self):
+        """
+        Начало запуска метода: счетчики сбрасываются, архив сохраняется
+        (Surrogate можно передать в следующий запуск той же функции).
+        """
+        self.counters = dict.fromkeys(self.counters, 0)
+
+    def propose(self, center, scale):
+        """
+        Кандидат - минимум модели в доверительной области вокруг center.
+
+        :param center: Текущая точка.
+        :param scale: Масштаб метода (радиус области - radius * scale).
+        :return: Точка, значение в которой нужно проверить (см. accept), или None, если кандидата нет.
+        """
+        if self._skip > 0:
+            self._skip -= 1
+            return None
+        model = self._fit(center, self.radius * scale)
+        if model is None:
+            return None
+        candidate = model()
+        if np.linalg.norm(candidate - center) <= 1e-12 * (1 + np.linalg.norm(center)):
+            return None
+        self.counters["surrogate_proposed"] += 1
+        return candidate
+
+    def accept(self, candidate_value, value):
+        """
+        Проверка кандидата: он принимается, если значение в нем меньше значения value в текущей точке.
+        После отклонения следующие предложения пропускаются.
+        """
+        if candidate_value < value:
+            self.counters["surrogate_accepted"] += 1
+            self._cooldown = 0
+            return True
+        self._cooldown = min(2 * self._cooldown or 1, MAX_COOLDOWN)
+        self._skip = self._cooldown
+        return False
+
+    def _fit(self, center, radius):
+        """
+        Модель по ближайшим к center точкам архива.
+
+        :return: Функция minimize() -> кандидат или None, если точек недостаточно.
+        """
+        n = len(center)
+        if self.model == "quadratic":
+            needed = (n + 1) * (n + 2) // 2
+        else:
+            needed = n + 2
+        if len(self.archive) < needed:
+            return None
+        points = np.array(list(self.archive))
+        values = np.fromiter(self.archive.values(), dtype=float, count=len(self.archive))
+        nearest = np.argsort(np.linalg.norm(points - center, axis=1), kind="stable")[:FIT_POINTS * needed]
+        points, values = points[nearest], values[nearest]
+        if self.model == "quadratic":
+            return self._fit_quadratic(center, radius, points, values)
+        return self._fit_rbf(center, radius, points, values)
+
+    def _fit_quadratic(self, center, radius, points, values):
+        n = len(center)
+        z = (points - center) / radius  # Масштабирование улучшает обусловленность системы
+        upper = np.triu_indices(n)
+        features = np.hstack([np.ones((len(z), 1)), z, z[:, upper[0]] * z[:, upper[1]]])
+        # Если точки не определяют все коэффициенты (например, лежат на прямых линейных поисков),
+        # берется решение наименьшей нормы: кандидат все равно проверяется вычислением функции
+        coef = np.linalg.lstsq(features, values, rcond=None)[0]
+        g = coef[1:n + 1] / radius
+        hessian = np.zeros((n, n))
+        hessian[upper] = coef[n + 1:] / radius ** 2
+        hessian += hessian.T  # Диагональ удваивается: d²(c z_i²)/dz_i² = 2c
+
+        def minimize():
+            # Подзадача доверительной области: H может быть незнакоопределенной
+            p, _, _ = steihaug_cg(g, hessian, radius)
+            return center + p
+
+        return minimize
+
+    def _fit_rbf(self, center, radius, points, values):
+        from scipy.interpolate import RBFInterpolator
+
+        points, unique = np.unique(points, axis=0, return_index=True)
+        try:
+            model = RBFInterpolator(points, values[unique], kernel="thin_plate_spline")
+        except (np.linalg.LinAlgError, ValueError):
+            return None
+        n = len(center)
+
+        def minimize():
+            # Минимум модели ищется случайным поиском в сужающихся шарах (модель дешевая, функция - нет)
+            best, size = center, radius
+            for _ in range(RBF_ROUNDS):
+                directions = self._rng.normal(size=(RBF_SAMPLES * n, n))
+                directions /= np.linalg.norm(directions, axis=1)[:, np.newaxis]
+                lengths = size * self._rng.random(RBF_SAMPLES * n) ** (1 / n)  # Равномерно по объему шара
+                candidates = np.vstack([best, best + directions * lengths[:, np.newaxis]])
+                # Кандидаты за пределами доверительной области проецируются на ее границу
+                offsets = candidates - center
+                norms = np.linalg.norm(offsets, axis=1)
+                outside = norms > radius
+                candidates[outside] = center + offsets[outside] * (radius / norms[outside])[:, np.newaxis]
+                best = candidates[np.argmin(model(candidates))]
+                size /= 4
+            return best
+
+        return minimize
+
+
+def make_surrogate(surrogate):
+    """
+    Surrogate по значению параметра surrogate метода: None, имя модели или готовый Surrogate.
+    """
+    if surrogate is None or isinstance(surrogate, Surrogate):
+        return surrogate
+    return Surrogate(surrogate)
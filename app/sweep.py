@@ -0,0 +1,336 @@
+import argparse
+import itertools
+import json
+import math
+import sys
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from app.benchmark import PROBLEMS, QUICK_DIMS, run_case
+from app.core import METHOD_PARAMS
+from app.utils import available_cpus
+
+# Сетки коэффициентов по умолчанию (включают значения по умолчанию из METHOD_PARAMS)
+SWEEP_GRIDS = {
+    "hooke_jeeves": {"step_size": [0.1, 0.25, 0.5, 1.0, 2.0], "step_reduction": [0.2, 0.35, 0.5, 0.65, 0.8]},
+    "nelder_mead": {"alpha": [0.75, 1.0, 1.25, 1.5], "beta": [0.25, 0.5, 0.75], "gamma": [1.5, 2.0, 2.5, 3.0]},
+}
+# Области случайного поиска: нижняя и верхняя граница и признак логарифмической шкалы
+SWEEP_SPACES = {
+    "hooke_jeeves": {"step_size": (0.05, 4.0, True), "step_reduction": (0.1, 0.9, False)},
+    "nelder_mead": {"alpha": (0.5, 2.0, False), "beta": (0.1, 0.9, False), "gamma": (1.2, 4.0, False)},
+}
+SUCCESS_TOL = 1e-4  # Задача решена, если ошибка по значению функции не больше этого порога
+HEATMAP_BINS = 8  # Наибольшее число значений по оси тепловой карты (при случайном поиске значения группируются)
+SIGNIFICANT_DIGITS = 4  # Точность случайных коэффициентов: одинаковые клетки совпадают в кэше
+
+
+def sweep_cells(method, grid=None, samples=None, seed=0):
+    """
+    Наборы коэффициентов метода для перебора.
+
+    :param method: Внутреннее имя метода (ключ SWEEP_GRIDS).
+    :param grid: Сетка {коэффициент: значения} вместо SWEEP_GRIDS[method].
+    :param samples: Число случайных наборов из SWEEP_SPACES[method] (None - перебор сетки).
+    :param seed: Зерно случайного поиска.
+    :return: Список словарей коэффициентов.
+    """
+    if samples is None:
+        grid = grid or SWEEP_GRIDS[method]
+        names = list(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+    rng = np.random.default_rng(seed)
+    cells = []
+    for _ in range(samples):
+        cell = {}
+        for name, (low, high, log) in SWEEP_SPACES[method].items():
+            value = math.exp(rng.uniform(math.log(low), math.log(high))) if log else rng.uniform(low, high)
+            cell[name] = float(f"{value:.{SIGNIFICANT_DIGITS}g}")
+        cells.append(cell)
+    return cells
+
+
+def _case_key(case):
+    return json.dumps(case, sort_keys=True)
+
+
+def run_sweep_case(case):
+    """
+    Запуск метода с набором коэффициентов на одной задаче (выполняется в процессе пула).
+
+    :return: Запись benchmark.run_case с полями params и solved.
+    """
+    record = run_case(case["problem"], case["dim"], case["method"], max_iter=case["max_iter"], tol=case["tol"],
+                      **case["params"])
+    record["params"] = case["params"]
+    record["tol"], record["max_iter"] = case["tol"], case["max_iter"]
+    return record
+
+
+def run_sweep(methods=tuple(SWEEP_GRIDS), problems=None, dims=QUICK_DIMS, grids=None, samples=None, seed=0,
+              cache=None, workers=None, tol=1e-6, max_iter=1000):
+    """
+    Перебор коэффициентов методов на наборе задач в пуле процессов.
+
+    Каждая клетка (метод, коэффициенты, задача, размерность) - отдельный запуск. Завершенные клетки
+    дописываются в файл cache (JSONL) сразу по готовности, а при повторном запуске с тем же файлом
+    не пересчитываются, поэтому прерванный перебор продолжается с места остановки.
+
+    :param methods: Методы (ключи SWEEP_GRIDS).
+    :param problems: Задачи (ключи benchmark.PROBLEMS, по умолчанию все).
+    :param dims: Размерности.
+    :param grids: Сетки коэффициентов по методам вместо SWEEP_GRIDS.
+    :param samples: Число случайных наборов коэффициентов каждого метода (None - перебор сетки).
+    :param seed: Зерно случайного поиска.
+    :param cache: Файл завершенных клеток.
+    :param workers: Число процессов (по умолчанию число доступных ядер).
+    :return: Записи всех клеток (из кэша и новые) и статистика: cases, cached, computed, time.
+    """
+    start = perf_counter()
+    cases = [{"method": method, "params": params, "problem": problem, "dim": dim, "tol": tol, "max_iter": max_iter}
+             for method in methods
+             for params in sweep_cells(method, (grids or {}).get(method), samples, seed)
+             for problem in problems or PROBLEMS
+             for dim in dims]
+
+    done = {} if cache is None else _load_cache(Path(cache))
+    pending = [case for case in cases if _case_key(case) not in done]
+    stats = {"cases": len(cases), "cached": len(cases) - len(pending), "computed": 0}
+
+    output = open(cache, "a", encoding="utf-8") if cache is not None else None
+
+    def collect(record):
+        done[_case_key(_record_case(record))] = record
+        stats["computed"] += 1
+        if output is not None:
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+    try:
+        workers = workers or available_cpus()
+        if workers == 1:
+            for case in pending:
+                collect(run_sweep_case(case))
+        elif pending:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(run_sweep_case, case) for case in pending}
+                while futures:
+                    finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        collect(future.result())
+    finally:
+        if output is not None:
+            output.close()
+
+    stats["time"] = perf_counter() - start
+    return [done[_case_key(case)] for case in cases], stats
+
+
+def _load_cache(path):
+    """
+    Завершенные клетки из файла кэша.
+
+    Последняя строка, оборванная при прерывании перебора посреди записи, отбрасывается
+    (с предупреждением) и удаляется из файла, чтобы следующие записи начинались с новой строки.
+    """
+    done = {}
+    if not path.exists():
+        return done
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    for number, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if number != len(lines) - 1:
+                raise
+            warnings.warn(f"{path}: оборванная последняя строка кэша отброшена")
+            path.write_text("".join(lines[:-1]), encoding="utf-8")
+            break
+        done[_case_key(_record_case(record))] = record
+    return done
+
+
+def _record_case(record):
+    return {key: record[key] for key in ("method", "params", "problem", "dim", "tol", "max_iter")}
+
+
+def cell_scores(records, success_tol=SUCCESS_TOL):
+    """
+    Оценки наборов коэффициентов по классам задач (задача на всех размерностях).
+
+    :return: Словарь (метод, задача) -> список оценок: params, solved (решено запусков), cases (всего),
+             nfev и time - среднее геометрическое по размерностям.
+    """
+    groups = {}
+    for record in records:
+        cell = groups.setdefault((record["method"], record["problem"]), {}).setdefault(
+            _case_key(record["params"]), {"params": record["params"], "runs": []})
+        cell["runs"].append(record)
+
+    scores = {}
+    for key, cells in groups.items():
+        scores[key] = []
+        for cell in cells.values():
+            runs = cell["runs"]
+            scores[key].append({
+                "params": cell["params"],
+                "solved": sum(run["error_f"] <= success_tol for run in runs),
+                "cases": len(runs),
+                "nfev": float(np.exp(np.mean([np.log(max(run["nfev"], 1)) for run in runs]))),
+                "time": float(np.exp(np.mean([np.log(max(run["time"], 1e-9)) for run in runs]))),
+            })
+    return scores
+
+
+def recommend(records, success_tol=SUCCESS_TOL):
+    """
+    Рекомендуемые коэффициенты для каждого метода и класса задач: решено больше всего запусков,
+    при равенстве - наименьшее число вычислений.
+
+    :return: Список записей: method, problem, params, solved, nfev, time и default_nfev - число вычислений
+             с коэффициентами по умолчанию (если они входили в перебор).
+    """
+    recommendations = []
+    for (method, problem), scores in cell_scores(records, success_tol).items():
+        best = min(scores, key=lambda score: (-score["solved"], score["nfev"]))
+        default = next((score for score in scores if score["params"] == METHOD_PARAMS[method]), None)
+        recommendations.append({
+            "method": method,
+            "problem": problem,
+            "params": best["params"],
+            "solved": f"{best['solved']}/{best['cases']}",
+            "nfev": best["nfev"],
+            "time": best["time"],
+            "default_nfev": default["nfev"] if default is not None else None,
+        })
+    return recommendations
+
+
+def heatmap(records, method, problem, x_param, y_param, field="nfev", success_tol=SUCCESS_TOL):
+    """
+    Тепловая карта оценки наборов коэффициентов по двум коэффициентам.
+
+    Для каждой пары значений берется лучшая оценка по остальным коэффициентам; наборы, не решившие
+    все запуски, не учитываются (nan). Если значений по оси больше HEATMAP_BINS (случайный поиск),
+    они группируются в HEATMAP_BINS равных интервалов.
+
+    :param field: "nfev" или "time".
+    :return: Значения по осям x и y и матрица (len(y), len(x)).
+    """
+    scores = cell_scores([record for record in records if record["method"] == method], success_tol)
+    scores = scores.get((method, problem), [])
+    x_axis, x_index = _axis([score["params"][x_param] for score in scores])
+    y_axis, y_index = _axis([score["params"][y_param] for score in scores])
+    matrix = np.full((len(y_axis), len(x_axis)), np.nan)
+    for score in scores:
+        if score["solved"] < score["cases"]:
+            continue
+        i, j = y_index(score["params"][y_param]), x_index(score["params"][x_param])
+        matrix[i, j] = np.fmin(matrix[i, j], score[field])
+    return x_axis, y_axis, matrix
+
+
+def _axis(values):
+    """
+    Значения оси тепловой карты и функция номера значения.
+    """
+    distinct = sorted(set(values))
+    if len(distinct) <= HEATMAP_BINS:
+        return np.array(distinct), distinct.index
+    edges = np.linspace(distinct[0], distinct[-1], HEATMAP_BINS + 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return centers, lambda value: min(int(np.searchsorted(edges, value, side="right")) - 1, HEATMAP_BINS - 1)
+
+
+def save_heatmaps(records, directory, success_tol=SUCCESS_TOL):
+    """
+    Сохранение тепловых карт nfev и времени по первым двум коэффициентам каждого метода в PNG.
+
+    :return: Список путей сохраненных файлов.
+    """
+    from matplotlib.figure import Figure
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for method, problem in sorted({(record["method"], record["problem"]) for record in records}):
+        x_param, y_param = list(_swept_params(records, method))[:2]
+        for field in ("nfev", "time"):
+            x_axis, y_axis, matrix = heatmap(records, method, problem, x_param, y_param, field, success_tol)
+            figure = Figure(figsize=(6, 5))
+            axes = figure.add_subplot()
+            image = axes.imshow(matrix, origin="lower", cmap="viridis_r")
+            axes.set_xticks(range(len(x_axis)), [f"{value:.3g}" for value in x_axis])
+            axes.set_yticks(range(len(y_axis)), [f"{value:.3g}" for value in y_axis])
+            axes.set_xlabel(x_param)
+            axes.set_ylabel(y_param)
+            axes.set_title(f"{method}, {problem}: {field}")
+            figure.colorbar(image)
+            path = directory / f"{method}_{problem}_{field}.png"
+            figure.savefig(path)
+            paths.append(path)
+    return paths
+
+
+def _swept_params(records, method):
+    """
+    Имена коэффициентов, перебиравшихся для метода.
+    """
+    return next(record["params"] for record in records if record["method"] == method).keys()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Подбор коэффициентов методов прямого поиска")
+    parser.add_argument("--methods", nargs="+", choices=list(SWEEP_GRIDS), default=list(SWEEP_GRIDS), help="Методы")
+    parser.add_argument("--problems", nargs="+", choices=list(PROBLEMS), help="Задачи")
+    parser.add_argument("--dims", nargs="+", type=int, default=list(QUICK_DIMS), help="Размерности")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="Число случайных наборов коэффициентов (по умолчанию перебор сетки)")
+    parser.add_argument("--seed", type=int, default=0, help="Зерно случайного поиска")
+    parser.add_argument("--cache", default="sweep.jsonl", help="Файл завершенных клеток (продолжение перебора)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Число процессов")
+    parser.add_argument("--max-iter", type=int, default=1000, help="Максимальное число итераций")
+    parser.add_argument("--success-tol", type=float, default=SUCCESS_TOL, help="Допустимая ошибка по значению")
+    parser.add_argument("--plots", help="Каталог для тепловых карт nfev и времени (PNG)")
+    parser.add_argument("--output", help="JSON файл с рекомендуемыми коэффициентами")
+    args = parser.parse_args(argv)
+
+    from tabulate import tabulate
+
+    records, stats = run_sweep(args.methods, args.problems, args.dims, samples=args.samples, seed=args.seed,
+                               cache=args.cache, workers=args.workers, max_iter=args.max_iter)
+    print(f"Клеток: {stats['cases']} (из кэша {stats['cached']}, вычислено {stats['computed']}) "
+          f"за {stats['time']:.2f} с")
+
+    for method in args.methods:
+        x_param, y_param = list(_swept_params(records, method))[:2]
+        for problem in args.problems or PROBLEMS:
+            x_axis, y_axis, matrix = heatmap(records, method, problem, x_param, y_param,
+                                             success_tol=args.success_tol)
+            rows = [[value, *row] for value, row in zip(y_axis, matrix)]
+            print(f"\n{method}, {problem}: nfev ({y_param} по строкам, {x_param} по столбцам)")
+            print(tabulate(rows, headers=[f"{value:.3g}" for value in x_axis],
+                           floatfmt=[".3g"] + [".0f"] * len(x_axis)))
+
+    recommendations = recommend(records, args.success_tol)
+    print("\nРекомендуемые коэффициенты")
+    print(tabulate([{**record, "params": json.dumps(record["params"])} for record in recommendations],
+                   headers="keys", floatfmt=".3g"))
+    if args.plots:
+        save_heatmaps(records, args.plots, args.success_tol)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(recommendations, file, indent=2)
+            file.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,36 @@
 import csv
+import json
+import pickle
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
 
+import numpy as np
 import pytest
 import sympy as sp
 
-from app.hooke_jeeves import hooke_jeeves
-from app.main import get_function, get_x0
-from app.nelder_mead import nelder_mead
-from app.powell import powell
+from app.batch import _convert_params, run_batch, run_job
+from app.bfgs import bfgs
+from app.checkpoint import Checkpoint, resume
+from app.benchmark import DEFAULT_BASELINE, PROBLEMS, compare, load_baseline, run_scaling, run_suite
+from app.compiler import compile_expression
+from app.core import METHODS, get_function, get_x0, solve
+from app.evaluation import Evaluator
+from app.grid import compute_grid
+from app.history import HistoryStore
+from app.hooke_jeeves import HookeJeeves, hooke_jeeves
+from app.lockstep import hooke_jeeves_many, nelder_mead_many
+from app.multistart import multistart
+from app.nelder_mead import NelderMead, nelder_mead
+from app.newton import newton
+from app.powell import Powell, powell
+from app.result import CALLBACK, CONVERGED, MAX_EVALS, MAX_ITER, MAX_TIME, NO_DECREASE, STAGNATION, TARGET
+from app.separable import separable_groups, solve_separable
+from app.surrogate import Surrogate
+from app.sweep import heatmap, recommend, run_sweep, sweep_cells
+from app.trace import ITERATION, Trace
 from app.utils import format_number
 
 # Параметры тестов
@@ -40,7 +64,7 @@ def prepare_func_x0(input_expr, input_x0):
 # Общая функция для выполнения тестов
 def run_test(method_name, method, input_expr, input_x0, expected_args, expected_value):
     func, x0 = prepare_func_x0(input_expr, input_x0)
-    optimal_args, optimal_value = method(func, x0)
+    optimal_args, optimal_value, *_ = method(func, x0)
     print(f"{method_name}: {optimal_args} = {optimal_value}")
     # Вычисление отклонений
     delta_args = [abs(opt - exp) for opt, exp in zip(optimal_args, expected_args)]
@@ -79,7 +103,7 @@ def test_scipy_nelder_mead(input_expr, input_x0, expected_args, expected_value):
     def method(func, x0):
         from scipy.optimize import minimize
         result = minimize(lambda x: func(*x), x0, method='Nelder-Mead')
-        return result.x, result.fun
+        return result.x, result.fun, result.nit
 
     run_test("scipy_nelder_mead", method, input_expr, input_x0, expected_args, expected_value)
 
@@ -89,11 +113,551 @@ def test_scipy_powell(input_expr, input_x0, expected_args, expected_value):
     def method(func, x0):
         from scipy.optimize import minimize
         result = minimize(lambda x: func(*x), x0, method='Powell')
-        return result.x, result.fun
+        return result.x, result.fun, result.nit
 
     run_test("scipy_powell", method, input_expr, input_x0, expected_args, expected_value)
 
 
+@pytest.mark.parametrize("method", [hooke_jeeves, nelder_mead, powell])
+def test_evaluator_counts_distinct_points(method):
+    calls = {}
+
+    def func(x, y):
+        calls[(x, y)] = calls.get((x, y), 0) + 1
+        return (x - 2) ** 2 + (y - 3) ** 2
+
+    evaluator = Evaluator(func, maxsize=100_000)
+    method(evaluator, np.array([0.0, 0.0]))
+    # Каждая различная точка вычисляется ровно один раз
+    assert max(calls.values()) == 1
+    assert evaluator.nfev == len(calls)
+
+
+def test_evaluator_batch_uses_cache_and_scalar_fallback():
+    evaluator = Evaluator(lambda x, y: x if x > y else y)  # Функция не векторизуется
+    values = evaluator.batch([[1.0, 2.0], [3.0, 1.0], [1.0, 2.0]])
+    assert values.tolist() == [2.0, 3.0, 2.0]
+    assert not evaluator.vectorized
+    assert evaluator.nfev == 2
+    assert evaluator(3.0, 1.0) == 3.0 and evaluator.nfev == 2
+
+
+@pytest.mark.parametrize("method", [hooke_jeeves, nelder_mead])
+@pytest.mark.parametrize("input_x0", ['0 0', '10 -5', '-2 -3'])
+def test_batch_mode(method, input_x0):
+    func, x0 = prepare_func_x0('(x-2)**2+(y-3)**2', input_x0)
+    optimal_args, optimal_value, _ = method(func, np.array(x0), batch=True)
+    assert np.allclose(optimal_args, [2, 3], atol=1e-5)
+
+
+def test_compute_grid_matches_pointwise_and_is_cached():
+    func, _ = prepare_func_x0('(x-2)**2+(y-3)**2+z', '0 0 0')
+    X, Y, Z = compute_grid(func, [0, 0, 7], [0, 1], [(-1, 1), (-1, 1)], 20, key='test')
+    assert Z.shape == (20, 20)
+    assert Z[3, 5] == pytest.approx(func(X[3, 5], Y[3, 5], 7))
+    # Повторный запрос с теми же фиксированными координатами берется из кэша
+    assert compute_grid(func, [5, 5, 7], [0, 1], [(-1, 1), (-1, 1)], 20, key='test')[2] is Z
+    assert compute_grid(func, [0, 0, 8], [0, 1], [(-1, 1), (-1, 1)], 20, key='test')[2] is not Z
+
+
+def test_compile_expression_is_cached_and_uses_cse():
+    compiled = compile_expression('100*(y - x**2)**2 + (x - 1)**2')
+    # Эквивалентная запись берется из кэша без повторной компиляции
+    assert compile_expression('(x - 1)**2 + 100*(y-x**2)**2') is compiled
+    assert compiled.param_names == ['x', 'y']
+    assert compiled(1.0, 1.0) == 0
+    assert compiled.compile_time > 0 and compiled.call_time(number=10) > 0
+
+
+def test_core_imports_without_gui():
+    code = "import sys, app.core; assert not {'tkinter', 'matplotlib'} & set(sys.modules)"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch_streams_results(tmp_path, workers):
+    jobs = tmp_path / "jobs.jsonl"
+    jobs.write_text("\n".join(json.dumps(job) for job in [
+        {"expression": "(x-2)**2+(y-3)**2", "x0": "0 0", "method": "hooke_jeeves", "params": {"step_size": 1}},
+        {"expression": "(x-2)**2+(y-3)**2", "x0": [10, -5], "method": "nelder_mead"},
+        {"expression": "(x-2)**2+(y-3)**2", "x0": "0", "method": "powell"},
+    ]))
+    output = tmp_path / "results.jsonl"
+    stats = run_batch(str(jobs), str(output), workers=workers, chunksize=1)
+    records = sorted((json.loads(line) for line in output.read_text().splitlines()), key=lambda r: r["id"])
+    assert [record["status"] for record in records] == ["ok", "ok", "error"]
+    assert np.allclose(records[0]["x"], [2, 3], atol=1e-5)
+    assert stats["jobs"] == 3 and stats["nfev"] == records[0]["nfev"] + records[1]["nfev"]
+
+
+def test_run_batch_converts_params_per_job(tmp_path):
+    jobs = tmp_path / "jobs.csv"
+    jobs.write_text("expression,x0,method,step_size,stall_window,memory\n"
+                    "(x-2)**2+(y-3)**2,0 0,hooke_jeeves,1,5,\n"
+                    "(x-2)**2+(y-3)**2,0 0,hooke_jeeves,abc,,\n"
+                    "(x-2)**2+(y-3)**2,0 0,lbfgs,,,5\n")
+    output = tmp_path / "results.jsonl"
+    run_batch(str(jobs), str(output), workers=1)
+    records = sorted((json.loads(line) for line in output.read_text().splitlines()), key=lambda r: r["id"])
+    # Ошибочное значение - ошибка одного задания, целые параметры остаются целыми
+    assert [record["status"] for record in records] == ["ok", "error", "ok"]
+    assert "abc" in records[1]["error"]
+    converted = _convert_params({"memory": "5", "max_evals": "1e3", "step_size": 1, "title": "x"})
+    assert converted == {"memory": 5, "max_evals": 1000, "step_size": 1.0, "title": "x"}
+    assert isinstance(converted["memory"], int) and isinstance(converted["max_evals"], int)
+
+
+def test_run_batch_parses_boolean_params(tmp_path):
+    jobs = tmp_path / "jobs.csv"
+    jobs.write_text("expression,x0,method,batch,line_tol\n"
+                    "(x-2)**2+(y-3)**2,0 0,hooke_jeeves,False,\n"
+                    "(x-2)**2+(y-3)**2,0 0,hooke_jeeves,TRUE,\n"
+                    "(x-2)**2+(y-3)**2,0 0,hooke_jeeves,yes,\n"
+                    "(x-2)**2+(y-3)**2,0 0,powell,,1e-4\n")
+    output = tmp_path / "results.jsonl"
+    run_batch(str(jobs), str(output), workers=1)
+    records = sorted((json.loads(line) for line in output.read_text().splitlines()), key=lambda r: r["id"])
+    # Строка "False" - ложь, а не непустая (истинная) строка; неразборчивое значение - ошибка задания
+    func, x0 = prepare_func_x0('(x-2)**2+(y-3)**2', '0 0')
+    assert [record["status"] for record in records] == ["ok", "ok", "error", "ok"]
+    assert records[0]["nfev"] == hooke_jeeves(func, x0).nfev
+    assert records[1]["nfev"] == hooke_jeeves(func, x0, batch=True).nfev
+    assert "yes" in records[2]["error"]
+    assert records[3]["nfev"] == powell(func, x0, line_tol=1e-4).nfev
+    assert _convert_params({"adaptive": "0", "batch": True, "line_tol": "1e-4"}) == {
+        "adaptive": False, "batch": True, "line_tol": 1e-4}
+
+
+def test_run_job_interrupts_hanging_call(monkeypatch):
+    # Вызов целевой функции зависает: задание прерывается по timeout, а не ждет окончания вызова
+    def hanging(expression):
+        return SimpleNamespace(params=compile_expression(expression).params, func=lambda *args: time.sleep(60))
+
+    monkeypatch.setattr("app.batch.compile_expression", hanging)
+    job = {"id": 0, "expression": "x**2", "x0": "1", "method": "hooke_jeeves", "params": {}}
+    start = time.perf_counter()
+    record = run_job(job, timeout=0.2)
+    assert record["status"] == "timeout" and time.perf_counter() - start < 5
+
+
+@pytest.mark.parametrize("sampling", ["uniform", "lhs", "sobol"])
+def test_multistart_finds_global_minimum(sampling):
+    # Функция Растригина: много локальных минимумов, глобальный в нуле
+    expr = 'x**2 + y**2 - 10*cos(2*pi*x) - 10*cos(2*pi*y) + 20'
+    result = multistart(expr, -2, 2, "nelder_mead", n_starts=32, sampling=sampling, workers=1, seed=0)
+    assert result["value"] == pytest.approx(0, abs=1e-6)
+    assert len(result["basins"]) + result["pruned"] <= 32
+    assert all(a["value"] <= b["value"] for a, b in zip(result["basins"], result["basins"][1:]))
+
+
+@pytest.mark.parametrize("input_expr, input_x0, expected_args", [
+    ('(x-2)**2+(y-3)**2', '10 -5', [2, 3]),
+    ('(x+40)**2+(y-3)**2', '0 0', [-40, 3]),  # минимум позади начальной точки и далеко от нее
+])
+def test_powell_line_search_is_cheap(input_expr, input_x0, expected_args):
+    func, x0 = prepare_func_x0(input_expr, input_x0)
+    evaluator = Evaluator(func)
+    optimal_args, _, _ = powell(evaluator, x0)
+    assert np.allclose(optimal_args, expected_args, atol=1e-6)
+    assert evaluator.nfev < 100
+
+
+def test_nelder_mead_incremental_high_dimension():
+    n = 20
+    weights = np.arange(1, n + 1)
+    evaluator = Evaluator(lambda *x: float(np.sum(weights * (np.array(x) - 1) ** 2)))
+    optimal_args, optimal_value, k = nelder_mead(evaluator, np.zeros(n), adaptive=True, tol=1e-8, max_iter=100_000)
+    assert np.allclose(optimal_args, 1, atol=1e-4)
+    # Без редукций итерация стоит не более двух вычислений функции
+    assert evaluator.nfev < 2 * k + 10 * (n + 1)
+
+
+def test_benchmark_has_no_nfev_regressions():
+    # Число вычислений детерминировано, поэтому сравнивается без учета шума времени
+    results = run_suite(dims=(2, 5), methods=["hooke_jeeves", "nelder_mead", "powell"])
+    baseline = load_baseline(Path(__file__).parent.parent / DEFAULT_BASELINE)
+    assert compare(results, baseline, check_time=False) == []
+
+
+def test_restarts_after_stagnation():
+    # Шаг Хука-Дживса в овраге Розенброка уменьшается вдали от минимума
+    func, x0 = prepare_func_x0('100*(y - x**2)**2 + (x - 1)**2', '-1.2 1')
+    plain = hooke_jeeves(func, x0)
+    result = hooke_jeeves(func, x0, restarts=10, restart_window=50)
+    assert plain.fun > 1 and result.fun < 1e-6 and result.nfev < plain.nfev
+    assert result.reason == CONVERGED and 0 < result.counters["restarts"] <= 10
+
+    # Симплекс Нелдера-Мида в размерности 12 сходится не к минимуму
+    func, start, _ = PROBLEMS["ellipsoid"]
+    plain = nelder_mead(func, start(12), max_iter=20_000)
+    result = nelder_mead(func, start(12), max_iter=20_000, restarts=10)
+    assert plain.fun > 0.1 and result.fun < 1e-8 and result.reason == CONVERGED
+
+    # В минимуме перезапуск не дает улучшения и выполняется один раз
+    func, x0 = prepare_func_x0('(x-2)**2+(y-3)**2', '0 0')
+    for method in (hooke_jeeves, nelder_mead):
+        result = method(func, x0, restarts=5)
+        assert np.allclose(result.x, [2, 3], atol=1e-6) and result.counters["restarts"] == 1
+        assert "restarts" not in method(func, x0).counters
+
+
+def test_sweep_resumes_and_recommends(tmp_path):
+    grids = {"hooke_jeeves": {"step_size": [0.25, 0.5, 1.0], "step_reduction": [0.5, 0.8]}}
+    cache = tmp_path / "sweep.jsonl"
+    for workers in (2, 1):
+        records, stats = run_sweep(["hooke_jeeves"], ["sphere", "rosenbrock"], (2,), grids=grids, cache=cache,
+                                   workers=workers, max_iter=200)
+        assert stats["cases"] == 12 and len(records) == 12
+    # Повторный запуск берет все клетки из кэша
+    assert stats["cached"] == 12 and stats["computed"] == 0
+
+    # Перебор, прерванный посреди записи: оборванная строка отбрасывается и клетка вычисляется заново
+    lines = cache.read_text().splitlines(keepends=True)
+    cache.write_text("".join(lines[:-1]) + lines[-1][:20])
+    with pytest.warns(UserWarning):
+        records, stats = run_sweep(["hooke_jeeves"], ["sphere", "rosenbrock"], (2,), grids=grids, cache=cache,
+                                   workers=1, max_iter=200)
+    assert stats["cached"] == 11 and stats["computed"] == 1
+    assert len([json.loads(line) for line in cache.read_text().splitlines()]) == 12
+
+    for recommendation in recommend(records):
+        candidates = [record["nfev"] for record in records if record["problem"] == recommendation["problem"]
+                      and record["error_f"] <= 1e-4]
+        if candidates:
+            assert recommendation["nfev"] == pytest.approx(min(candidates))
+    x_axis, y_axis, matrix = heatmap(records, "hooke_jeeves", "sphere", "step_size", "step_reduction")
+    assert list(x_axis) == [0.25, 0.5, 1.0] and list(y_axis) == [0.5, 0.8] and matrix.shape == (2, 3)
+
+    # Случайный поиск воспроизводим и дает коэффициенты из области поиска
+    cells = sweep_cells("nelder_mead", samples=5, seed=1)
+    assert cells == sweep_cells("nelder_mead", samples=5, seed=1)
+    assert all(0.5 <= cell["alpha"] <= 2.0 for cell in cells)
+
+
+def test_hooke_jeeves_memory_is_linear_in_dimension():
+    small, large = run_scaling(dims=(50, 500), methods=["hooke_jeeves"], iterations=1)
+    # Состояние метода - несколько векторов длины n, без копий на каждую пробную точку
+    assert large["peak_memory_kb"] < 20 * small["peak_memory_kb"]
+
+
+def test_separable_presolve():
+    compiled = compile_expression('(x-2)**2 + (y-3)**2 + a*b + (b-1)**2 + a**2 + 5')
+    groups, constant = separable_groups(compiled.expr, compiled.params)
+    assert [indices for _, indices in groups] == [[0, 1], [2], [3]] and constant == 5
+
+    x0 = np.zeros(4)
+    for workers in (1, 2):
+        result = solve_separable(compiled, x0, "nelder_mead", tol=1e-8, workers=workers)
+        assert np.allclose(result.x, [-2 / 3, 4 / 3, 2, 3], atol=1e-5)
+        assert result.fun == pytest.approx(compiled(*result.x))
+        assert result.reason == CONVERGED and result.counters["groups"] == 3
+    # Подзадачи меньшей размерности решаются меньшим числом вычислений
+    assert result.nfev < nelder_mead(compiled.func, x0, tol=1e-8).nfev
+
+    # Счетчики по слотам направлений объединяются: у каждой подзадачи свой набор
+    result = solve_separable(compiled, x0, "powell")
+    assert len(result.counters["line_search_nfev_by_slot"]) == 4
+    assert sum(result.counters["line_search_nfev_by_slot"]) + result.counters["extrapolation_nfev"] < result.nfev
+    assert solve('x*y + x**2 + y**2', '1 1', "powell", separate=True).counters["groups"] == 1
+
+    # Бюджет вычислений относится ко всей задаче и делится между подзадачами
+    for workers in (1, 2):
+        result = solve('(x-2)**2 + (y-3)**2 + a*b + (b-1)**2 + a**2', '0 0 0 0', "nelder_mead", separate=True,
+                       workers=workers, max_evals=30)
+        assert result.nfev <= 30 and result.reason == MAX_EVALS and result.counters["groups"] == 3
+
+
+@pytest.mark.parametrize("method", [hooke_jeeves, nelder_mead, powell])
+def test_surrogate_assisted_steps(method):
+    func, x0 = prepare_func_x0('(x-1)**2 + 2*(y+2)**2 + 3*(z-0.5)**2 + x*y + exp(z/3)', '5 5 5')
+    plain = method(func, x0)
+    for model in ("quadratic", "rbf"):
+        result = method(func, x0, surrogate=model)
+        assert result.fun == pytest.approx(plain.fun, abs=1e-8) and result.reason == CONVERGED
+        assert result.counters["surrogate_accepted"] <= result.counters["surrogate_proposed"]
+        if method is not powell and model == "quadratic":
+            # Точные линейные поиски Пауэлла модель почти не сокращает, прямой поиск - заметно
+            assert result.nfev < 0.6 * plain.nfev
+
+    # Surrogate сохраняет архив между запусками; повторно вычисленные точки в нем не дублируются
+    surrogate = Surrogate()
+    evaluator = Evaluator(func)
+    method(evaluator, x0, surrogate=surrogate)
+    assert len(surrogate.archive) == min(evaluator.nfev, 500)
+
+
+@pytest.mark.parametrize("method", [hooke_jeeves, nelder_mead, powell])
+def test_checkpoint_resume(method, tmp_path):
+    func, x0 = prepare_func_x0('100*(y - x**2)**2 + (x - 1)**2 + (z - y)**2', '-1.2 1 0')
+    full = method(func, x0, surrogate="quadratic", stall_window=50)
+    path = tmp_path / "run.ckpt"
+
+    class Interrupted(Exception):
+        pass
+
+    def interrupt(k, x, value):
+        if k == full.nit // 2:
+            raise Interrupted  # Имитация завершения процесса посреди поиска
+
+    with pytest.raises(Interrupted):
+        method(func, x0, surrogate="quadratic", stall_window=50, callback=interrupt,
+               checkpoint=Checkpoint(path, every_evals=20))
+    # Контрольная точка другого метода, с другими параметрами или другой функцией не подходит
+    other = nelder_mead if method is hooke_jeeves else hooke_jeeves
+    with pytest.raises(ValueError, match="методом"):
+        other(func, x0, checkpoint=path)
+    with pytest.raises(ValueError, match="x0"):
+        method(func, x0 + 50, surrogate="quadratic", stall_window=50, checkpoint=path)
+    with pytest.raises(ValueError, match="функции"):
+        method(lambda *args: func(*args) + 1, x0, surrogate="quadratic", stall_window=50, checkpoint=path)
+
+    resumed = resume(path, func)
+    assert np.array_equal(resumed.x, full.x) and resumed.fun == full.fun
+    assert (resumed.nit, resumed.nfev, resumed.reason) == (full.nit, full.nfev, full.reason)
+    assert resumed.counters == full.counters
+
+    # Завершенный запуск удаляет контрольную точку: повторный запуск с тем же путем начинается заново
+    assert not path.exists()
+    fresh = method(func, x0 + 1, checkpoint=path)
+    assert np.array_equal(fresh.x, method(func, x0 + 1).x) and not path.exists()
+
+
+@pytest.mark.parametrize("optimizer, method", [(HookeJeeves, hooke_jeeves), (NelderMead, nelder_mead),
+                                               (Powell, powell)])
+def test_ask_tell_optimizers(optimizer, method):
+    compiled = compile_expression('100*(y - x**2)**2 + (1 - x)**2')
+    x0s = [[-1.2, 1], [2, 2], [0, -1]]
+
+    # Оптимизатор, которому значения передаются извне, проходит те же точки, что и функция метода
+    single = optimizer(x0s[0])
+    points = single.ask()
+    while points is not None:
+        single.tell([compiled.func(*point) for point in points])
+        points = single.ask()
+    expected = method(compiled.func, x0s[0])
+    assert np.array_equal(single.result().x, expected.x) and single.result().fun == expected.fun
+    assert (single.nit, single.reason) == (expected.nit, expected.reason)
+
+    # Запросы нескольких оптимизаторов вычисляются одним векторизованным вызовом;
+    # между итерациями оптимизаторы сохраняются и загружаются pickle
+    optimizers = [optimizer(x0) for x0 in x0s]
+    while True:
+        requests = [(i, o.ask()) for i, o in enumerate(optimizers)]
+        requests = [(i, points) for i, points in requests if points is not None]
+        if not requests:
+            break
+        values = compiled.func(*np.vstack([points for _, points in requests]).T)
+        start = 0
+        for i, points in requests:
+            nit = optimizers[i].nit
+            optimizers[i].tell(values[start:start + len(points)])
+            start += len(points)
+            if optimizers[i].nit != nit:
+                optimizers[i] = pickle.loads(pickle.dumps(optimizers[i]))
+    for x0, o in zip(x0s, optimizers):
+        result, expected = o.result(), method(compiled.func, x0)
+        assert o.done and result.reason == expected.reason and result.nfev >= expected.nfev  # Без кэша Evaluator
+        assert result.fun == pytest.approx(expected.fun, rel=1e-6, abs=1e-10)
+
+    with pytest.raises(RuntimeError):
+        optimizer(x0s[0]).tell([1.0])
+    pending = optimizer(x0s[0])
+    pending.ask()
+    with pytest.raises(ValueError):
+        pickle.dumps(pending)  # Посреди итерации оптимизатор не сохраняется
+
+
+def test_lockstep_matches_independent_runs():
+    compiled = compile_expression('a*(x - 1)**2 + (y - b)**2 + x*y/10')
+    rng = np.random.default_rng(0)
+    params = rng.uniform(1, 3, size=(20, 2))
+    x0s = rng.uniform(-5, 5, size=(20, 2))
+    # Переменные упорядочены по имени: a, b, x, y; координаты x, y идут первыми
+    func = lambda x, y, a, b: compiled(a, b, x, y)
+
+    result = hooke_jeeves_many(func, x0s, args=params)
+    for (a, b), x0, x, fun, nit in zip(params, x0s, result.x, result.fun, result.nit):
+        expected = hooke_jeeves(lambda x, y: compiled(a, b, x, y), x0)
+        assert np.array_equal(x, expected.x) and fun == expected.fun and nit == expected.nit
+    assert list(result.reason) == [CONVERGED] * 20
+    # Одна итерация всех задач - 2n + 1 векторизованных вызовов
+    assert result.counters["calls"] == (2 * 2 + 1) * result.nit.max() + 1
+
+    result = nelder_mead_many(func, x0s, args=params, tol=1e-8)
+    for (a, b), x0, x in zip(params, x0s, result.x):
+        expected = nelder_mead(lambda x, y: compiled(a, b, x, y), x0, tol=1e-8)
+        assert np.allclose(x, expected.x, atol=1e-5)
+    assert list(result.reason) == [CONVERGED] * 20
+    assert result.counters["calls"] < result.nfev.sum() / 5
+
+    result = hooke_jeeves_many(func, x0s, args=params, max_iter=3)
+    assert list(result.nit) == [3] * 20 and list(result.reason) == [MAX_ITER] * 20
+    assert len(result.message) == 20
+
+
+@pytest.mark.parametrize("method", [hooke_jeeves_many, nelder_mead_many])
+def test_lockstep_counts_and_callback(method):
+    calls = []
+
+    def func(x, y):
+        calls.append(np.size(x))
+        return np.abs(x) + 2 * np.abs(y) + np.abs(x + y - 1)
+
+    x0s = np.random.default_rng(0).uniform(-3, 3, size=(20, 2))
+    seen = []
+    result = method(func, x0s, callback=lambda k, x, values: seen.append((x.shape, np.shape(values))))
+    # Негладкая функция вызывает редукции симплекса: повторяющиеся строки экземпляра тоже учитываются
+    assert result.nfev.sum() == sum(calls)
+    if method is nelder_mead_many:
+        assert result.counters["shrink"] > 0
+    # callback получает точки и значения всех задач, в том числе завершенных
+    assert seen and all(shapes == ((20, 2), (20,)) for shapes in seen)
+
+
+@pytest.mark.parametrize("method, phases", [
+    (hooke_jeeves, ["explore", "explore_nfev", "pattern", "reduce"]),
+    (nelder_mead, ["reflect", "expand", "contract", "shrink"]),
+    (powell, ["line_search_nfev_by_slot", "extrapolation_nfev", "direction_updates"]),
+])
+def test_result_reports_effort_and_reason(method, phases):
+    func, x0 = prepare_func_x0('(x-2)**2+(y-3)**2', '10 -5')
+    evaluator = Evaluator(func)
+    result = method(evaluator, x0)
+    assert result.reason == CONVERGED
+    assert result.nfev == evaluator.nfev and result.time > 0
+    assert list(result.counters) == phases
+
+    assert method(func, x0, max_iter=1).reason in (MAX_ITER, CONVERGED)
+    iterations = []
+    func, x0 = prepare_func_x0('100*(y - x**2)**2 + (x - 1)**2', '2 2')
+    result = method(func, x0, callback=lambda k, x, value: iterations.append(k) or k == 2)
+    assert result.reason == CALLBACK and iterations == [1, 2]
+
+
+@pytest.mark.parametrize("method", [hooke_jeeves, nelder_mead, powell])
+def test_callback_points_are_not_overwritten(method):
+    func, x0 = prepare_func_x0('100*(y - x**2)**2 + (x - 1)**2', '-1.2 1')
+    seen = []
+    method(func, x0, max_iter=50, callback=lambda k, x, value: seen.append((x, x.copy(), value)))
+    # Переданная точка не изменяется следующими итерациями метода
+    assert all(np.array_equal(x, copy) and func(*x) == value for x, copy, value in seen)
+
+
+@pytest.mark.parametrize("method", [hooke_jeeves, nelder_mead, powell])
+def test_budget_stopping(method):
+    func, x0 = prepare_func_x0('100*(y - x**2)**2 + (x - 1)**2', '-1.2 1')
+    evaluator = Evaluator(func)
+    result = method(evaluator, x0, max_evals=30)
+    assert result.reason == MAX_EVALS and result.nfev <= 30
+    assert result.fun == func(*result.x) and result.fun < func(*x0)
+    # Ограничения снимаются после завершения метода
+    assert evaluator.max_nfev is None and evaluator.deadline is None
+
+    assert method(func, x0, max_time=0.0).reason == MAX_TIME
+    result = method(func, x0, f_target=1.0)
+    assert result.reason == TARGET and result.fun <= 1.0
+    assert method(func, x0, stall_window=2, stall_tol=0.5).reason == STAGNATION
+    # Первая итерация - улучшение по сравнению с отсутствием значения, а не застой
+    result = method(func, x0, stall_window=1)
+    assert result.reason == STAGNATION and result.nit > 1
+
+
+@pytest.mark.parametrize("poll", ["complete", "opportunistic"])
+def test_hooke_jeeves_concurrent_poll(poll):
+    func, x0 = prepare_func_x0('(x-2)**2+(y-3)**2', '10 -5')
+    result = hooke_jeeves(func, x0, poll=poll, workers=4)
+    assert np.allclose(result.x, [2, 3], atol=1e-5)
+
+    def slow(*args):
+        time.sleep(0.005)  # Дорогая функция, не удерживающая GIL
+        return func(*args)
+
+    # Время на один исследующий поиск (в режиме "opportunistic" оно зависит от порядка завершения проб)
+    serial = hooke_jeeves(slow, x0, max_iter=10)
+    parallel = hooke_jeeves(slow, x0, max_iter=10, poll=poll, workers=5)
+    if poll == "complete":
+        assert parallel.time / parallel.counters["explore"] < 0.7 * serial.time / serial.counters["explore"]
+
+
+@pytest.mark.parametrize("method", ["bfgs", "lbfgs", "newton"])
+@pytest.mark.parametrize(argnames, argvalues)
+def test_gradient_methods(method, input_expr, input_x0, expected_args, expected_value):
+    result = solve(input_expr, input_x0, method)
+    assert result.reason == CONVERGED and "fallback" not in result.counters
+    assert np.allclose(result.x, expected_args, atol=1e-5)
+    assert abs(result.fun - expected_value) < 1e-9
+    # Производные символьные, поэтому функция вычисляется гораздо реже, чем в прямом поиске
+    assert result.nfev < solve(input_expr, input_x0, "nelder_mead").nfev
+
+
+@pytest.mark.parametrize("method", ["bfgs", "lbfgs", "newton"])
+def test_gradient_methods_fall_back_to_direct_search(method):
+    result = solve('Abs(x-1) + (y+2)**2', '3 3', method)
+    assert result.counters["fallback"] == "nelder_mead"
+    assert np.allclose(result.x, [1, -2], atol=1e-4)
+
+    # Без выражения градиент считается конечными разностями
+    func, x0 = prepare_func_x0('100*(y - x**2)**2 + (x - 1)**2', '-1.2 1')
+    result = METHODS[method](func, x0)
+    assert np.allclose(result.x, [1, 1], atol=1e-4)
+
+
+def test_newton_does_not_report_convergence_without_small_gradient():
+    # Неверный градиент: ни один шаг модели не уменьшает функцию, и область сжимается
+    result = newton(lambda x, y: x ** 2 + y ** 2, [0.0, 0.0], grad=lambda x, y: [1.0, 0.0],
+                    hess=lambda x, y: [[0.0, 0.0], [0.0, 0.0]])
+    assert result.reason == NO_DECREASE and result.counters["rejected"] == result.nit
+
+
+@pytest.mark.parametrize("memory", [None, 5])
+def test_bfgs_does_not_report_convergence_without_small_gradient(memory):
+    # Градиент неверного знака: линейный поиск вдоль "антиградиента" не находит убывания
+    result = bfgs(lambda x, y: x ** 2 + y ** 2, [1.0, 1.0], grad=lambda x, y: [-2 * x, -2 * y], memory=memory)
+    assert result.reason == NO_DECREASE and result.nit == 0
+    assert np.array_equal(result.x, [1.0, 1.0])
+
+
+def test_hooke_jeeves_trace(tmp_path):
+    func, x0 = prepare_func_x0('(x-2)**2+(y-3)**2', '0 0')
+    plain = hooke_jeeves(func, x0)
+    trace = Trace(capacity=50)
+    traced = hooke_jeeves(func, x0, trace=trace)
+    # Трасса не добавляет вычислений функции
+    assert traced.nfev == plain.nfev
+    assert trace.total > 50 and len(trace) == 50
+    data = trace.arrays()
+    assert data["points"].shape == (50, 2)
+    assert data["kinds"][-1] == ITERATION and data["values"][-1] == 0
+
+    trace.save(tmp_path / "trace.npz")
+    saved = np.load(tmp_path / "trace.npz")
+    assert saved["total"] == trace.total
+    assert np.array_equal(saved["points"], data["points"])
+
+
+def test_history_reuse_and_warm_start(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    history = HistoryStore(path)
+    expr = '100*(y - x**2)**2 + (x - 1)**2'
+    first = solve(expr, '-1.2 1', "nelder_mead", history=history)
+    # Эквивалентная запись того же задания берется из истории без нового запуска
+    iterations = []
+    again = solve('(x - 1)**2 + 100*(y - x**2)**2', [-1.2, 1.0], "Нелдера-Мида", history=history,
+                  callback=lambda k, x, value: iterations.append(k))
+    assert len(history) == 1 and iterations == []
+    assert np.array_equal(again.x, first.x) and again.fun == first.fun and again.nfev == first.nfev
+
+    cold = solve(expr, '-1 -1', "nelder_mead")
+    warm = solve(expr, '-1 -1', "nelder_mead", history=history, warm_start=True)
+    assert warm.nfev < cold.nfev
+    assert np.allclose(warm.x, [1, 1], atol=1e-3)
+    history.close()
+
+    # История сохраняется между сеансами
+    records = HistoryStore(path).records()
+    assert [record["params"].get("warm_start") for record in records] == [True, None]
+
+
 @pytest.fixture(scope="module", autouse=True)
 def after_tests_in_module():
     yield  # Все тесты в модуле завершились
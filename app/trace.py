@@ -0,0 +1,54 @@
+import numpy as np
+
+# Виды записей трассы
+PROBE = 0  # Пробная точка исследующего поиска
+ITERATION = 1  # Лучшая точка по итогам итерации
+
+
+class Trace:
+    """
+    Трасса оптимизации в кольцевом буфере numpy: точки, значения функции, шаги и виды записей.
+
+    Буфер выделяется один раз (при первой записи, когда известна размерность), после заполнения
+    новые записи вытесняют самые старые.
+
+    :param capacity: Максимальное число хранимых записей.
+    """
+
+    def __init__(self, capacity=100_000):
+        self.capacity = capacity
+        self.total = 0  # Число записей за все время, включая вытесненные
+        self.points = None
+        self.values = np.empty(capacity)
+        self.steps = np.empty(capacity)
+        self.kinds = np.empty(capacity, dtype=np.int8)
+
+    def record(self, x, value, step, kind=PROBE):
+        if self.points is None:
+            self.points = np.empty((self.capacity, len(x)))
+        i = self.total % self.capacity
+        self.points[i] = x
+        self.values[i] = value
+        self.steps[i] = step
+        self.kinds[i] = kind
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def arrays(self):
+        """
+        Записи в хронологическом порядке: словарь массивов points, values, steps, kinds.
+        """
+        size = len(self)
+        start = self.total % self.capacity if self.total > self.capacity else 0
+        order = (start + np.arange(size)) % self.capacity
+        points = self.points[order] if self.points is not None else np.empty((0, 0))
+        return {"points": points, "values": self.values[order], "steps": self.steps[order],
+                "kinds": self.kinds[order]}
+
+    def save(self, path):
+        """
+        Сохранение трассы в файл .npz.
+        """
+        np.savez(path, total=self.total, **self.arrays())
@@ -1,2 +1,14 @@
+import os
+
+
 def format_number(value):
     return f"{value:.12f}".rstrip('0').rstrip('.')
+
+
+def available_cpus():
+    """
+    Число ядер, доступных текущему процессу.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1